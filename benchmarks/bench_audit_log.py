@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+from datetime import datetime
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.tools.audit_log import AuditLogger
+
+
+def legacy_audit_log(log_dir: str, agent_name: str, action: str, details: dict):
+    """The original open/append/close-per-event implementation"""
+    timestamp = datetime.now().isoformat()
+    log_entry = {
+        "timestamp": timestamp,
+        "agent": agent_name,
+        "action": action,
+        "details": details,
+        "hash": hashlib.md5(str(details).encode()).hexdigest()[:8]
+    }
+
+    log_file = f"{log_dir}/audit_{datetime.now().strftime('%Y%m%d')}.jsonl"
+    os.makedirs(log_dir, exist_ok=True)
+
+    with open(log_file, 'a') as f:
+        f.write(json.dumps(log_entry) + '\n')
+
+
+def sample_details(i: int) -> dict:
+    return {"entity_id": "ENT001", "account_number": str(1000 + i % 500), "amount": i * 1.5}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the buffered audit logger against per-event writes')
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--fsync', choices=['batch', 'interval', 'never'], default='interval')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    print("🧾 Audit Log Benchmark")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_events = min(args.events, 20000)
+        start = time.perf_counter()
+        for i in range(legacy_events):
+            legacy_audit_log(os.path.join(tmp, 'legacy'), 'bench_agent', 'categorize', sample_details(i))
+        legacy_rate = legacy_events / (time.perf_counter() - start)
+
+        logger = AuditLogger(os.path.join(tmp, 'buffered'), batch_size=args.batch_size, fsync=args.fsync)
+        start = time.perf_counter()
+        for i in range(args.events):
+            logger.log('bench_agent', 'categorize', sample_details(i))
+        enqueue_seconds = time.perf_counter() - start
+        logger.close()
+        durable_seconds = time.perf_counter() - start
+
+        print(f"   per-event open/write/close: {legacy_rate:>12,.0f} events/s ({legacy_events:,} events)")
+        print(f"   buffered, caller side:      {args.events / enqueue_seconds:>12,.0f} events/s")
+        print(f"   buffered, written + closed: {args.events / durable_seconds:>12,.0f} events/s "
+              f"(fsync={args.fsync}, batch={args.batch_size})")
+
+
+if __name__ == "__main__":
+    main()
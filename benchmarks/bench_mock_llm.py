@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+from src.llm.mock_server import MockLLMServer, LatencyModel
+
+REQUESTS = [
+    ("What should management focus on before year end?", ["data/input/trial_balance_2024.csv"]),
+    ("Compare Q1 and Q2 2024", ["data/test/sap_full_year_2024.csv", "data/test/oracle_q2_2024.csv"]),
+    ("Review the 2024 trial balance", ["data/input/trial_balance_2024.csv", "data/reference/trial_balance_2023.csv"]),
+]
+
+
+def point_app_at(server: MockLLMServer, cache_dir: str):
+    """Route every LLM client to the mock server and isolate the response cache"""
+    os.environ["DEEPSEEK_BASE_URL"] = server.url
+    os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+    os.environ["LLM_CACHE_PATH"] = os.path.join(cache_dir, "llm_responses.sqlite")
+
+    from deepseek_config import DeepSeekConfig
+    DeepSeekConfig.setup_environment(refresh=True)
+
+
+def bench_raw(server: MockLLMServer, count: int, concurrency: int):
+    """Direct chat completions through the shared OpenAI client"""
+    from concurrent.futures import ThreadPoolExecutor
+    from src.llm.client import get_openai_client
+    from deepseek_config import DeepSeekConfig
+
+    client = get_openai_client()
+    model = DeepSeekConfig.setup_environment()["model"]
+
+    def call(i):
+        start = time.perf_counter()
+        client.chat.completions.create(model=model, messages=[{"role": "user", "content": f"Request {i}"}])
+        return time.perf_counter() - start
+
+    for workers in sorted({1, concurrency}):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            latencies = list(executor.map(call, range(count)))
+        wall = time.perf_counter() - start
+        print(f"   raw x{workers:<3} {count:>4} calls {wall:>7.2f}s  p50 {statistics.median(latencies) * 1000:>7.0f} ms  "
+              f"max {max(latencies) * 1000:>7.0f} ms")
+
+
+def bench_analysis(rounds: int):
+    """Sequential agent-mode analyses: fresh responses, then cache misses and hits"""
+    from dynamic_demo import DynamicTrialBalanceSystem
+
+    system = DynamicTrialBalanceSystem()
+    for label, use_cache in (("bypass", False), ("cached", True), ("cached", True)):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for request, files in REQUESTS:
+                system.run_analysis(request, files, mode='agent', use_cache=use_cache)
+        wall = time.perf_counter() - start
+        print(f"   analysis {label:<7} {rounds * len(REQUESTS):>4} runs {wall:>7.2f}s")
+
+
+def bench_async(concurrency: int):
+    """Concurrent agent-mode analyses on one event loop"""
+    from dynamic_demo import DynamicTrialBalanceSystem
+
+    async def run():
+        system = DynamicTrialBalanceSystem()
+        handles = [system.run_analysis_async(REQUESTS[i % len(REQUESTS)][0] + f" (run {i})",
+                                             REQUESTS[i % len(REQUESTS)][1], mode='agent')
+                   for i in range(concurrency)]
+        return await asyncio.gather(*(handle for handle in handles))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    print(f"   async x{concurrency:<3} analyses {time.perf_counter() - start:>7.2f}s")
+
+
+def bench_demo():
+    """Full multi-agent demo (run_demo.py workload)"""
+    from src.main_demo import TrialBalanceDemo
+
+    demo = TrialBalanceDemo()
+    start = time.perf_counter()
+    demo.run_demo()
+    print(f"   demo           {time.perf_counter() - start:>7.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end LLM benchmarks against the local mock server')
+    parser.add_argument('--latency', default='lognormal:0.5,0.4',
+                        help="Time to first token distribution (see LatencyModel)")
+    parser.add_argument('--tokens-per-second', type=float, default=200.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--scenarios', nargs='+', default=['raw', 'analysis', 'async'],
+                        choices=['raw', 'analysis', 'async', 'demo'])
+    parser.add_argument('--count', type=int, default=20, help='Raw chat completions per run')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=1, help='Passes over the analysis requests')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    server = MockLLMServer(latency=LatencyModel.parse(args.latency, seed=args.seed),
+                           tokens_per_second=args.tokens_per_second,
+                           error_rate=args.error_rate, seed=args.seed)
+
+    print("🤖 Mock LLM End-to-End Benchmark")
+    print("=" * 60)
+    print(f"   Latency {server.latency}, {args.tokens_per_second:g} tokens/s, error rate {args.error_rate:.0%}")
+
+    with server, tempfile.TemporaryDirectory() as cache_dir:
+        point_app_at(server, cache_dir)
+        print(f"   Server {server.url}\n")
+        for scenario in args.scenarios:
+            if scenario == 'raw':
+                bench_raw(server, args.count, args.concurrency)
+            elif scenario == 'analysis':
+                bench_analysis(args.rounds)
+            elif scenario == 'async':
+                bench_async(args.concurrency)
+            elif scenario == 'demo':
+                bench_demo()
+
+        stats = server.stats
+        print(f"\n   Server: {stats['requests']} requests ({stats['streamed']} streamed), "
+              f"{stats['injected_errors']} injected errors, peak {stats['peak_in_flight']} in flight, "
+              f"{stats['prompt_tokens']:,} prompt / {stats['completion_tokens']:,} completion tokens")
+
+
+if __name__ == "__main__":
+    main()
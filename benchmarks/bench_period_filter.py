@@ -0,0 +1,75 @@
+import os
+import sys
+import io
+import time
+import argparse
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+from dynamic_demo import PeriodFilter
+from src.tools.period_index import index_by_period
+
+REQUESTS = ['Q1 2024', 'Q3 2024', 'Feb 2025', '2023', 'Dec 2022']
+
+
+def synthetic_trial_balance(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Monthly trial balance rows over four years in file order, with a few unparseable periods"""
+    rng = np.random.default_rng(seed)
+    months = pd.date_range('2022-01-31', '2025-12-31', freq='ME').strftime('%Y-%m-%d').tolist()
+    periods = rng.choice(months + ['n/a'], rows, p=[0.999 / len(months)] * len(months) + [0.001])
+    return pd.DataFrame({
+        'account_number': rng.integers(1000, 6000, rows),
+        'account_name': 'Account',
+        'debit': rng.random(rows) * 1000,
+        'credit': rng.random(rows) * 1000,
+        'period': periods
+    })
+
+
+def time_filters(df: pd.DataFrame, repeat: int) -> float:
+    """Mean milliseconds per period filter"""
+    periods = [PeriodFilter.parse_period_request(text) for text in REQUESTS]
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for period_info in periods:
+                PeriodFilter.filter_dataframe_by_period(df, period_info)
+    return (time.perf_counter() - started) / (repeat * len(periods)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Legacy vs indexed period filtering')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 50000, 500000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print("📅 Period Filter Benchmark")
+    print("=" * 60)
+    print(f"{'Rows':>9} {'Legacy ms':>10} {'Index build ms':>15} {'Indexed ms':>11} {'Speedup':>8}")
+    for rows in args.rows:
+        df = synthetic_trial_balance(rows)
+        started = time.perf_counter()
+        indexed = index_by_period(df)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        for period_text in REQUESTS:
+            period_info = PeriodFilter.parse_period_request(period_text)
+            with contextlib.redirect_stdout(io.StringIO()):
+                legacy = PeriodFilter.filter_dataframe_by_period(df, period_info)
+                fast = PeriodFilter.filter_dataframe_by_period(indexed, period_info)
+            assert len(legacy) == len(fast), f"{period_text}: {len(legacy)} vs {len(fast)} rows"
+
+        legacy_ms = time_filters(df, args.repeat)
+        indexed_ms = time_filters(indexed, args.repeat)
+        print(f"{rows:>9,} {legacy_ms:>10.3f} {build_ms:>15.3f} {indexed_ms:>11.3f} {legacy_ms / indexed_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
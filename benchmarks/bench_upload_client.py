@@ -0,0 +1,56 @@
+import os
+import sys
+import argparse
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.tools.upload_client import TaxProvisionUploadClient
+from src.tools.tax_system_server import TaxSystemStandIn
+
+
+def synthetic_records(accounts: int):
+    """Yield upload records shaped like UploadRecordBuilder output"""
+    for i in range(accounts):
+        amount = float((i * 7919) % 500000)
+        yield {
+            "account_number": str(100000 + i),
+            "account_name": f"Account {i}",
+            "debit_amount": amount if i % 2 else 0.0,
+            "credit_amount": 0.0 if i % 2 else amount,
+            "net_balance": amount if i % 2 else -amount,
+            "source_system": "SAP"
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure uploader throughput against the local tax system stand-in')
+    parser.add_argument('--accounts', type=int, default=50000, help='Accounts per upload')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 500, 1000, 5000])
+    parser.add_argument('--concurrency', type=int, default=4, help='Maximum batches in flight')
+    parser.add_argument('--latency', type=float, default=0.005, help='Server-side latency per request (seconds)')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests failed with 503')
+    args = parser.parse_args()
+
+    header = {"entity_id": "ENT001", "period_end": "2024-12-31", "currency": "USD"}
+
+    print("📡 Upload Client Throughput Benchmark")
+    print("=" * 60)
+    print(f"   {args.accounts:,} accounts, concurrency {args.concurrency}, "
+          f"latency {args.latency * 1000:.0f} ms, failure rate {args.failure_rate:.0%}")
+    print(f"\n   {'batch':>7} {'batches':>8} {'seconds':>8} {'accounts/s':>12} {'retries':>8} {'conns':>6}")
+
+    for batch_size in args.batch_sizes:
+        with TaxSystemStandIn(latency=args.latency, failure_rate=args.failure_rate) as server:
+            with TaxProvisionUploadClient(server.url, batch_size=batch_size,
+                                          max_concurrency=args.concurrency,
+                                          max_retries=5, backoff_base=0.01) as client:
+                result = client.upload_records(dict(header), synthetic_records(args.accounts))
+
+        print(f"   {batch_size:>7} {result['batches']:>8} {result['elapsed_seconds']:>8.2f} "
+              f"{result['accounts_per_second']:>12,.0f} {result['retries']:>8} {result['connections_opened']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.tools.upload_tools import UploadFileWriter
+
+HEADER = {
+    "entity_id": "ENT001",
+    "period_end": "2024-12-31",
+    "currency": "USD"
+}
+
+
+def create_synthetic_trial_balance(file_path: str, accounts: int, seed: int = 42):
+    """Write a synthetic trial balance CSV with the given number of accounts"""
+    rng = np.random.default_rng(seed)
+    amounts = rng.integers(0, 500000, size=accounts)
+    is_debit = rng.random(accounts) < 0.5
+
+    df = pd.DataFrame({
+        'account_number': np.arange(100000, 100000 + accounts),
+        'account_name': [f"Account {i}" for i in range(accounts)],
+        'debit': np.where(is_debit, amounts, 0),
+        'credit': np.where(is_debit, 0, amounts),
+        'entity_id': 'ENT001',
+        'period': '2024-12-31',
+        'source_system': rng.choice(['SAP', 'Oracle', 'NetSuite'], size=accounts)
+    })
+    df.to_csv(file_path, index=False)
+
+
+def legacy_upload(source_file: str, output_file: str):
+    """The original iterrows + json.dump implementation"""
+    df = pd.read_csv(source_file)
+
+    tax_provision_data = dict(HEADER)
+    tax_provision_data["total_debits"] = float(df['debit'].sum())
+    tax_provision_data["total_credits"] = float(df['credit'].sum())
+    tax_provision_data["account_details"] = []
+
+    for _, row in df.iterrows():
+        tax_provision_data["account_details"].append({
+            "account_number": str(row['account_number']),
+            "account_name": str(row['account_name']),
+            "debit_amount": float(row['debit']),
+            "credit_amount": float(row['credit']),
+            "net_balance": float(row['debit'] - row['credit']),
+            "source_system": row.get('source_system', 'SAP')
+        })
+
+    with open(output_file, 'w') as f:
+        json.dump(tax_provision_data, f, indent=2)
+
+
+def streaming_upload(source_file: str, output_file: str, chunksize: int):
+    """The column-wise streaming implementation"""
+    totals = UploadFileWriter.compute_totals(source_file, chunksize)
+    header = dict(HEADER)
+    header["total_debits"] = totals["total_debits"]
+    header["total_credits"] = totals["total_credits"]
+    UploadFileWriter.write_json(output_file, header, UploadFileWriter.iter_chunks(source_file, chunksize))
+
+
+def measure(func, *args):
+    """Return (seconds, peak traced bytes) for one call"""
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak
+
+
+def file_digest(file_path: str) -> str:
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the upload file writer against the iterrows path')
+    parser.add_argument('--accounts', type=int, nargs='+', default=[10000, 100000],
+                        help='Account counts to benchmark')
+    parser.add_argument('--chunksize', type=int, default=50000,
+                        help='Rows per streamed chunk')
+    parser.add_argument('--skip-legacy', action='store_true',
+                        help='Only run the streaming writer (useful for 1M+ accounts)')
+    args = parser.parse_args()
+
+    print("📤 Upload Writer Benchmark")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for accounts in args.accounts:
+            source_file = os.path.join(tmp, f"tb_{accounts}.csv")
+            create_synthetic_trial_balance(source_file, accounts)
+
+            new_file = os.path.join(tmp, f"streaming_{accounts}.json")
+            new_time, new_peak = measure(streaming_upload, source_file, new_file, args.chunksize)
+
+            print(f"\n📊 {accounts:,} accounts")
+            print(f"   streaming: {new_time:8.2f}s  peak {new_peak / 1e6:8.1f} MB")
+
+            if args.skip_legacy:
+                continue
+
+            legacy_file = os.path.join(tmp, f"legacy_{accounts}.json")
+            legacy_time, legacy_peak = measure(legacy_upload, source_file, legacy_file)
+            identical = file_digest(legacy_file) == file_digest(new_file)
+
+            print(f"   iterrows:  {legacy_time:8.2f}s  peak {legacy_peak / 1e6:8.1f} MB")
+            print(f"   speedup:   {legacy_time / new_time:8.1f}x")
+            print(f"   {'✅' if identical else '❌'} byte-identical output: {identical}")
+
+
+if __name__ == "__main__":
+    main()
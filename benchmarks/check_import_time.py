@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries the pure-data commands must not load
+HEAVY_MODULES = ['pandas', 'numpy', 'crewai', 'langchain_core', 'langchain_openai', 'openai', 'httpx', 'litellm',
+                 'streamlit']
+
+# (label, python arguments, modules that must stay unloaded, held to the time budget)
+CHECKS = [
+    ("cli_Demo.py --help", [os.path.join(project_root, 'cli_Demo.py'), '--help'],
+     HEAVY_MODULES + ['dynamic_demo'], True),
+    ("cli_Demo.py --create-test-data", [os.path.join(project_root, 'cli_Demo.py'), '--create-test-data'],
+     HEAVY_MODULES + ['dynamic_demo'], True),
+    ("import trial_balance_agents", ['-c', 'import src.agents.trial_balance_agents'], HEAVY_MODULES, True),
+    ("import trial_balance_tasks", ['-c', 'import src.tasks.trial_balance_tasks'], HEAVY_MODULES, True),
+    # The demo works on DataFrames, so pandas is expected; crewai waits for run_demo()
+    ("import main_demo", ['-c', 'import src.main_demo'],
+     ['crewai', 'langchain_core', 'langchain_openai', 'openai', 'litellm'], False),
+]
+
+
+def parse_importtime(stderr: str):
+    """{module: cumulative microseconds} for top-level imports, plus every module imported"""
+    top_level, imported = {}, set()
+    for line in stderr.splitlines():
+        fields = line[len('import time:'):].split('|') if line.startswith('import time:') else []
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        imported.add(name.strip())
+        # Nested imports are indented two more spaces per level
+        if not name.startswith('  '):
+            top_level[name.strip()] = int(fields[1])
+    return top_level, imported
+
+
+def run_check(label: str, arguments, forbidden, timed: bool, budget_ms: float, cwd: str):
+    env = dict(os.environ, PYTHONPATH=project_root, OPENAI_API_KEY=os.getenv('OPENAI_API_KEY', 'import-check'))
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-X', 'importtime'] + arguments, cwd=cwd, env=env,
+                               capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    top_level, imported = parse_importtime(completed.stderr)
+    import_ms = sum(top_level.values()) / 1000
+
+    loaded = sorted(module for module in forbidden if module in imported)
+    heaviest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:3]
+    ok = completed.returncode == 0 and not loaded and (not timed or import_ms <= budget_ms)
+    print(f"{'✅' if ok else '❌'} {label:<34} wall {wall_ms:>6.0f} ms  imports {import_ms:>6.0f} ms  "
+          f"heaviest: {', '.join(f'{name} {us / 1000:.0f}ms' for name, us in heaviest)}")
+    if loaded:
+        print(f"   ⚠️  loaded {', '.join(loaded)}")
+    if completed.returncode != 0:
+        print(f"   ⚠️  exit code {completed.returncode}: {completed.stderr.strip().splitlines()[-1]}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-time budget for CLI startup (python -X importtime)')
+    parser.add_argument('--budget-ms', type=float, default=300.0,
+                        help='Maximum cumulative import time per check')
+    args = parser.parse_args()
+
+    print("⏱️  Import-Time Budget Check")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as cwd:
+        results = [run_check(label, arguments, forbidden, timed, args.budget_ms, cwd)
+                   for label, arguments, forbidden, timed in CHECKS]
+    print(f"\n{sum(results)}/{len(results)} checks passed (budget {args.budget_ms:.0f} ms, no heavy imports)")
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
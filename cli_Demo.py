@@ -8,7 +8,8 @@ from deepseek_config import DeepSeekConfig
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
-from dynamic_demo import DynamicTrialBalanceSystem
+# dynamic_demo (pandas, LLM clients) is imported by the commands that analyze,
+# so --help and --create-test-data start without it
 
 def create_test_data():
     """Create test data files with different schemas"""
@@ -117,8 +118,9 @@ def create_test_data():
     
     print("✅ Test data files created in data/test/")
 
-def run_example_analyses():
+def run_example_analyses(use_cache=True, mode='auto', narrative=False):
     """Run several example analyses to demonstrate capabilities"""
+    from dynamic_demo import DynamicTrialBalanceSystem
     
     system = DynamicTrialBalanceSystem()
     
@@ -140,25 +142,61 @@ def run_example_analyses():
         }
     ]
     
-    for i, example in enumerate(examples, 1):
+    # One batch: shared files are loaded once and AI requests share LLM calls
+    try:
+        results = system.run_batch_analysis(examples, use_cache=use_cache, mode=mode, narrative=narrative)
+    except Exception as e:
+        print(f"❌ Example batch error: {e}")
+        return
+    
+    for i, (example, result) in enumerate(zip(examples, results), 1):
         print(f"\n{'='*60}")
         print(f"EXAMPLE {i}: {example['request']}")
         print('='*60)
         
-        try:
-            result = system.run_analysis(
-                example["request"],
-                example["files"], 
-                example["labels"]
-            )
-            
-            if result:
-                print(f"✅ Example {i} completed successfully!")
-            else:
-                print(f"❌ Example {i} failed")
-                
-        except Exception as e:
-            print(f"❌ Example {i} error: {e}")
+        if result:
+            print(result)
+            print(f"✅ Example {i} completed successfully!")
+        else:
+            print(f"❌ Example {i} failed")
+
+def print_stream(stream):
+    """Print an analysis stream as it arrives; returns the final result"""
+    for event in stream:
+        if event["type"] == 'token':
+            sys.stdout.write(event["text"])
+            sys.stdout.flush()
+        elif event["type"] == 'step':
+            print(f"\n🔹 {event['agent']}: {event['text']}")
+        elif event["type"] == 'stage':
+            print(f"\n⏳ {event['message']}")
+    
+    if stream.time_to_first_output is not None:
+        print(f"\n⏱️  First output after {stream.time_to_first_output:.2f}s")
+    if stream.error:
+        print(f"❌ {stream.error}")
+    return stream.result
+
+def print_job(job):
+    """One-line job status"""
+    print(f"📋 {job['id']}  {job['status']:<9}  {job['progress'] * 100:>3.0f}%  {job['message'] or ''}")
+
+def show_job(job_id, wait=False):
+    """Print a background job's status, waiting for it to finish if asked; returns the exit code"""
+    from src.jobs.job_store import get_job_store
+    
+    store = get_job_store()
+    job = store.wait(job_id, on_progress=print_job) if wait else store.get(job_id)
+    if job is None:
+        print(f"❌ No job with id {job_id}")
+        return 1
+    if not wait:
+        print_job(job)
+    if job["status"] == 'completed':
+        print(job["result"])
+    elif job["error"]:
+        print(f"❌ {job['error']}")
+    return 0 if job["status"] in ('completed', 'queued', 'running') else 1
 
 def main():
     """Main CLI interface"""
@@ -175,26 +213,85 @@ def main():
                        help='Data files to analyze')
     parser.add_argument('--labels', type=str, nargs='+',
                        help='Labels for the data files')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Bypass the LLM response cache and request a fresh analysis')
+    parser.add_argument('--mode', choices=['auto', 'deterministic', 'agent'], default='auto',
+                       help='auto: compute new-account/variance/categorization/validation requests without the LLM; '
+                            'deterministic/agent: force one path')
+    parser.add_argument('--narrative', action='store_true',
+                       help='Ask the AI agent for commentary on a deterministic result')
+    parser.add_argument('--stream', action='store_true',
+                       help='Print agent steps and output tokens as they arrive')
+    parser.add_argument('--submit', action='store_true',
+                       help='Queue the --request as a background job for the worker pool and print its id')
+    parser.add_argument('--job', type=str,
+                       help='Show the status (and result, once finished) of a background job')
+    parser.add_argument('--wait', action='store_true',
+                       help='With --submit or --job, poll until the job finishes and print its result')
+    parser.add_argument('--jobs', action='store_true',
+                       help='List recent background jobs')
+    parser.add_argument('--job-workers', type=int, metavar='N',
+                       help='Run N worker processes for background jobs (until Ctrl+C)')
     
     args = parser.parse_args()
     
+    # Writing test files needs no API access
+    if args.create_test_data:
+        create_test_data()
+        return 0
+    
+    # Queueing and polling jobs only touch the job store; the workers call the LLM
+    if args.submit:
+        if not (args.request and args.files):
+            print("❌ --submit needs --request and --files")
+            return 1
+        from src.jobs.job_store import get_job_store
+        job_id = get_job_store().submit(args.request, args.files, args.labels, use_cache=not args.no_cache,
+                                        mode=args.mode, narrative=args.narrative)
+        print(f"📥 Queued {job_id}")
+        if args.wait:
+            return show_job(job_id, wait=True)
+        print(f"   Check it with: python cli_Demo.py --job {job_id} [--wait]")
+        return 0
+    
+    if args.job:
+        return show_job(args.job, wait=args.wait)
+    
+    if args.jobs:
+        from src.jobs.job_store import get_job_store
+        store = get_job_store()
+        for job in reversed(store.list()):
+            print_job(job)
+        print(f"📊 {', '.join(f'{count} {status}' for status, count in store.counts().items())}")
+        return 0
+    
     # Check for API key
     load_dotenv()
     if not os.getenv('OPENAI_API_KEY'):
         print("❌ OpenAI API key not found. Please set OPENAI_API_KEY in .env file")
         return 1
     
-    if args.create_test_data:
-        create_test_data()
+    if args.job_workers:
+        from src.jobs.worker_pool import WorkerPool
+        WorkerPool(args.job_workers).serve_forever()
         return 0
     
     if args.run_examples:
-        run_example_analyses()
+        run_example_analyses(use_cache=not args.no_cache, mode=args.mode, narrative=args.narrative)
         return 0
     
     if args.request and args.files:
+        from dynamic_demo import DynamicTrialBalanceSystem
         system = DynamicTrialBalanceSystem()
-        result = system.run_analysis(args.request, args.files, args.labels)
+        options = dict(use_cache=not args.no_cache, mode=args.mode, narrative=args.narrative)
+        if args.stream:
+            result = print_stream(system.stream_analysis(args.request, args.files, args.labels, **options))
+            return 0 if result else 1
+        try:
+            result = system.run_analysis(args.request, args.files, args.labels, **options)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
         return 0 if result else 1
     
     if args.interactive:
@@ -277,6 +374,7 @@ def quick_start():
     
     # Initialize system
     print("\n2️⃣  Initializing analysis system...")
+    from dynamic_demo import DynamicTrialBalanceSystem
     system = DynamicTrialBalanceSystem()
     
     # Run a quick demo
@@ -4,9 +4,16 @@ from dotenv import load_dotenv
 class DeepSeekConfig:
     """Fixed DeepSeek configuration for LiteLLM compatibility"""
     
+    DEFAULT_BASE_URL = "https://api.deepseek.com"
+    
+    _config = None
+    
     @staticmethod
-    def setup_environment():
-        """Setup environment with proper model naming for LiteLLM"""
+    def setup_environment(refresh: bool = False):
+        """Setup environment with proper model naming for LiteLLM (once per process unless refresh=True)"""
+        if DeepSeekConfig._config is not None and not refresh:
+            return dict(DeepSeekConfig._config)
+        
         load_dotenv()
         
         # Get the raw model name from env
@@ -21,9 +28,16 @@ class DeepSeekConfig:
         else:
             model_name = raw_model
         
+        # DEEPSEEK_BASE_URL points every client at another OpenAI-compatible
+        # endpoint, e.g. the local mock server (src/llm/mock_server.py)
+        base_url = os.getenv("DEEPSEEK_BASE_URL", DeepSeekConfig.DEFAULT_BASE_URL)
+        
         # Update environment with corrected model name
         os.environ["OPENAI_MODEL_NAME"] = model_name
-        os.environ["OPENAI_API_BASE"] = "https://api.deepseek.com"
+        os.environ["OPENAI_API_BASE"] = base_url
+        if base_url != DeepSeekConfig.DEFAULT_BASE_URL:
+            # LiteLLM's deepseek provider reads its own variable
+            os.environ["DEEPSEEK_API_BASE"] = base_url
         
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
@@ -31,13 +45,14 @@ class DeepSeekConfig:
         
         config = {
             "api_key": api_key,
-            "base_url": "https://api.deepseek.com", 
+            "base_url": base_url,
             "model": model_name,
             "temperature": float(os.getenv("DEEPSEEK_TEMPERATURE", "0.7")),
             "max_tokens": int(os.getenv("DEEPSEEK_MAX_TOKENS", "4000"))
         }
         
-        return config
+        DeepSeekConfig._config = config
+        return dict(config)
     
     @staticmethod
     def get_model_config():
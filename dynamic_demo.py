@@ -4,6 +4,9 @@
 
 import os
 import sys
+import asyncio
+import threading
+import time
 import pandas as pd
 import json
 from datetime import datetime, timedelta
@@ -15,6 +18,22 @@ import re
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
+from src.agents.agent_registry import get_agent_registry
+from src.llm.client import get_llm, get_streaming_llm
+from src.llm.resilience import get_llm_caller
+from src.llm.response_cache import ResponseCache, get_response_cache
+from src.runtime.analysis_handle import AnalysisHandle, get_prep_executor
+from src.runtime.streaming import AnalysisStream, agent_step_callback, langchain_token_handler, task_callback
+from src.runtime.telemetry import TelemetryCollector, current_collector, record_crew_usage, telemetry_task
+from src.tools.context_builder import ContextBuilder, estimate_tokens
+from src.tools.deterministic_analysis import ANALYSIS_MODES, DeterministicAnalyzer, recognize_intent
+from src.tools.period_index import index_by_period, period_slice
+
+# Upper bound on the prompt of one combined batch LLM call
+DEFAULT_BATCH_PROMPT_TOKENS = 6000
+
+_BATCH_ANSWER_PATTERN = re.compile(r'^\s*=+\s*ANSWER\s+(R\d+)\s*=+\s*$', re.MULTILINE | re.IGNORECASE)
+
 class DataSchemaMapper:
     """Maps different CSV schemas to a standardized format"""
     
@@ -195,7 +214,13 @@ class PeriodFilter:
             print("⚠️  No period column found, returning full dataset")
             return df
         
-        # Convert period column to datetime
+        # Loaded datasets are sorted by period: binary search for the window, no copy
+        filtered_df = period_slice(df, period_info['start_date'], period_info['end_date'])
+        if filtered_df is not None:
+            print(f"📅 Filtered to {period_info['description']}: {len(filtered_df)} records")
+            return filtered_df
+        
+        # Frames built elsewhere: convert period column to datetime
         df_copy = df.copy()
         df_copy['period_date'] = pd.to_datetime(df_copy['period'], errors='coerce')
         
@@ -221,6 +246,10 @@ class DynamicTrialBalanceSystem:
         self.schema_mapper = DataSchemaMapper()
         self.period_filter = PeriodFilter()
         self.loaded_datasets = {}
+        self.context_builder = ContextBuilder.from_environment()
+        self.deterministic_analyzer = DeterministicAnalyzer()
+        self.last_run_info = {}
+        self.last_batch_info = {}
         
     def load_user_data(self, file_paths: List[str], labels: List[str] = None) -> Dict[str, pd.DataFrame]:
         """Load multiple user data files with automatic schema detection"""
@@ -231,37 +260,50 @@ class DynamicTrialBalanceSystem:
         
         for i, file_path in enumerate(file_paths):
             label = labels[i]
-            
-            print(f"\n📂 Loading {label}: {file_path}")
-            
-            try:
-                # Load the file
-                if file_path.endswith('.xlsx'):
-                    df = pd.read_excel(file_path)
-                else:
-                    df = pd.read_csv(file_path)
-                
-                print(f"   📊 Raw data: {len(df)} rows, {len(df.columns)} columns")
-                print(f"   📋 Columns: {list(df.columns)}")
-                
-                # Detect and apply schema mapping
-                mapping = self.schema_mapper.detect_schema(df)
-                print(f"   🔗 Schema mapping: {mapping}")
-                
-                standardized_df = self.schema_mapper.standardize_dataframe(df, mapping)
-                print(f"   ✅ Standardized: {len(standardized_df)} rows")
-                
+            standardized_df = self._load_dataset(file_path, label)
+            if standardized_df is not None:
                 datasets[label] = standardized_df
-                
-            except Exception as e:
-                print(f"   ❌ Error loading {file_path}: {e}")
-                continue
         
         self.loaded_datasets = datasets
         return datasets
     
-    def process_user_request(self, request: str, datasets: Dict[str, pd.DataFrame] = None) -> str:
-        """Process natural language requests from users"""
+    def _load_dataset(self, file_path: str, label: str) -> Optional[pd.DataFrame]:
+        """Load one file and map it to the standard schema (None if it cannot be loaded)"""
+        print(f"\n📂 Loading {label}: {file_path}")
+        
+        try:
+            # Load the file
+            if file_path.endswith('.xlsx'):
+                df = pd.read_excel(file_path)
+            else:
+                df = pd.read_csv(file_path)
+            
+            print(f"   📊 Raw data: {len(df)} rows, {len(df.columns)} columns")
+            print(f"   📋 Columns: {list(df.columns)}")
+            
+            # Detect and apply schema mapping
+            mapping = self.schema_mapper.detect_schema(df)
+            print(f"   🔗 Schema mapping: {mapping}")
+            
+            standardized_df = self.schema_mapper.standardize_dataframe(df, mapping)
+            # Sorted, pre-parsed period index for the period filters
+            standardized_df = index_by_period(standardized_df)
+            print(f"   ✅ Standardized: {len(standardized_df)} rows")
+            
+            return standardized_df
+            
+        except Exception as e:
+            print(f"   ❌ Error loading {file_path}: {e}")
+            return None
+    
+    def process_user_request(self, request: str, datasets: Dict[str, pd.DataFrame] = None,
+                             shared: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Process natural language requests from users.
+        
+        shared (any dict) carries period-filtered frames and dataset digests
+        between requests over the same data, as in a batch.
+        """
         if datasets is None:
             datasets = self.loaded_datasets
         
@@ -288,141 +330,466 @@ class DynamicTrialBalanceSystem:
             print(f"⚠️  Could not parse period from request: {e}")
         
         # Filter datasets by period if specified
+        filtered_frames = shared.setdefault('filtered', {}) if shared is not None else {}
         filtered_datasets = {}
         for name, df in datasets.items():
             if period_info:
-                filtered_df = self.period_filter.filter_dataframe_by_period(df, period_info)
-                filtered_datasets[name] = filtered_df
+                key = (id(df), period_info['description'])
+                if key not in filtered_frames or filtered_frames[key][0] is not df:
+                    filtered_frames[key] = (df, self.period_filter.filter_dataframe_by_period(df, period_info))
+                filtered_datasets[name] = filtered_frames[key][1]
             else:
                 filtered_datasets[name] = df
         
         # Create analysis context
-        context = self._build_analysis_context(filtered_datasets, period_info, request)
+        digest_cache = shared.setdefault('digests', {}) if shared is not None else None
+        context = self._build_analysis_context(filtered_datasets, period_info, request, digest_cache)
         
         return context
     
-    def _build_analysis_context(self, datasets: Dict[str, pd.DataFrame], period_info: Dict = None, request: str = "") -> str:
-        """Build rich context for AI analysis"""
-        context_parts = []
+    def _build_analysis_context(self, datasets: Dict[str, pd.DataFrame], period_info: Dict = None, request: str = "",
+                                digest_cache: Optional[Dict] = None) -> str:
+        """Build a compact statistical digest of the datasets within the context token budget"""
+        context, stats = self.context_builder.build(datasets, period_info, request, digest_cache)
+        print(f"🧮 Analysis context: {stats['context_tokens']} tokens "
+              f"(budget {stats['token_budget']}, {stats['items_per_section']} items per section)")
+        return context
+    
+    def run_deterministic_analysis(self, request: str, datasets: Dict[str, pd.DataFrame] = None) -> Optional[Dict[str, Any]]:
+        """Compute a structured answer without the LLM (None if the request is not computable)"""
+        if datasets is None:
+            datasets = self.loaded_datasets
         
-        # Add request and period information
-        context_parts.append(f"USER REQUEST: {request}")
+        intent = recognize_intent(request)
+        if intent is None or not datasets:
+            return None
         
-        if period_info:
-            context_parts.append(f"ANALYSIS PERIOD: {period_info['description']} ({period_info['start_date']} to {period_info['end_date']})")
+        periods = []
+        for period_text in intent["period_texts"]:
+            try:
+                periods.append(self.period_filter.parse_period_request(period_text))
+            except ValueError as e:
+                print(f"⚠️  Could not parse period from request: {e}")
         
-        # Add dataset summaries
-        context_parts.append("\nDATASET INFORMATION:")
+        result = self.deterministic_analyzer.analyze(request, intent, datasets, periods)
+        print(f"⚡ Deterministic analysis ({', '.join(result['intents'])}) in {result['elapsed_ms']:.1f} ms - no LLM call")
+        return result
+    
+    def _resolve_deterministic(self, request: str, datasets: Dict[str, pd.DataFrame], mode: str) -> Optional[Dict[str, Any]]:
+        """Structured result when the request takes the deterministic path for this mode"""
+        if mode == 'agent':
+            return None
+        structured = self.run_deterministic_analysis(request, datasets)
+        if structured is None and mode == 'deterministic':
+            raise ValueError(f"Request cannot be computed without the AI agent: {request}")
+        return structured
+    
+    @staticmethod
+    def _wants_narrative(structured: Dict[str, Any], mode: str, narrative: bool) -> bool:
+        """Escalate to the agent when commentary was asked for explicitly or by the request (auto mode)"""
+        return narrative or (mode == 'auto' and structured["narrative_requested"])
+    
+    @staticmethod
+    def _check_mode(mode: str):
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode: {mode} (expected one of {list(ANALYSIS_MODES)})")
+    
+    def run_analysis(self, request: str, file_paths: List[str], file_labels: List[str] = None,
+                     use_cache: bool = True, mode: str = 'auto', narrative: bool = False,
+                     stream: Optional[AnalysisStream] = None):
+        """
+        Complete analysis pipeline.
+        
+        mode 'auto' answers computable requests (new accounts, variances,
+        categorization, validation) deterministically and sends everything else
+        to the AI agent; 'deterministic' and 'agent' force one path. With
+        narrative=True the agent adds commentary on the deterministic result.
+        use_cache=False forces a fresh AI response. Pass an AnalysisStream to
+        receive stage changes, agent steps and output tokens as they happen;
+        it is closed when the analysis ends.
+        """
+        try:
+            self._check_mode(mode)
+            with TelemetryCollector('dynamic_analysis').activate():
+                result = self._analysis_pipeline(request, file_paths, file_labels, use_cache, mode, narrative, stream)
+        except Exception as e:
+            if stream is not None:
+                stream.close(error=str(e))
+            raise
+        if stream is not None:
+            stream.close(result=result)
+        return result
+    
+    def stream_analysis(self, request: str, file_paths: List[str], file_labels: List[str] = None,
+                        **options) -> AnalysisStream:
+        """
+        Run an analysis on a background thread and return its event stream
+        right away. Iterate the stream for events; stream.result holds the
+        final text once it closes. Options are those of run_analysis.
+        """
+        stream = AnalysisStream()
         
-        total_accounts = 0
-        total_debits = 0
-        total_credits = 0
+        def run():
+            try:
+                self.run_analysis(request, file_paths, file_labels, stream=stream, **options)
+            except Exception as e:
+                print(f"❌ Analysis failed: {e}")
+                # Errors raised before the pipeline starts (e.g. bad options) must still end the stream
+                stream.close(error=str(e))
         
-        for name, df in datasets.items():
-            if len(df) == 0:
-                context_parts.append(f"\n{name}: No data for the specified period")
-                continue
-                
-            accounts = len(df)
-            debits = df['debit'].sum() if 'debit' in df.columns else 0
-            credits = df['credit'].sum() if 'credit' in df.columns else 0
-            
-            total_accounts += accounts
-            total_debits += debits
-            total_credits += credits
-            
-            context_parts.append(f"""
-{name}:
-- Accounts: {accounts}
-- Total Debits: ${debits:,.2f}
-- Total Credits: ${credits:,.2f}
-- Balance: ${debits - credits:,.2f}""")
-            
-            # Add sample transactions
-            if accounts > 0:
-                sample_accounts = df.head(5)[['account_number', 'account_name', 'debit', 'credit']].to_dict('records')
-                context_parts.append(f"- Sample accounts: {sample_accounts}")
-        
-        # Add summary
-        context_parts.append(f"""
-OVERALL SUMMARY:
-- Total accounts across all datasets: {total_accounts}
-- Combined debits: ${total_debits:,.2f}
-- Combined credits: ${total_credits:,.2f}
-- Net balance: ${total_debits - total_credits:,.2f}
-""")
-        
-        return "\n".join(context_parts)
-    
-    def run_analysis(self, request: str, file_paths: List[str], file_labels: List[str] = None):
-        """Complete analysis pipeline"""
+        threading.Thread(target=run, name='analysis-stream', daemon=True).start()
+        return stream
+    
+    @staticmethod
+    def _emit(stream: Optional[AnalysisStream], event_type: str, **fields):
+        if stream is not None:
+            stream.emit(event_type, **fields)
+    
+    def _analysis_pipeline(self, request: str, file_paths: List[str], file_labels: Optional[List[str]],
+                           use_cache: bool, mode: str, narrative: bool,
+                           stream: Optional[AnalysisStream]) -> Optional[str]:
         print("🚀 Starting Dynamic Trial Balance Analysis")
         print("=" * 60)
         
+        def report(stage: str, progress: float, message: str):
+            self._emit(stream, 'stage', stage=stage, progress=progress, message=message)
+        
         # Load data
+        report('loading', 0.0, "Loading data files")
         datasets = self.load_user_data(file_paths, file_labels)
         
         if not datasets:
             print("❌ No datasets loaded successfully")
             return None
         
-        # Process request
-        context = self.process_user_request(request, datasets)
-        
-        # Run AI analysis
-        result = self._run_ai_analysis(context, request)
+        report('preparing', 0.4, "Filtering periods and building context")
+        prepared = self._prepare_analysis(request, datasets, mode, narrative)
+        self._start_ai_stage(prepared, stream, report)
+        answer, run_info = None, {}
+        if prepared["llm_input"] is not None:
+            answer = self._run_ai_analysis(prepared["llm_input"], request, use_cache=use_cache, stream=stream)
+            run_info = self.last_run_info
+        result, run_info = self._finish_analysis(prepared, answer, run_info)
+        self.last_run_info = run_info
         
         # Save results
-        self._save_results(result, request, datasets)
+        report('saving', 0.95, "Saving results")
+        self._save_results(result, request, datasets, run_info, prepared["structured"])
+        report('completed', 1.0, "Analysis complete")
         
         return result
     
-    def _run_ai_analysis(self, context: str, request: str) -> str:
-        """Run AI analysis with CrewAI using DeepSeek API (FIXED)"""
-        try:
-            # Use the same DeepSeek configuration that works in simple_demo
-            from deepseek_config import DeepSeekConfig
-            config = DeepSeekConfig.setup_environment()
-            print(f"🤖 Using DeepSeek model: {config['model']}")
-            
-            from crewai import Agent, Task, Crew, Process
-            from langchain_openai import ChatOpenAI
-            
-            # Create LLM instance exactly like working simple_demo
-            llm = ChatOpenAI(
-                model=config["model"],
-                openai_api_base=config["base_url"],
-                openai_api_key=config["api_key"],
-                temperature=config["temperature"],
-                max_tokens=config["max_tokens"]
-            )
+    def _prepare_analysis(self, request: str, datasets: Dict[str, pd.DataFrame], mode: str,
+                          narrative: bool) -> Dict[str, Any]:
+        """
+        Route a request and prepare its AI input, for both the sync and async
+        pipelines. llm_input is the context (agent mode), the rendered
+        deterministic result (narrative) or None when no AI call is needed.
+        """
+        structured = self._resolve_deterministic(request, datasets, mode)
+        if structured is None:
+            return {"structured": None, "rendered": None, "analysis_mode": 'agent',
+                    "llm_input": self.process_user_request(request, datasets)}
+        rendered = self.deterministic_analyzer.render(structured)
+        if self._wants_narrative(structured, mode, narrative):
+            return {"structured": structured, "rendered": rendered, "analysis_mode": 'deterministic+narrative',
+                    "llm_input": rendered}
+        return {"structured": structured, "rendered": rendered, "analysis_mode": 'deterministic',
+                "llm_input": None}
+    
+    def _start_ai_stage(self, prepared: Dict[str, Any], stream: Optional[AnalysisStream], report):
+        """Stream the deterministic result and report the AI stage, if the prepared request has one"""
+        if prepared["rendered"] is not None:
+            self._emit(stream, 'token', text=prepared["rendered"], source='deterministic')
+        if prepared["llm_input"] is None:
+            print(prepared["rendered"])
+        elif prepared["structured"] is None:
+            report('analyzing', 0.5, "Running AI analysis")
+        else:
+            report('analyzing', 0.5, "Requesting narrative commentary")
+            self._emit(stream, 'token', text="\n\n🧠 Commentary:\n", source='deterministic')
+    
+    def _finish_analysis(self, prepared: Dict[str, Any], answer: Optional[str],
+                         run_info: Dict[str, Any]) -> tuple:
+        """Final result text and run info (with telemetry) for a prepared request and its AI answer"""
+        if prepared["llm_input"] is None:
+            result = prepared["rendered"]
+        elif prepared["structured"] is None:
+            result = answer
+        else:
+            result = f"{prepared['rendered']}\n\n🧠 Commentary:\n{answer}"
+        run_info = dict(run_info, analysis_mode=prepared["analysis_mode"], telemetry=self._telemetry_summary())
+        return result, run_info
+    
+    def run_batch_analysis(self, items: List[Dict[str, Any]], use_cache: bool = True, mode: str = 'auto',
+                           narrative: bool = False) -> List[Optional[str]]:
+        """
+        Analyze several requests together.
+        
+        items are dicts with 'request', 'files' and optional 'labels'. Each
+        distinct file is loaded once, and period filtering and dataset digests
+        are shared between requests. Requests that need the AI agent (and
+        cached answers aside) are answered in as few combined LLM calls as fit
+        BATCH_PROMPT_TOKENS, and the answers are split back per request.
+        Results are saved per request and returned in input order;
+        last_batch_info holds totals for the batch.
+        """
+        self._check_mode(mode)
+        with TelemetryCollector('batch_analysis').activate():
+            return self._batch_pipeline(items, use_cache, mode, narrative)
+    
+    def _batch_pipeline(self, items: List[Dict[str, Any]], use_cache: bool, mode: str,
+                        narrative: bool) -> List[Optional[str]]:
+        started = time.perf_counter()
+        print(f"🚀 Starting batch analysis of {len(items)} requests")
+        print("=" * 60)
+        
+        # Load each distinct file once
+        paths = list(dict.fromkeys(path for item in items for path in item["files"]))
+        frames = dict(zip(paths, get_prep_executor().map(lambda path: self._load_dataset(path, path), paths)))
+        
+        shared: Dict[str, Any] = {}
+        entries = []
+        for index, item in enumerate(items):
+            request = item["request"]
+            labels = item.get("labels") or [f"dataset_{i+1}" for i in range(len(item["files"]))]
+            datasets = {label: frames[path] for label, path in zip(labels, item["files"]) if frames[path] is not None}
+            entry = {"id": f"R{index + 1}", "request": request, "datasets": datasets,
+                     "result": None, "structured": None, "run_info": {}}
+            entries.append(entry)
+            if not datasets:
+                print(f"❌ {entry['id']}: no datasets loaded successfully")
+                continue
             
-            # Create specialized agent based on request type
-            if any(keyword in request.lower() for keyword in ['variance', 'compare', 'change']):
-                agent_role = 'Variance Analysis Expert'
-                agent_expertise = 'variance analysis, period-over-period comparisons, and identifying material changes'
-            elif any(keyword in request.lower() for keyword in ['new', 'added', 'missing']):
-                agent_role = 'Account Change Specialist'  
-                agent_expertise = 'detecting new accounts, missing transactions, and chart of accounts changes'
-            elif any(keyword in request.lower() for keyword in ['tax', 'provision', 'category']):
-                agent_role = 'Tax Provision Expert'
-                agent_expertise = 'tax categorization, provision calculations, and compliance requirements'
+            try:
+                structured = self._resolve_deterministic(request, datasets, mode)
+            except ValueError as e:
+                print(f"❌ {entry['id']}: {e}")
+                continue
+            if structured is None:
+                entry["context"] = self.process_user_request(request, datasets, shared)
+                entry["run_info"] = {"analysis_mode": "agent"}
             else:
-                agent_role = 'Senior Financial Analyst'
-                agent_expertise = 'comprehensive financial analysis, trial balance review, and business insights'
+                entry["structured"] = structured
+                entry["result"] = self.deterministic_analyzer.render(structured)
+                entry["run_info"] = {"analysis_mode": "deterministic"}
+                if self._wants_narrative(structured, mode, narrative):
+                    entry["context"] = entry["result"]
+                    entry["run_info"]["analysis_mode"] = "deterministic+narrative"
+        
+        pending = [entry for entry in entries if "context" in entry]
+        llm_calls, batch_tokens = self._answer_batch(pending, use_cache) if pending else (0, 0)
+        
+        for entry in entries:
+            if "answer" in entry:
+                if entry["structured"] is None:
+                    entry["result"] = entry["answer"]
+                else:
+                    entry["result"] = f"{entry['result']}\n\n🧠 Commentary:\n{entry['answer']}"
+            if entry["result"] is not None:
+                entry["run_info"]["telemetry"] = self._telemetry_summary(entry["id"])
+                self._save_results(entry["result"], entry["request"], entry["datasets"],
+                                   entry["run_info"], entry["structured"])
+        
+        self.last_batch_info = {
+            "requests": len(items),
+            "files_loaded": len(paths),
+            "file_references": sum(len(item["files"]) for item in items),
+            "deterministic": sum(1 for entry in entries if entry["structured"] is not None),
+            "llm_requests": len(pending),
+            "llm_calls": llm_calls,
+            "batch_prompt_tokens": batch_tokens,
+            # What the same uncached requests would have sent one by one
+            "unbatched_prompt_tokens": sum(entry["plan"]["prompt_tokens"] for entry in pending
+                                           if entry["plan"]["cached"] is None),
+            "seconds": round(time.perf_counter() - started, 3),
+            "telemetry": self._telemetry_summary()
+        }
+        info = self.last_batch_info
+        print(f"\n📦 Batch: {info['requests']} requests, {info['files_loaded']} files loaded "
+              f"({info['file_references']} references), {info['deterministic']} answered deterministically, "
+              f"{info['llm_requests']} via AI in {info['llm_calls']} LLM call(s), {info['seconds']:.2f}s")
+        if info["llm_calls"]:
+            print(f"   🧾 Prompt tokens {info['batch_prompt_tokens']} batched vs "
+                  f"{info['unbatched_prompt_tokens']} one request at a time")
+        return [entry["result"] for entry in entries]
+    
+    def _answer_batch(self, pending: List[Dict[str, Any]], use_cache: bool) -> tuple:
+        """Fill entry['answer'] for each pending entry; returns (LLM calls, prompt tokens sent)"""
+        todo = []
+        for entry in pending:
+            plan = self._plan_ai_analysis(entry["context"], entry["request"], use_cache)
+            entry["plan"] = plan
+            entry["run_info"].update(self._run_info(plan))
+            if plan["cached"] is not None:
+                print(f"⚡ {entry['id']}: cached analysis (no API call)")
+                entry["answer"] = plan["cached"]
+            else:
+                todo.append(entry)
+        
+        llm_calls = prompt_tokens = 0
+        for chunk in self._pack_batch(todo):
+            if len(chunk) == 1:
+                entry = chunk[0]
+                entry["answer"] = self._run_planned_analysis(entry["plan"], entry["id"])
+                llm_calls += 1
+                prompt_tokens += entry["plan"]["prompt_tokens"]
+                continue
             
-            analyst = Agent(
-                role=agent_role,
-                goal=f'Analyze the financial data and respond to the user request with expert insights',
-                backstory=f"""You are a highly experienced {agent_role.lower()} with 15+ years of experience in {agent_expertise}. 
-                You provide accurate, actionable insights and identify key risks and opportunities.""",
-                verbose=True,
-                allow_delegation=False,
-                llm=llm  # Pass the working LLM instance
-            )
+            task_description = self._build_batch_task_description(chunk)
+            chunk_tokens = estimate_tokens(task_description)
+            profiles = {self._select_analyst_profile(entry["request"]) for entry in chunk}
+            agent_role, agent_expertise = profiles.pop() if len(profiles) == 1 else \
+                self._select_analyst_profile("")
+            batch_id = f"batch-{chunk[0]['id']}-{chunk[-1]['id']}"
+            print(f"\n🤖 Answering {len(chunk)} requests in one call with {agent_role} "
+                  f"({chunk_tokens} prompt tokens)...")
+            print("-" * 50)
+            
+            try:
+                response = self._kickoff(task_description, agent_role, agent_expertise, task='batch',
+                                         requests=[entry["id"] for entry in chunk])
+            except Exception as e:
+                print(f"❌ Error in batch AI analysis: {e}")
+                response = ""
+            llm_calls += 1
+            prompt_tokens += chunk_tokens
             
-            analysis_task = Task(
-                description=f"""
+            answers = self._split_batch_response(response)
+            for entry in chunk:
+                answer = answers.get(entry["id"])
+                entry["run_info"]["batch"] = {"id": batch_id, "size": len(chunk), "prompt_tokens": chunk_tokens}
+                if answer:
+                    entry["answer"] = answer
+                    self._store_ai_result(entry["plan"], answer)
+                else:
+                    # Not answered in the combined response: ask on its own
+                    print(f"⚠️  {entry['id']} missing from the batch response, asking separately")
+                    entry["answer"] = self._run_planned_analysis(entry["plan"], entry["id"])
+                    llm_calls += 1
+                    prompt_tokens += entry["plan"]["prompt_tokens"]
+        return llm_calls, prompt_tokens
+    
+    def _run_planned_analysis(self, plan: Dict[str, Any], request_id: Optional[str] = None) -> str:
+        """Run one planned analysis that missed the cache"""
+        try:
+            print(f"\n🤖 Running AI Analysis with {plan['agent_role']} (DeepSeek)...")
+            result = self._kickoff(plan["task_description"], plan["agent_role"], plan["agent_expertise"],
+                                   requests=[request_id] if request_id else None)
+            self._store_ai_result(plan, result)
+            return result
+        except Exception as e:
+            print(f"❌ Error in AI analysis: {e}")
+            return f"Analysis failed: {e}"
+    
+    @staticmethod
+    def _data_block(context: str) -> str:
+        """Context without its request line, so requests over the same data share one block"""
+        first, _, rest = context.partition("\n")
+        return rest.strip() if first.startswith("USER REQUEST:") else context.strip()
+    
+    def _pack_batch(self, entries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Group entries into combined calls whose prompts stay under BATCH_PROMPT_TOKENS"""
+        limit = int(os.getenv('BATCH_PROMPT_TOKENS', DEFAULT_BATCH_PROMPT_TOKENS))
+        chunks, chunk, blocks, tokens = [], [], set(), 0
+        for entry in entries:
+            block = self._data_block(entry["context"])
+            cost = estimate_tokens(entry["request"]) + 10 + (0 if block in blocks else estimate_tokens(block))
+            if chunk and tokens + cost > limit:
+                chunks.append(chunk)
+                chunk, blocks, tokens = [], set(), 0
+                cost = estimate_tokens(entry["request"]) + 10 + estimate_tokens(block)
+            chunk.append(entry)
+            blocks.add(block)
+            tokens += cost
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+    
+    def run_analysis_async(self, request: str, file_paths: List[str], file_labels: List[str] = None,
+                           use_cache: bool = True, mode: str = 'auto', narrative: bool = False,
+                           stream: bool = False) -> AnalysisHandle:
+        """
+        Start an analysis on the running event loop and return its handle.
+        
+        File loading, period filtering and saving run on a worker pool and the
+        LLM call is awaited, so one event loop can drive many analyses at once.
+        Await the handle for the result, poll handle.status() or call
+        handle.cancel(). mode and narrative work as in run_analysis. With
+        stream=True, handle.stream receives stage changes, agent steps and
+        output tokens; streamed LLM calls are not hedged or retried after a
+        timeout, so leave it off unless something consumes the stream.
+        """
+        self._check_mode(mode)
+        handle = AnalysisHandle(request, stream=stream)
+        task = asyncio.get_running_loop().create_task(self._with_telemetry(
+            self._analysis_pipeline_async(handle, request, file_paths, file_labels, use_cache, mode, narrative)
+        ))
+        handle._attach(task)
+        return handle
+    
+    @staticmethod
+    async def _with_telemetry(coroutine):
+        """Await an analysis coroutine with a telemetry collector active in its task"""
+        with TelemetryCollector('dynamic_analysis').activate():
+            return await coroutine
+    
+    @staticmethod
+    def _telemetry_summary(request_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        collector = current_collector()
+        return collector.summary(request_id) if collector is not None else None
+    
+    async def _analysis_pipeline_async(self, handle: AnalysisHandle, request: str, file_paths: List[str],
+                                       file_labels: Optional[List[str]], use_cache: bool,
+                                       mode: str = 'auto', narrative: bool = False) -> Optional[str]:
+        """Async counterpart of run_analysis reporting progress to the handle"""
+        loop = asyncio.get_running_loop()
+        executor = get_prep_executor()
+        labels = file_labels or [f"dataset_{i+1}" for i in range(len(file_paths))]
+        
+        datasets = {}
+        for i, (file_path, label) in enumerate(zip(file_paths, labels)):
+            handle.update('loading', 0.4 * i / len(file_paths), f"Loading {label}")
+            df = await loop.run_in_executor(executor, self._load_dataset, file_path, label)
+            if df is not None:
+                datasets[label] = df
+        
+        if not datasets:
+            print("❌ No datasets loaded successfully")
+            handle.update('completed', 1.0, "No datasets loaded successfully")
+            return None
+        
+        handle.update('preparing', 0.4, "Filtering periods and building context")
+        prepared = await loop.run_in_executor(executor, self._prepare_analysis, request, datasets, mode, narrative)
+        self._start_ai_stage(prepared, handle.stream, handle.update)
+        answer, run_info = None, {}
+        if prepared["llm_input"] is not None:
+            answer, run_info = await self._run_ai_analysis_async(prepared["llm_input"], request, use_cache, handle)
+        # Telemetry is read on the loop, where the analysis task's collector is active
+        result, run_info = self._finish_analysis(prepared, answer, run_info)
+        
+        handle.update('saving', 0.95, "Saving results")
+        await loop.run_in_executor(executor, self._save_results, result, request, datasets, run_info,
+                                   prepared["structured"])
+        
+        handle.update('completed', 1.0, "Analysis complete")
+        return result
+    
+    @staticmethod
+    def _select_analyst_profile(request: str) -> tuple:
+        """Pick the specialist role and expertise for a request"""
+        if any(keyword in request.lower() for keyword in ['variance', 'compare', 'change']):
+            return 'Variance Analysis Expert', 'variance analysis, period-over-period comparisons, and identifying material changes'
+        elif any(keyword in request.lower() for keyword in ['new', 'added', 'missing']):
+            return 'Account Change Specialist', 'detecting new accounts, missing transactions, and chart of accounts changes'
+        elif any(keyword in request.lower() for keyword in ['tax', 'provision', 'category']):
+            return 'Tax Provision Expert', 'tax categorization, provision calculations, and compliance requirements'
+        return 'Senior Financial Analyst', 'comprehensive financial analysis, trial balance review, and business insights'
+    
+    @staticmethod
+    def _build_task_description(context: str, request: str) -> str:
+        """Prompt for the analysis task"""
+        return f"""
                 Analyze the provided financial data and respond to this specific user request:
                 
                 {request}
@@ -438,29 +805,243 @@ OVERALL SUMMARY:
                 5. Notes any data quality issues or limitations
                 
                 Be specific with numbers and provide clear reasoning for your conclusions.
-                """,
-                agent=analyst,
-                expected_output="A detailed analysis directly addressing the user's request with specific insights, findings, and recommendations"
-            )
-            
-            crew = Crew(
-                agents=[analyst],
-                tasks=[analysis_task],
-                process=Process.sequential,
-                verbose=True
-            )
+                """
+    
+    @classmethod
+    def _build_batch_task_description(cls, entries: List[Dict[str, Any]]) -> str:
+        """One prompt answering several requests, with each distinct data context listed once"""
+        blocks: Dict[str, str] = {}
+        request_lines = []
+        for entry in entries:
+            block = cls._data_block(entry["context"])
+            if block not in blocks:
+                blocks[block] = f"D{len(blocks) + 1}"
+            request_lines.append(f"{entry['id']} (data {blocks[block]}): {entry['request']}")
+        
+        data_sections = "\n\n".join(f"DATA CONTEXT {name}:\n{block}" for block, name in blocks.items())
+        answer_ids = ", ".join(entry["id"] for entry in entries)
+        return f"""
+                Analyze the provided financial data and respond to each of these {len(entries)} user requests:
+                
+                {chr(10).join(request_lines)}
+                
+                {data_sections}
+                
+                For each request provide a comprehensive response that:
+                1. Directly addresses that request
+                2. Highlights key findings and insights
+                3. Identifies any risks or opportunities
+                4. Provides actionable recommendations
+                5. Notes any data quality issues or limitations
+                
+                Be specific with numbers and provide clear reasoning for your conclusions.
+                Answer every request ({answer_ids}) in order. Start each answer with a line
+                containing only "=== ANSWER <id> ===", for example "=== ANSWER {entries[0]['id']} ===".
+                """
+    
+    @staticmethod
+    def _split_batch_response(response: str) -> Dict[str, str]:
+        """Answers by request id from a combined response"""
+        markers = list(_BATCH_ANSWER_PATTERN.finditer(response))
+        answers = {}
+        for i, marker in enumerate(markers):
+            end = markers[i + 1].start() if i + 1 < len(markers) else len(response)
+            answer = response[marker.end():end].strip()
+            if answer:
+                answers[marker.group(1).upper()] = answer
+        return answers
+    
+    @staticmethod
+    def _analyst(agent_role: str, agent_expertise: str, stream: Optional[AnalysisStream] = None):
+        """
+        Lease the analyst agent for one crew run from the process-wide registry
+        (context manager). Non-streaming runs reuse pooled agents; streaming runs
+        get a new agent with their own LLM and step callback.
+        """
+        registry = get_agent_registry()
+        name = f"analyst:{agent_role}"
+        if not registry.is_defined(name):
+            registry.define(name, lambda: dict(
+                role=agent_role,
+                goal='Analyze the financial data and respond to the user request with expert insights',
+                backstory=f"""You are a highly experienced {agent_role.lower()} with 15+ years of experience in {agent_expertise}. 
+            You provide accurate, actionable insights and identify key risks and opportunities.""",
+                verbose=True,
+                allow_delegation=False
+            ))
+        if stream is None:
+            # Shared LLM instance; its HTTP connections stay warm between analyses
+            return registry.lease(name, get_llm())
+        # Streaming LLM for this run's tokens, on the same connection pool
+        return registry.lease(name, get_streaming_llm([langchain_token_handler(stream, agent_role)]),
+                              step_callback=agent_step_callback(stream, agent_role))
+    
+    @staticmethod
+    def _build_crew(task_description: str, analyst, stream: Optional[AnalysisStream] = None):
+        """Bind this request's task to the leased analyst in a single-agent crew (reporting to stream if given)"""
+        from crewai import Task, Crew, Process
+        
+        crew_options = {}
+        if stream is not None:
+            crew_options["task_callback"] = task_callback(stream, analyst.role)
+        
+        analysis_task = Task(
+            description=task_description,
+            agent=analyst,
+            expected_output="A detailed analysis directly addressing the user's request with specific insights, findings, and recommendations"
+        )
+        
+        return Crew(
+            agents=[analyst],
+            tasks=[analysis_task],
+            process=Process.sequential,
+            verbose=True,
+            **crew_options
+        )
+    
+    def _kickoff(self, task_description: str, agent_role: str, agent_expertise: str,
+                 stream: Optional[AnalysisStream] = None, task: str = 'analysis',
+                 requests: Optional[List[str]] = None) -> str:
+        """
+        Run the analyst crew under the LLM deadline, retry and circuit breaker
+        policy, recorded as a telemetry task (serving the given request ids)
+        """
+        def attempt():
+            # A fresh crew and leased analyst per attempt: a timed-out one may still be running
+            with self._analyst(agent_role, agent_expertise, stream) as analyst:
+                crew = self._build_crew(task_description, analyst, stream)
+                result = str(crew.kickoff())
+            record_crew_usage(crew)
+            return result
+        
+        with telemetry_task(task, agent_role) as record:
+            if record is not None and requests:
+                record["requests"] = list(requests)
+            # A hedged duplicate or a retry after a timeout would interleave its tokens
+            # with those of the attempt still running
+            streaming = stream is not None
+            return get_llm_caller().call(attempt, hedge=False if streaming else None, retry_timeouts=not streaming)
+    
+    @staticmethod
+    def _stream_result(stream: Optional[AnalysisStream], result: str, tokens_before: int, source: str):
+        """Emit the whole response when it did not arrive as streamed tokens"""
+        if stream is None:
+            return
+        streamed = sum(1 for event in stream.events[tokens_before:] if event["type"] == 'token')
+        if not streamed:
+            stream.emit('token', text=result, source=source)
+    
+    def _plan_ai_analysis(self, context: str, request: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Resolve model settings, specialist, prompt and cached response for a request"""
+        # Use the same DeepSeek configuration that works in simple_demo
+        from deepseek_config import DeepSeekConfig
+        config = DeepSeekConfig.setup_environment()
+        print(f"🤖 Using DeepSeek model: {config['model']}")
+        
+        agent_role, agent_expertise = self._select_analyst_profile(request)
+        plan = {
+            "config": config,
+            "agent_role": agent_role,
+            "agent_expertise": agent_expertise,
+            "task_description": self._build_task_description(context, request),
+            "cache": get_response_cache(),
+            "prompt_tokens": 0,
+            "cache_key": None,
+            "cache_status": None,
+            "cached": None
+        }
+        
+        plan["prompt_tokens"] = estimate_tokens(plan["task_description"])
+        print(f"🧾 Prompt tokens: {plan['prompt_tokens']}")
+        
+        # Identical request + context for the same model settings, endpoint and role
+        # returns the stored response instead of another round trip
+        cache = plan["cache"]
+        if cache is not None:
+            plan["cache_key"] = ResponseCache.make_key(config["model"], config["temperature"],
+                                                       plan["task_description"], agent_role, config["base_url"])
+            if use_cache:
+                plan["cached"] = cache.get(plan["cache_key"])
+                plan["cache_status"] = 'hit' if plan["cached"] is not None else 'miss'
+            else:
+                cache.record_bypass()
+                plan["cache_status"] = 'bypass'
+        return plan
+    
+    @staticmethod
+    def _run_info(plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Per-run facts saved alongside the result"""
+        return {"llm_cache": plan["cache_status"], "prompt_tokens": plan["prompt_tokens"]}
+    
+    @staticmethod
+    def _store_ai_result(plan: Dict[str, Any], result: str):
+        """Cache a fresh analysis response"""
+        if plan["cache_key"] is not None:
+            plan["cache"].put(plan["cache_key"], result, model=plan["config"]["model"],
+                              agent_role=plan["agent_role"])
+    
+    def _run_ai_analysis(self, context: str, request: str, use_cache: bool = True,
+                         stream: Optional[AnalysisStream] = None) -> str:
+        """Run AI analysis with CrewAI using DeepSeek API, reusing cached responses"""
+        tokens_before = len(stream.events) if stream is not None else 0
+        try:
+            self.last_run_info = {}
+            plan = self._plan_ai_analysis(context, request, use_cache)
+            self.last_run_info = self._run_info(plan)
+            if plan["cached"] is not None:
+                print(f"⚡ Returning cached analysis from {plan['agent_role']} (no API call)")
+                self._stream_result(stream, plan["cached"], tokens_before, 'cache')
+                return plan["cached"]
             
-            print(f"\n🤖 Running AI Analysis with {agent_role} (DeepSeek)...")
+            print(f"\n🤖 Running AI Analysis with {plan['agent_role']} (DeepSeek)...")
             print("-" * 50)
             
-            result = crew.kickoff()
-            return str(result)
+            result = self._kickoff(plan["task_description"], plan["agent_role"], plan["agent_expertise"], stream)
+            self._store_ai_result(plan, result)
+            self._stream_result(stream, result, tokens_before, 'llm')
+            return result
             
         except Exception as e:
             print(f"❌ Error in AI analysis: {e}")
+            self._stream_result(stream, f"Analysis failed: {e}", tokens_before, 'error')
             return f"Analysis failed: {e}"
+    
+    async def _run_ai_analysis_async(self, context: str, request: str, use_cache: bool,
+                                     handle: AnalysisHandle) -> tuple:
+        """Async AI analysis; returns (result, run info)"""
+        loop = asyncio.get_running_loop()
+        executor = get_prep_executor()
+        stream = handle.stream
+        tokens_before = len(stream.events) if stream is not None else 0
+        run_info = {}
+        try:
+            plan = await loop.run_in_executor(executor, self._plan_ai_analysis, context, request, use_cache)
+            run_info = self._run_info(plan)
+            if plan["cached"] is not None:
+                print(f"⚡ Returning cached analysis from {plan['agent_role']} (no API call)")
+                self._stream_result(stream, plan["cached"], tokens_before, 'cache')
+                return plan["cached"], run_info
+            
+            handle.update('analyzing', 0.55, f"Waiting for {plan['agent_role']} (DeepSeek)")
+            
+            # Deadlines, retries and hedging run on a worker thread (carrying the
+            # telemetry context); the loop stays free
+            result = await asyncio.to_thread(self._kickoff, plan["task_description"],
+                                             plan["agent_role"], plan["agent_expertise"], stream)
+            await loop.run_in_executor(executor, self._store_ai_result, plan, result)
+            self._stream_result(stream, result, tokens_before, 'llm')
+            return result, run_info
+            
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Error in AI analysis: {e}")
+            self._stream_result(stream, f"Analysis failed: {e}", tokens_before, 'error')
+            return f"Analysis failed: {e}", run_info
         
-    def _save_results(self, result: str, request: str, datasets: Dict[str, pd.DataFrame]):
+    def _save_results(self, result: str, request: str, datasets: Dict[str, pd.DataFrame],
+                      run_info: Optional[Dict[str, Any]] = None,
+                      structured: Optional[Dict[str, Any]] = None) -> str:
         """Save analysis results"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
@@ -469,6 +1050,12 @@ OVERALL SUMMARY:
             "timestamp": timestamp,
             "user_request": request,
             "ai_analysis": result,
+            "analysis_mode": (run_info or {}).get("analysis_mode"),
+            "deterministic_result": structured,
+            "llm_cache": (run_info or {}).get("llm_cache"),
+            "prompt_tokens": (run_info or {}).get("prompt_tokens"),
+            "batch": (run_info or {}).get("batch"),
+            "telemetry": (run_info or {}).get("telemetry"),
             "datasets_summary": {
                 name: {
                     "record_count": len(df),
@@ -482,10 +1069,21 @@ OVERALL SUMMARY:
         os.makedirs('data/output', exist_ok=True)
         output_file = f"data/output/dynamic_analysis_{timestamp}.json"
         
-        with open(output_file, 'w') as f:
+        # Concurrent analyses can finish within the same second
+        suffix = 1
+        while True:
+            try:
+                f = open(output_file, 'x')
+                break
+            except FileExistsError:
+                output_file = f"data/output/dynamic_analysis_{timestamp}_{suffix}.json"
+                suffix += 1
+        
+        with f:
             json.dump(output_data, f, indent=2)
         
         print(f"\n📁 Results saved to: {output_file}")
+        return output_file
 
 def main():
     """Example usage of the dynamic system"""
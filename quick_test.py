@@ -35,15 +35,9 @@ def quick_user_request_test():
         
         # Run AI analysis using working configuration
         from crewai import Agent, Task, Crew, Process
-        from langchain_openai import ChatOpenAI
+        from src.llm.client import get_llm
         
-        llm = ChatOpenAI(
-            model=config["model"],
-            openai_api_base=config["base_url"],
-            openai_api_key=config["api_key"],
-            temperature=0.7,
-            max_tokens=1000
-        )
+        llm = get_llm(temperature=0.7, max_tokens=1000)
         
         analyst = Agent(
             role='Account Change Specialist',
@@ -48,16 +48,10 @@ def simple_crew_demo_deepseek():
         print(f"🤖 Using DeepSeek model: {config['model']}")
         
         from crewai import Agent, Task, Crew, Process
-        from langchain_openai import ChatOpenAI
+        from src.llm.client import get_llm
         
-        # Create LLM instance with proper configuration
-        llm = ChatOpenAI(
-            model=config["model"],
-            openai_api_base=config["base_url"],
-            openai_api_key=config["api_key"],
-            temperature=config["temperature"],
-            max_tokens=config["max_tokens"]
-        )
+        # Shared LLM instance with pooled connections
+        llm = get_llm()
         
         # Create agent with LLM instance
         data_analyst = Agent(
@@ -0,0 +1,112 @@
+# =============================================================================
+# File: src/agents/agent_registry.py
+# =============================================================================
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+
+def _agent(**fields):
+    """crewai Agent, imported on first use so loading this module stays cheap"""
+    from crewai import Agent
+    return Agent(**fields)
+
+
+class AgentRegistry:
+    """
+    Agent definitions and pools of built agents, shared by every run in the process.
+
+    A definition is registered as a factory returning the agent's fields
+    (role, goal, backstory, tools, ...). It is called once, so tool bindings
+    are resolved once per process. lease() hands a run an idle agent built
+    from the definition for the given LLM, or builds one, and takes it back
+    when the run ends. Long-running services (Streamlit, the scheduler, batch
+    runs) then build one agent per concurrent run instead of one per request.
+    An agent is leased to one run at a time. Tasks and crews stay per run and
+    bind to the leased agent. Leases with per-run overrides (e.g. a
+    streaming step_callback) get a throwaway agent from the cached definition.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._definitions: Dict[str, Dict[str, Any]] = {}
+        self._idle: Dict[tuple, List[Any]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self.stats = {"definitions": 0, "built": 0, "reused": 0, "discarded": 0}
+
+    def define(self, name: str, factory: Callable[[], Dict[str, Any]]):
+        """Register an agent definition (a name already defined keeps its first factory)"""
+        with self._lock:
+            self._factories.setdefault(name, factory)
+
+    def is_defined(self, name: str) -> bool:
+        return name in self._factories
+
+    def definition(self, name: str) -> Dict[str, Any]:
+        """The agent's fields, built by its factory on first use"""
+        definition = self._definitions.get(name)
+        if definition is None:
+            if name not in self._factories:
+                raise KeyError(f"No agent definition named '{name}'")
+            with self._lock:
+                definition = self._definitions.get(name)
+                if definition is None:
+                    definition = self._factories[name]()
+                    self._definitions[name] = definition
+                    self.stats["definitions"] += 1
+        return definition
+
+    def build(self, name: str, llm: Any, **overrides):
+        """A new agent from the cached definition"""
+        fields = dict(self.definition(name), llm=llm, **overrides)
+        fields["tools"] = list(fields.get("tools", ()))
+        agent = _agent(**fields)
+        with self._lock:
+            self.stats["built"] += 1
+        return agent
+
+    @contextmanager
+    def lease(self, name: str, llm: Any, **overrides):
+        """An agent for one run; pooled agents go back to the pool afterwards"""
+        if overrides:
+            yield self.build(name, llm, **overrides)
+            return
+
+        # The pool holds the agents, and they hold the LLM, so its id stays unique
+        key = (name, id(llm))
+        with self._lock:
+            idle = self._idle[key]
+            agent = idle.pop() if idle else None
+            if agent is not None:
+                self.stats["reused"] += 1
+        if agent is None:
+            agent = self.build(name, llm)
+        try:
+            yield agent
+        except BaseException:
+            # State left by a failed run is not worth trusting
+            with self._lock:
+                self.stats["discarded"] += 1
+            raise
+        with self._lock:
+            self._idle[key].append(agent)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, idle=sum(len(agents) for agents in self._idle.values()))
+
+
+_registry = None
+_lock = threading.Lock()
+
+
+def get_agent_registry() -> AgentRegistry:
+    """Process-wide registry shared by every entry point"""
+    global _registry
+    if _registry is None:
+        with _lock:
+            if _registry is None:
+                _registry = AgentRegistry()
+    return _registry
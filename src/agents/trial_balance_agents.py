@@ -1,92 +1,122 @@
-from crewai import Agent
-from src.tools.crew_tools import (
-    load_trial_balance, 
-    categorize_account, 
-    variance_analysis,
-    validate_compliance,
-    prepare_upload_format
-)
+from src.agents.agent_registry import get_agent_registry
+from src.llm.client import get_llm
+
+
+# crewai and the crew tools (pandas) are imported when the first agent is
+# built, so importing this module stays cheap
+
+def _tools(*names):
+    """Crew tool functions by name"""
+    from src.tools import crew_tools
+    return [getattr(crew_tools, name) for name in names]
+
+
+# Agent fields by registry name; tools are listed by crew tool function name
+AGENT_DEFINITIONS = {
+    'data_extractor': dict(
+        role='Data Extraction Specialist',
+        goal='Extract and validate trial balance data from various ERP systems',
+        backstory="""You are an expert in financial data extraction with 10+ years
+        of experience working with various ERP systems like SAP, Oracle, and NetSuite.
+        You ensure data quality and completeness before any processing begins.""",
+        tools=('load_trial_balance',),
+        verbose=True,
+        allow_delegation=False,
+        max_iter=2
+    ),
+    'categorization': dict(
+        role='Account Categorization Expert',
+        goal='Accurately categorize all accounts for tax reporting purposes',
+        backstory="""You are a senior tax accountant with deep knowledge of
+        chart of accounts structures and tax categorization rules. You ensure
+        every account is properly classified for accurate tax provision calculations.""",
+        tools=('categorize_account',),
+        verbose=True,
+        allow_delegation=False,
+        max_iter=3
+    ),
+    'new_account_identifier': dict(
+        role='New Account Detection Specialist',
+        goal='Identify and properly categorize new accounts that appear in current period',
+        backstory="""You are a financial analyst specialized in detecting changes
+        in chart of accounts. You have a keen eye for spotting new accounts and
+        understanding their business purpose for proper categorization.""",
+        tools=('variance_analysis', 'categorize_account'),
+        verbose=True,
+        # Runs in a single-agent crew, so there is no coworker to delegate to
+        allow_delegation=False,
+        max_iter=2
+    ),
+    'variance_analyzer': dict(
+        role='Financial Variance Analyst',
+        goal='Analyze period-over-period variances and identify material changes',
+        backstory="""You are a financial analyst with expertise in variance analysis.
+        You identify unusual fluctuations in account balances and provide insights
+        into potential causes, helping ensure accuracy in financial reporting.""",
+        tools=('variance_analysis',),
+        verbose=True,
+        allow_delegation=False,
+        max_iter=2
+    ),
+    'compliance_reviewer': dict(
+        role='Compliance and Quality Assurance Specialist',
+        goal='Ensure trial balance meets all compliance requirements and quality standards',
+        backstory="""You are a compliance officer with extensive experience in
+        financial controls and audit requirements. You perform final quality checks
+        to ensure data integrity and regulatory compliance.""",
+        tools=('validate_compliance',),
+        verbose=True,
+        allow_delegation=False,
+        max_iter=2
+    ),
+    'uploader': dict(
+        role='Tax Provision System Integration Specialist',
+        goal='Format and upload processed data to tax provision systems',
+        backstory="""You are a tax technology specialist who ensures seamless
+        integration with tax provision software like OneSource and Corptax.
+        You handle data formatting and upload validation.""",
+        tools=('prepare_upload_format',),
+        verbose=True,
+        allow_delegation=False,
+        max_iter=1
+    ),
+}
+
+
+def _definition(name):
+    """Registry factory: the agent's fields with its tools resolved"""
+    fields = AGENT_DEFINITIONS[name]
+    return lambda: dict(fields, tools=_tools(*fields['tools']))
+
 
 class TrialBalanceAgents:
-    
-    def __init__(self):
-        # Tools are now imported as functions
-        pass
-    
+
+    def __init__(self, llm=None):
+        # Every agent shares one pooled LLM client; definitions and tool bindings
+        # live in the process-wide registry, so later instances reuse them
+        self.llm = llm if llm is not None else get_llm()
+        self.registry = get_agent_registry()
+        for name in AGENT_DEFINITIONS:
+            self.registry.define(name, _definition(name))
+
+    def lease(self, name):
+        """Pooled agent for one run (context manager), e.g. lease('variance_analyzer')"""
+        return self.registry.lease(name, self.llm)
+
     def data_extractor_agent(self):
-        return Agent(
-            role='Data Extraction Specialist',
-            goal='Extract and validate trial balance data from various ERP systems',
-            backstory="""You are an expert in financial data extraction with 10+ years 
-            of experience working with various ERP systems like SAP, Oracle, and NetSuite. 
-            You ensure data quality and completeness before any processing begins.""",
-            tools=[load_trial_balance],
-            verbose=True,
-            allow_delegation=False,
-            max_iter=2
-        )
-    
+        return self.registry.build('data_extractor', self.llm)
+
     def categorization_agent(self):
-        return Agent(
-            role='Account Categorization Expert',
-            goal='Accurately categorize all accounts for tax reporting purposes',
-            backstory="""You are a senior tax accountant with deep knowledge of 
-            chart of accounts structures and tax categorization rules. You ensure 
-            every account is properly classified for accurate tax provision calculations.""",
-            tools=[categorize_account],
-            verbose=True,
-            allow_delegation=False,
-            max_iter=3
-        )
-    
+        return self.registry.build('categorization', self.llm)
+
     def new_account_identifier_agent(self):
-        return Agent(
-            role='New Account Detection Specialist',
-            goal='Identify and properly categorize new accounts that appear in current period',
-            backstory="""You are a financial analyst specialized in detecting changes 
-            in chart of accounts. You have a keen eye for spotting new accounts and 
-            understanding their business purpose for proper categorization.""",
-            tools=[variance_analysis, categorize_account],
-            verbose=True,
-            allow_delegation=True,
-            max_iter=2
-        )
-    
+        return self.registry.build('new_account_identifier', self.llm)
+
     def variance_analyzer_agent(self):
-        return Agent(
-            role='Financial Variance Analyst',
-            goal='Analyze period-over-period variances and identify material changes',
-            backstory="""You are a financial analyst with expertise in variance analysis. 
-            You identify unusual fluctuations in account balances and provide insights 
-            into potential causes, helping ensure accuracy in financial reporting.""",
-            tools=[variance_analysis],
-            verbose=True,
-            allow_delegation=False,
-            max_iter=2
-        )
-    
+        return self.registry.build('variance_analyzer', self.llm)
+
     def compliance_reviewer_agent(self):
-        return Agent(
-            role='Compliance and Quality Assurance Specialist',
-            goal='Ensure trial balance meets all compliance requirements and quality standards',
-            backstory="""You are a compliance officer with extensive experience in 
-            financial controls and audit requirements. You perform final quality checks 
-            to ensure data integrity and regulatory compliance.""",
-            tools=[validate_compliance],
-            verbose=True,
-            allow_delegation=False,
-            max_iter=2
-        )
-    
+        return self.registry.build('compliance_reviewer', self.llm)
+
     def uploader_agent(self):
-        return Agent(
-            role='Tax Provision System Integration Specialist',
-            goal='Format and upload processed data to tax provision systems',
-            backstory="""You are a tax technology specialist who ensures seamless 
-            integration with tax provision software like OneSource and Corptax. 
-            You handle data formatting and upload validation.""",
-            tools=[prepare_upload_format],
-            verbose=True,
-            allow_delegation=False,
-            max_iter=1
-        )
\ No newline at end of file
+        return self.registry.build('uploader', self.llm)
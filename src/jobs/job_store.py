@@ -0,0 +1,244 @@
+# =============================================================================
+# File: src/jobs/job_store.py
+# =============================================================================
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from src.runtime.analysis_handle import analysis_error
+
+JOB_DB_PATH = 'data/jobs/jobs.sqlite'
+
+# A running job whose worker has not sent a heartbeat for this long is requeued
+DEFAULT_STALE_SECONDS = 120.0
+
+# Runs of a job before a worker crash fails it instead of requeueing it
+DEFAULT_MAX_ATTEMPTS = 2
+
+JOB_STATUSES = ('queued', 'running', 'completed', 'failed', 'cancelled')
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    request TEXT NOT NULL,
+    files TEXT NOT NULL,
+    labels TEXT,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    run_info TEXT,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+"""
+
+_JSON_COLUMNS = ('files', 'labels', 'options', 'run_info')
+
+
+class JobStore:
+    """
+    Persistent queue of analysis jobs in SQLite.
+
+    Jobs are claimed in submission order by worker processes. A claim is one
+    write transaction, so two workers never get the same job. Workers report
+    stage and progress, send heartbeats while a job runs, and store its
+    result or error. A job whose worker died (no heartbeat for
+    stale_seconds) is requeued, up to max_attempts runs. Any process can
+    submit jobs and poll them, and the queue survives restarts.
+    """
+
+    def __init__(self, db_path: str = JOB_DB_PATH, stale_seconds: float = DEFAULT_STALE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets pollers read while workers write
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _write(self, sql: str, parameters=()) -> int:
+        return self._connection().execute(sql, parameters).rowcount
+
+    @staticmethod
+    def _job(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        for column in _JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def submit(self, request: str, files: List[str], labels: Optional[List[str]] = None, **options) -> str:
+        """Queue an analysis (options as for run_analysis) and return its job id"""
+        job_id = f"job-{uuid.uuid4().hex[:12]}"
+        # Workers may run from another directory than the submitter
+        files = [os.path.abspath(path) for path in files]
+        self._write(
+            'INSERT INTO jobs (id, request, files, labels, options, status, stage, message, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (job_id, request, json.dumps(files), json.dumps(labels), json.dumps(options),
+             'queued', 'queued', 'Waiting for a worker', time.time())
+        )
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job for worker, or None when the queue is empty"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' "
+                               "ORDER BY created_at LIMIT 1").fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', stage = 'starting', message = ?, worker = ?, "
+                    "attempts = attempts + 1, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                    (f"Picked up by {worker}", worker, now, now, row["id"])
+                )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return self.get(row["id"]) if row is not None else None
+
+    def update_progress(self, job_id: str, stage: str, progress: float, message: str = ''):
+        """Record a running job's stage and progress (also a heartbeat)"""
+        self._write("UPDATE jobs SET stage = ?, progress = MAX(progress, ?), message = ?, heartbeat_at = ? "
+                    "WHERE id = ? AND status = 'running'",
+                    (stage, min(progress, 1.0), message, time.time(), job_id))
+
+    def heartbeat(self, job_id: str):
+        self._write("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'", (time.time(), job_id))
+
+    def complete(self, job_id: str, worker: str, result: Optional[str],
+                 run_info: Optional[Dict[str, Any]] = None) -> bool:
+        """Store the result of worker's run; False when the job was requeued and is no longer worker's"""
+        # run_analysis reports no data (None) and AI failures ("Analysis failed: ...") without raising
+        error = analysis_error(result)
+        status = 'failed' if error else 'completed'
+        return self._write("UPDATE jobs SET status = ?, stage = ?, progress = 1.0, message = ?, result = ?, "
+                           "error = ?, run_info = ?, finished_at = ? WHERE id = ? AND status = 'running' "
+                           "AND worker = ?",
+                           (status, status, error or 'Analysis complete', result, error,
+                            json.dumps(run_info, default=str) if run_info is not None else None, time.time(),
+                            job_id, worker)) > 0
+
+    def fail(self, job_id: str, worker: str, error: str) -> bool:
+        """Fail worker's run of the job; False when the job is no longer worker's"""
+        return self._write("UPDATE jobs SET status = 'failed', stage = 'failed', message = ?, error = ?, "
+                           "finished_at = ? WHERE id = ? AND status = 'running' AND worker = ?",
+                           (error, error, time.time(), job_id, worker)) > 0
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job; a job already running finishes"""
+        return self._write("UPDATE jobs SET status = 'cancelled', stage = 'cancelled', message = 'Cancelled', "
+                           "finished_at = ? WHERE id = ? AND status = 'queued'", (time.time(), job_id)) > 0
+
+    def requeue_stale(self) -> int:
+        """Requeue running jobs whose worker stopped sending heartbeats (failing them after max_attempts)"""
+        cutoff = time.time() - self.stale_seconds
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            failed = conn.execute(
+                "UPDATE jobs SET status = 'failed', stage = 'failed', message = ?, error = ?, finished_at = ? "
+                "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                ('Worker stopped responding', 'Worker stopped responding', time.time(), cutoff, self.max_attempts)
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'queued', progress = 0, "
+                "message = 'Requeued after worker stopped responding', worker = NULL "
+                "WHERE status = 'running' AND heartbeat_at < ?", (cutoff,)
+            ).rowcount
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        if requeued or failed:
+            print(f"⚠️  Jobs from unresponsive workers: {requeued} requeued, {failed} failed")
+        return requeued
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._job(self._connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first, without their results"""
+        query = ('SELECT id, request, status, stage, progress, message, error, worker, attempts, '
+                 'created_at, started_at, finished_at FROM jobs')
+        parameters = []
+        if status is not None:
+            query += ' WHERE status = ?'
+            parameters.append(status)
+        query += ' ORDER BY created_at DESC LIMIT ?'
+        parameters.append(limit)
+        return [dict(row) for row in self._connection().execute(query, parameters)]
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll_interval: float = 1.0,
+             on_progress=None) -> Dict[str, Any]:
+        """Poll until the job finishes; on_progress(job) is called whenever its stage or progress changes"""
+        ends_at = None if timeout is None else time.monotonic() + timeout
+        seen = None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                raise KeyError(f"No job with id '{job_id}'")
+            if on_progress is not None and (job["stage"], job["progress"], job["message"]) != seen:
+                seen = (job["stage"], job["progress"], job["message"])
+                on_progress(job)
+            if job["status"] in FINISHED_STATUSES:
+                return job
+            if ends_at is not None and time.monotonic() >= ends_at:
+                raise TimeoutError(f"Job {job_id} still {job['status']} after {timeout:.0f}s")
+            time.sleep(poll_interval)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        counts = {status: 0 for status in JOB_STATUSES}
+        for row in self._connection().execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status'):
+            counts[row["status"]] = row["n"]
+        return counts
+
+
+_default_store: Optional[JobStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """Process-wide job store at JOB_DB_PATH (stale timeout from JOB_STALE_SECONDS)"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = JobStore(
+                    db_path=os.getenv('JOB_DB_PATH', JOB_DB_PATH),
+                    stale_seconds=float(os.getenv('JOB_STALE_SECONDS', DEFAULT_STALE_SECONDS)),
+                    max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS))
+                )
+    return _default_store
@@ -0,0 +1,185 @@
+# =============================================================================
+# File: src/jobs/worker_pool.py
+# =============================================================================
+
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from typing import List, Optional
+
+from src.jobs.job_store import get_job_store
+
+DEFAULT_WORKERS = 2
+
+# Seconds between heartbeats of a worker running a job
+HEARTBEAT_SECONDS = 10.0
+
+# Minimum seconds between progress writes for agent steps
+STEP_UPDATE_SECONDS = 2.0
+
+
+def _report_progress(store, job_id: str):
+    """AnalysisStream listener writing stage changes and (throttled) agent steps to the job"""
+    state = {"stage": 'starting', "progress": 0.0, "written_at": 0.0}
+
+    def on_event(event):
+        now = time.monotonic()
+        if event["type"] == 'stage':
+            state.update(stage=event["stage"], progress=event["progress"], written_at=now)
+            store.update_progress(job_id, event["stage"], event["progress"], event["message"])
+        elif event["type"] == 'step' and now - state["written_at"] >= STEP_UPDATE_SECONDS:
+            state["written_at"] = now
+            store.update_progress(job_id, state["stage"], state["progress"],
+                                  f"{event['agent']}: {event['text'][:200]}")
+    return on_event
+
+
+def _heartbeat(store, job_id: str, done: threading.Event):
+    while not done.wait(HEARTBEAT_SECONDS):
+        store.heartbeat(job_id)
+
+
+def run_job(system, store, job) -> None:
+    """Run one claimed job with system and store its outcome"""
+    from src.runtime.streaming import AnalysisStream
+
+    stream = AnalysisStream()
+    stream.on_event(_report_progress(store, job["id"]))
+    done = threading.Event()
+    threading.Thread(target=_heartbeat, args=(store, job["id"], done), name='job-heartbeat', daemon=True).start()
+    try:
+        result = system.run_analysis(job["request"], job["files"], job["labels"], stream=stream, **job["options"])
+        stored = store.complete(job["id"], job["worker"], result, getattr(system, 'last_run_info', None))
+    except Exception as e:
+        print(f"❌ {job['id']} failed: {e}")
+        stored = store.fail(job["id"], job["worker"], str(e))
+    finally:
+        done.set()
+    if not stored:
+        print(f"⚠️  {job['id']} was requeued while {job['worker']} ran it; result discarded")
+
+
+def _worker_main(name: str, stop, poll_interval: float, workers: int = 1):
+    """Worker process: claim and run jobs until stop is set"""
+    from dynamic_demo import DynamicTrialBalanceSystem
+    from src.llm.rate_limiter import RateLimiter, set_rate_limiter
+
+    # The LLM_RPM / LLM_TPM budget is for the whole pool; each worker process gets its share
+    set_rate_limiter(RateLimiter.from_environment(shares=workers))
+    store = get_job_store()
+    # One system per process; later jobs reuse its data cache, LLM clients and pooled agents
+    system = DynamicTrialBalanceSystem()
+    print(f"👷 {name} ready (pid {os.getpid()})")
+    while not stop.is_set():
+        store.requeue_stale()
+        job = store.claim(name)
+        if job is None:
+            stop.wait(poll_interval)
+            continue
+        print(f"👷 {name} running {job['id']}: {job['request']}")
+        run_job(system, store, job)
+
+
+class WorkerPool:
+    """
+    Worker processes running queued analysis jobs.
+
+    Each worker claims the oldest queued job, runs it through
+    DynamicTrialBalanceSystem.run_analysis and writes progress, heartbeats
+    and the result to the job store. Throughput grows with the number of
+    workers, within the LLM_RPM / LLM_TPM budget, which is split evenly
+    between the worker processes. Workers are separate processes, so a job
+    survives the UI or CLI session that submitted it. Workers that die are restarted by supervise(), and their
+    job is requeued once its heartbeat goes stale.
+    """
+
+    def __init__(self, workers: Optional[int] = None, poll_interval: float = 1.0):
+        self.workers = workers or int(os.getenv('JOB_WORKERS', DEFAULT_WORKERS))
+        self.poll_interval = poll_interval
+        # Spawned, not forked: the parent may hold threads and open connections
+        self._context = multiprocessing.get_context('spawn')
+        self._stop = self._context.Event()
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * self.workers
+
+    def _start_worker(self, index: int):
+        process = self._context.Process(target=_worker_main, name=f"analysis-worker-{index + 1}",
+                                        args=(f"worker-{os.getpid()}-{index + 1}", self._stop, self.poll_interval,
+                                              self.workers),
+                                        daemon=True)
+        process.start()
+        self._processes[index] = process
+
+    def start(self) -> 'WorkerPool':
+        for index in range(self.workers):
+            self._start_worker(index)
+        print(f"👷 Started {self.workers} analysis worker(s)")
+        return self
+
+    def alive(self) -> int:
+        return sum(1 for process in self._processes if process is not None and process.is_alive())
+
+    def supervise(self) -> int:
+        """Restart workers that exited unexpectedly; returns how many were restarted"""
+        restarted = 0
+        if self._stop.is_set():
+            return restarted
+        for index, process in enumerate(self._processes):
+            if process is not None and not process.is_alive():
+                print(f"⚠️  {process.name} exited with code {process.exitcode}; restarting")
+                self._start_worker(index)
+                restarted += 1
+        return restarted
+
+    def supervise_in_background(self, interval: float = 5.0) -> 'WorkerPool':
+        """Call supervise() every interval seconds from a daemon thread until the pool stops"""
+        def loop():
+            while not self._stop.wait(interval):
+                self.supervise()
+        threading.Thread(target=loop, name='worker-pool-supervisor', daemon=True).start()
+        return self
+
+    def stop(self, timeout: float = 30.0):
+        """Let workers finish their current job, then stop them (terminating any still busy after timeout)"""
+        self._stop.set()
+        ends_at = time.monotonic() + timeout
+        for process in self._processes:
+            if process is not None:
+                process.join(max(0.0, ends_at - time.monotonic()))
+                if process.is_alive():
+                    # Its job is requeued once the heartbeat goes stale
+                    process.terminate()
+                    process.join()
+
+    def serve_forever(self, supervise_interval: float = 5.0):
+        """Run the pool in the foreground until interrupted"""
+        self.start()
+        try:
+            while True:
+                time.sleep(supervise_interval)
+                self.supervise()
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping workers after their current job...")
+        finally:
+            self.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run analysis workers for queued jobs')
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f'Worker processes (default: JOB_WORKERS or {DEFAULT_WORKERS})')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='Seconds an idle worker waits before checking the queue again')
+    args = parser.parse_args()
+    WorkerPool(args.workers, args.poll_interval).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# =============================================================================
+# File: src/llm/client.py
+# =============================================================================
+
+import atexit
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from deepseek_config import DeepSeekConfig
+from src.llm.rate_limiter import rate_limit_callback_handler
+from src.runtime.telemetry import usage_callback_handler
+
+# Connection pool limits shared by every LLM client in the process
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 120.0
+DEFAULT_TIMEOUT = 120.0
+
+_lock = threading.Lock()
+_llms: Dict[tuple, Any] = {}
+_openai_clients: Dict[tuple, Any] = {}
+_http_client = None
+_async_http_client = None
+
+
+def pool_settings() -> Dict[str, float]:
+    """Connection pool limits, overridable through LLM_* environment variables"""
+    return {
+        "max_connections": int(os.getenv('LLM_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS)),
+        "max_keepalive_connections": int(os.getenv('LLM_MAX_KEEPALIVE', DEFAULT_MAX_KEEPALIVE)),
+        "keepalive_expiry": float(os.getenv('LLM_KEEPALIVE_EXPIRY', DEFAULT_KEEPALIVE_EXPIRY)),
+        "timeout": float(os.getenv('LLM_TIMEOUT', DEFAULT_TIMEOUT))
+    }
+
+
+def _pool_arguments():
+    import httpx
+
+    settings = pool_settings()
+    limits = httpx.Limits(
+        max_connections=settings["max_connections"],
+        max_keepalive_connections=settings["max_keepalive_connections"],
+        keepalive_expiry=settings["keepalive_expiry"]
+    )
+    return {"limits": limits, "timeout": httpx.Timeout(settings["timeout"])}
+
+
+def get_http_client():
+    """Process-wide keep-alive httpx.Client used by every LLM client"""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                import httpx
+                _http_client = httpx.Client(**_pool_arguments())
+    return _http_client
+
+
+def get_async_http_client():
+    """Process-wide keep-alive httpx.AsyncClient for async LLM calls"""
+    global _async_http_client
+    if _async_http_client is None:
+        with _lock:
+            if _async_http_client is None:
+                import httpx
+                _async_http_client = httpx.AsyncClient(**_pool_arguments())
+    return _async_http_client
+
+
+def get_llm(temperature: Optional[float] = None, max_tokens: Optional[int] = None, **overrides):
+    """
+    Return a shared ChatOpenAI for the DeepSeek configuration.
+
+    Instances are cached per (model, base URL, API key, temperature, max_tokens,
+    overrides) and all of them send requests through the same pooled HTTP
+    client, so repeated analyses reuse warm TLS connections instead of
+    re-reading .env and reconnecting.
+    """
+    config = DeepSeekConfig.setup_environment()
+    temperature = config["temperature"] if temperature is None else temperature
+    max_tokens = config["max_tokens"] if max_tokens is None else max_tokens
+    key = (config["model"], config["base_url"], config["api_key"], temperature, max_tokens,
+           tuple(sorted(overrides.items())))
+
+    llm = _llms.get(key)
+    if llm is None:
+        from langchain_openai import ChatOpenAI
+
+        http_client = get_http_client()
+        async_http_client = get_async_http_client()
+        with _lock:
+            llm = _llms.get(key)
+            if llm is None:
+                llm = ChatOpenAI(
+                    model=config["model"],
+                    openai_api_base=config["base_url"],
+                    openai_api_key=config["api_key"],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    http_client=http_client,
+                    http_async_client=async_http_client,
+                    callbacks=[rate_limit_callback_handler(), usage_callback_handler()],
+                    **overrides
+                )
+                _llms[key] = llm
+    return llm
+
+
+def get_streaming_llm(callbacks: list, temperature: Optional[float] = None, max_tokens: Optional[int] = None):
+    """
+    Return a streaming ChatOpenAI that reports tokens to the given LangChain
+    callbacks. Each call builds a new instance, because the callbacks belong
+    to one analysis. Connections still come from the shared pool.
+    """
+    from langchain_openai import ChatOpenAI
+
+    config = DeepSeekConfig.setup_environment()
+    return ChatOpenAI(
+        model=config["model"],
+        openai_api_base=config["base_url"],
+        openai_api_key=config["api_key"],
+        temperature=config["temperature"] if temperature is None else temperature,
+        max_tokens=config["max_tokens"] if max_tokens is None else max_tokens,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+        streaming=True,
+        callbacks=[rate_limit_callback_handler()] + list(callbacks) + [usage_callback_handler()]
+    )
+
+
+def get_openai_client():
+    """Return a shared OpenAI SDK client for direct chat completion calls"""
+    config = DeepSeekConfig.setup_environment()
+    key = (config["base_url"], config["api_key"])
+
+    client = _openai_clients.get(key)
+    if client is None:
+        from openai import OpenAI
+
+        http_client = get_http_client()
+        with _lock:
+            client = _openai_clients.get(key)
+            if client is None:
+                client = OpenAI(api_key=config["api_key"], base_url=config["base_url"], http_client=http_client)
+                _openai_clients[key] = client
+    return client
+
+
+def close_llm_clients():
+    """Drop cached clients and close the shared connection pool"""
+    global _http_client, _async_http_client
+    with _lock:
+        _llms.clear()
+        _openai_clients.clear()
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+        # The async client's connections are released with the process; closing
+        # it needs a running event loop
+        _async_http_client = None
+
+
+atexit.register(close_llm_clients)
@@ -0,0 +1,388 @@
+# =============================================================================
+# File: src/llm/mock_server.py
+# =============================================================================
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from src.tools.context_builder import estimate_tokens
+
+DEFAULT_RESPONSE = (
+    "Summary of findings: the trial balance was reviewed against the prior period. "
+    "Material variances were identified in receivables, revenue and cost of sales, and new accounts "
+    "were mapped to their tax categories. Recommendation: confirm the drivers of each material "
+    "variance with the account owners and document the support before the provision is finalized."
+)
+
+_WORD_PATTERN = re.compile(r'\S+\s*')
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode()).hexdigest()
+
+
+class LatencyModel:
+    """
+    Time-to-first-token distribution.
+
+    Specs look like 'fixed:0.5', 'uniform:0.2,1.0', 'normal:1.0,0.3' or
+    'lognormal:1.0,0.5' (median and sigma), all in seconds.
+    """
+
+    DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'lognormal')
+
+    def __init__(self, distribution: str = 'fixed', a: float = 0.0, b: float = 0.0, seed: Optional[int] = None):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution} (expected one of {list(self.DISTRIBUTIONS)})")
+        self.distribution = distribution
+        self.a = a
+        self.b = b
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> 'LatencyModel':
+        name, _, values = spec.partition(':')
+        if not values:
+            # A bare number is a fixed latency
+            return cls('fixed', float(name), seed=seed)
+        numbers = [float(value) for value in values.split(',')]
+        return cls(name, numbers[0], numbers[1] if len(numbers) > 1 else 0.0, seed=seed)
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.distribution == 'fixed':
+                value = self.a
+            elif self.distribution == 'uniform':
+                value = self._random.uniform(self.a, self.b)
+            elif self.distribution == 'normal':
+                value = self._random.gauss(self.a, self.b)
+            else:
+                value = self.a * self._random.lognormvariate(0.0, self.b)
+        return max(0.0, value)
+
+    def __repr__(self):
+        return f"{self.distribution}:{self.a:g},{self.b:g}"
+
+
+class ResponseScript:
+    """
+    Chooses the completion text for a prompt.
+
+    Recorded exchanges ({"prompt": ..., "response": ...}) answer that exact
+    prompt; scripted rules ({"match": regex, "response": ...}) answer the
+    first prompt they match, in order. Anything else gets the default response.
+    """
+
+    def __init__(self, rules: Optional[List[Dict[str, str]]] = None, default: str = DEFAULT_RESPONSE):
+        self.default = default
+        self.recorded: Dict[str, str] = {}
+        self.rules = []
+        for rule in rules or []:
+            if 'prompt' in rule:
+                self.recorded[prompt_hash(rule['prompt'])] = rule['response']
+            else:
+                self.rules.append((re.compile(rule['match'], re.IGNORECASE | re.DOTALL), rule['response']))
+
+    @classmethod
+    def from_file(cls, path: str) -> 'ResponseScript':
+        """Load rules from a JSON list or a JSONL file (one rule per line)"""
+        with open(path, 'r') as f:
+            text = f.read()
+        if text.lstrip().startswith('['):
+            rules = json.loads(text)
+        else:
+            rules = [json.loads(line) for line in text.splitlines() if line.strip()]
+        defaults = [rule['response'] for rule in rules if rule.get('default')]
+        rules = [rule for rule in rules if not rule.get('default')]
+        return cls(rules, defaults[0] if defaults else DEFAULT_RESPONSE)
+
+    def respond(self, prompt: str) -> str:
+        recorded = self.recorded.get(prompt_hash(prompt))
+        if recorded is not None:
+            return recorded
+        for pattern, response in self.rules:
+            if pattern.search(prompt):
+                return response
+        return self.default
+
+
+class _MockLLMHandler(BaseHTTPRequestHandler):
+    """Request handler for the OpenAI-compatible mock endpoints"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._respond(200, {"object": "list", "data": [
+                {"id": model, "object": "model", "owned_by": "mock"} for model in self.server.mock.models
+            ]})
+        else:
+            self._respond(404, {"error": {"message": f"unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        mock = self.server.mock
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._respond(404, {"error": {"message": f"unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+        try:
+            payload = json.loads(body)
+            messages = payload["messages"]
+        except (ValueError, KeyError):
+            self._respond(400, {"error": {"message": "invalid chat completion request", "type": "invalid_request_error"}})
+            return
+
+        mock._begin()
+        try:
+            error = mock.injected_error()
+            if error is not None:
+                status, message = error
+                headers = {"Retry-After": "0"} if status == 429 else None
+                self._respond(status, {"error": {"message": message, "type": "mock_injected_error"}}, headers)
+                return
+
+            prompt = "\n".join(str(message.get("content") or "") for message in messages)
+            text = mock.script.respond(prompt)
+            usage = {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(text)}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            retry_after = mock.quota_exceeded(usage["total_tokens"])
+            if retry_after is not None:
+                self._respond(429, {"error": {"message": "Rate limit reached for requests", "type": "requests"}},
+                              {"Retry-After": f"{retry_after:.0f}"})
+                return
+            mock._record(usage, bool(payload.get("stream")))
+
+            time.sleep(mock.latency.sample())
+            model = payload.get("model") or mock.models[0]
+            if payload.get("stream"):
+                include_usage = bool((payload.get("stream_options") or {}).get("include_usage"))
+                self._stream(model, text, usage if include_usage else None)
+            else:
+                time.sleep(mock.generation_seconds(usage["completion_tokens"]))
+                self._respond(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": usage
+                })
+        finally:
+            mock._end()
+
+    def _stream(self, model: str, text: str, usage: Optional[Dict[str, int]]):
+        """Send the completion as server-sent events, one word per chunk at the throttled token rate"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, extra: Optional[Dict] = None):
+            event = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            event.update(extra or {})
+            self._write_chunk(f"data: {json.dumps(event)}\n\n")
+
+        chunk({"role": "assistant", "content": ""})
+        for piece in _WORD_PATTERN.findall(text):
+            delay = self.server.mock.generation_seconds(estimate_tokens(piece))
+            if delay:
+                time.sleep(delay)
+            chunk({"content": piece})
+        chunk({}, "stop")
+        if usage is not None:
+            event = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": [], "usage": usage}
+            self._write_chunk(f"data: {json.dumps(event)}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text: str):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _respond(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockLLMServer:
+    """
+    Local OpenAI-compatible chat completions server for offline benchmarks.
+
+    Serves POST .../chat/completions (plain and SSE streaming) and GET
+    .../models on any path prefix. Responses come from a ResponseScript; each
+    request waits a time-to-first-token sampled from the latency model, then
+    generates at tokens_per_second (0 = instant). error_rate of requests fail
+    with one of error_statuses. rpm_limit and tpm_limit enforce a provider
+    quota over a sliding minute, answering 429 with Retry-After beyond it.
+    Point the app at it with
+    DEEPSEEK_BASE_URL=<server.url>. Use as a context manager.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: Optional[LatencyModel] = None,
+                 tokens_per_second: float = 0.0, error_rate: float = 0.0, error_statuses=(429, 500, 503),
+                 script: Optional[ResponseScript] = None, models=('deepseek-chat',), seed: Optional[int] = None,
+                 rpm_limit: int = 0, tpm_limit: int = 0):
+        self.latency = latency or LatencyModel()
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.script = script or ResponseScript()
+        self.models = list(models)
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.stats = {"requests": 0, "streamed": 0, "injected_errors": 0, "quota_rejections": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0, "in_flight": 0, "peak_in_flight": 0}
+        self._window = deque()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _MockLLMHandler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'MockLLMServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def generation_seconds(self, tokens: int) -> float:
+        return tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def injected_error(self) -> Optional[tuple]:
+        """(status, message) when this request should fail"""
+        with self._lock:
+            if not self.error_rate or self._random.random() >= self.error_rate:
+                return None
+            self.stats["requests"] += 1
+            self.stats["injected_errors"] += 1
+            status = self._random.choice(self.error_statuses)
+        return status, "Rate limit reached" if status == 429 else "Injected server error"
+
+    def quota_exceeded(self, tokens: int) -> Optional[float]:
+        """Seconds to retry after if this request breaks the per-minute quota, else None (and count it)"""
+        if not self.rpm_limit and not self.tpm_limit:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            while self._window and self._window[0][0] <= now - 60:
+                self._window.popleft()
+            used_tokens = sum(entry[1] for entry in self._window)
+            if (self.rpm_limit and len(self._window) >= self.rpm_limit) or \
+                    (self.tpm_limit and used_tokens + tokens > self.tpm_limit and self._window):
+                self.stats["requests"] += 1
+                self.stats["quota_rejections"] += 1
+                return max(1.0, self._window[0][0] + 60 - now)
+            self._window.append((now, tokens))
+        return None
+
+    def _begin(self):
+        with self._lock:
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+
+    def _end(self):
+        with self._lock:
+            self.stats["in_flight"] -= 1
+
+    def _record(self, usage: Dict[str, int], streamed: bool):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["streamed"] += int(streamed)
+            self.stats["prompt_tokens"] += usage["prompt_tokens"]
+            self.stats["completion_tokens"] += usage["completion_tokens"]
+
+
+def main():
+    """Run the mock LLM server in the foreground"""
+    parser = argparse.ArgumentParser(description='Local OpenAI-compatible mock LLM server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8799)
+    parser.add_argument('--latency', default='fixed:0',
+                        help="Time to first token: 'fixed:S', 'uniform:LO,HI', 'normal:MEAN,SD' or 'lognormal:MEDIAN,SIGMA'")
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help='Generation speed (0 = instant)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with an error')
+    parser.add_argument('--error-statuses', type=int, nargs='+', default=[429, 500, 503])
+    parser.add_argument('--rpm-limit', type=int, default=0, help='Requests per minute before 429s (0 = unlimited)')
+    parser.add_argument('--tpm-limit', type=int, default=0, help='Tokens per minute before 429s (0 = unlimited)')
+    parser.add_argument('--script', help='JSON/JSONL file of scripted rules and recorded exchanges')
+    parser.add_argument('--seed', type=int, help='Seed for latency and error sampling')
+    args = parser.parse_args()
+
+    server = MockLLMServer(
+        args.host, args.port,
+        latency=LatencyModel.parse(args.latency, seed=args.seed),
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_statuses=args.error_statuses,
+        script=ResponseScript.from_file(args.script) if args.script else None,
+        seed=args.seed,
+        rpm_limit=args.rpm_limit,
+        tpm_limit=args.tpm_limit
+    )
+    print(f"🤖 Mock LLM server listening on {server.url}")
+    print(f"   Latency {server.latency}, {args.tokens_per_second or 'unthrottled'} tokens/s, "
+          f"error rate {args.error_rate:.0%}")
+    print(f"   Set DEEPSEEK_BASE_URL={server.url} to use it")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+        print(f"📊 {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
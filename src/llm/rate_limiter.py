@@ -0,0 +1,302 @@
+# =============================================================================
+# File: src/llm/rate_limiter.py
+# =============================================================================
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+# Completion tokens reserved per call until real completions have been observed
+DEFAULT_COMPLETION_RESERVE = 500
+
+# Prompt tokens assumed per call until real usage has been observed
+DEFAULT_PROMPT_ESTIMATE = 2500
+
+# Pause after a 429 without a Retry-After header
+DEFAULT_RATE_LIMIT_PAUSE = 5.0
+
+_acquire_listener: contextvars.ContextVar = contextvars.ContextVar('rate_limit_acquire_listener', default=None)
+
+
+@contextmanager
+def on_acquire(listener):
+    """Call listener() whenever a request made in this context passes the limiter"""
+    token = _acquire_listener.set(listener)
+    try:
+        yield
+    finally:
+        _acquire_listener.reset(token)
+
+
+class TokenBucket:
+    """
+    Refills at per_minute / 60 units per second up to capacity (one minute's
+    quota by default). Not thread-safe; RateLimiter serializes access.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, amount: float, now: float, clamp: bool = True) -> float:
+        """
+        Seconds until amount units are available. An amount above capacity
+        waits for a full bucket, or never fits (inf) with clamp=False.
+        """
+        self._refill(now)
+        if amount > self.capacity and not clamp:
+            return float('inf')
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+    def adjust(self, amount: float):
+        """Return (positive) or charge (negative) units once the real usage is known"""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Client-side requests-per-minute and tokens-per-minute budget.
+
+    Every LLM request acquires one request and its estimated tokens (the
+    prompt plus the mean completion seen so far) before it is sent, waiting
+    in FIFO order while either bucket is short. Once the response reports its
+    usage, the token bucket is corrected by the difference. A 429 pauses all
+    requests for the Retry-After time. A limit of 0 disables that bucket.
+    burst_seconds caps how much unused quota accumulates (a full minute by
+    default; lower it for providers that also enforce per-second limits).
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, completion_reserve: int = DEFAULT_COMPLETION_RESERVE,
+                 burst_seconds: float = 60.0):
+        self.requests = TokenBucket(rpm, max(1.0, rpm * burst_seconds / 60)) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm, tpm * burst_seconds / 60) if tpm > 0 else None
+        self.completion_reserve = completion_reserve
+        self._condition = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned = set()
+        self._paused_until = 0.0
+        self._usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self.stats = {"acquired": 0, "waited": 0, "waiting": 0, "peak_waiting": 0, "wait_seconds": 0.0,
+                      "max_wait_seconds": 0.0, "rate_limited": 0}
+
+    @classmethod
+    def from_environment(cls, shares: int = 1) -> 'RateLimiter':
+        """Limiter configured by LLM_RPM, LLM_TPM (unset or 0 = unlimited), LLM_COMPLETION_RESERVE
+        and LLM_RATE_BURST_SECONDS; with shares > 1 it gets that fraction of the RPM and TPM budget"""
+        shares = max(1, shares)
+        return cls(rpm=float(os.getenv('LLM_RPM', '0')) / shares, tpm=float(os.getenv('LLM_TPM', '0')) / shares,
+                   completion_reserve=int(os.getenv('LLM_COMPLETION_RESERVE', DEFAULT_COMPLETION_RESERVE)),
+                   burst_seconds=float(os.getenv('LLM_RATE_BURST_SECONDS', '60')))
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def expected_completion(self) -> int:
+        """Mean completion tokens observed so far, or the configured reserve"""
+        with self._condition:
+            calls, tokens = self._usage["calls"], self._usage["completion_tokens"]
+        return round(tokens / calls) if calls else self.completion_reserve
+
+    def expected_request(self) -> int:
+        """Mean prompt plus completion tokens of a call, for admission estimates"""
+        with self._condition:
+            calls, tokens = self._usage["calls"], self._usage["prompt_tokens"]
+        return (round(tokens / calls) if calls else DEFAULT_PROMPT_ESTIMATE) + self.expected_completion()
+
+    def _delay(self, tokens: int, now: float, requests: int = 1, clamp: bool = True) -> float:
+        delay = self._paused_until - now
+        if self.requests is not None:
+            delay = max(delay, self.requests.time_until(requests, now, clamp))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.time_until(tokens, now, clamp))
+        return max(delay, 0.0)
+
+    def time_until(self, tokens: int, requests: int = 1) -> float:
+        """
+        Seconds until requests totalling tokens could be sent at once, ignoring
+        waiters ahead of them (inf if they exceed the burst capacity)
+        """
+        if not self.enabled:
+            return 0.0
+        with self._condition:
+            return self._delay(tokens, time.monotonic(), requests, clamp=False)
+
+    def acquire(self, tokens: int) -> float:
+        """Block until the request fits both budgets, take it and return the seconds waited"""
+        listener = _acquire_listener.get()
+        if listener is not None:
+            listener()
+        if not self.enabled:
+            return 0.0
+        started = time.monotonic()
+        with self._condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self.stats["waiting"] += 1
+            self.stats["peak_waiting"] = max(self.stats["peak_waiting"], self.stats["waiting"])
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = self._delay(tokens, now) if ticket == self._serving else None
+                    if delay == 0.0:
+                        break
+                    self._condition.wait(delay)
+                if self.requests is not None:
+                    self.requests.take(1, now)
+                if self.tokens is not None:
+                    self.tokens.take(tokens, now)
+            finally:
+                self.stats["waiting"] -= 1
+                # Hand the turn on, skipping waiters that gave up (interrupted)
+                if ticket == self._serving:
+                    self._serving += 1
+                    while self._serving in self._abandoned:
+                        self._abandoned.discard(self._serving)
+                        self._serving += 1
+                else:
+                    self._abandoned.add(ticket)
+                self._condition.notify_all()
+
+            waited = time.monotonic() - started
+            self.stats["acquired"] += 1
+            self.stats["waited"] += waited > 0.001
+            self.stats["wait_seconds"] += waited
+            self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+        return waited
+
+    def settle(self, reserved: int, prompt_tokens: int, completion_tokens: int):
+        """Correct the token bucket by the difference between reserved and actual usage"""
+        with self._condition:
+            self._usage["calls"] += 1
+            self._usage["prompt_tokens"] += prompt_tokens
+            self._usage["completion_tokens"] += completion_tokens
+            if self.tokens is not None:
+                self.tokens.adjust(reserved - prompt_tokens - completion_tokens)
+                self._condition.notify_all()
+
+    def pause(self, seconds: float):
+        """Hold every request for seconds (after the provider answered 429)"""
+        with self._condition:
+            self.stats["rate_limited"] += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            stats = dict(self.stats)
+            now = time.monotonic()
+            if self.requests is not None:
+                self.requests._refill(now)
+                stats["requests_available"] = round(self.requests.level, 1)
+            if self.tokens is not None:
+                self.tokens._refill(now)
+                stats["tokens_available"] = round(self.tokens.level)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 3)
+        return stats
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds to wait if error is a 429, from its Retry-After header when present"""
+    response = getattr(error, 'response', None)
+    status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    if status != 429 and type(error).__name__ != 'RateLimitError':
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return float(os.getenv('LLM_RATE_LIMIT_PAUSE', DEFAULT_RATE_LIMIT_PAUSE))
+
+
+_limiter: Optional[RateLimiter] = None
+_handler = None
+_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter shared by every LLM client"""
+    global _limiter
+    if _limiter is None:
+        with _lock:
+            if _limiter is None:
+                _limiter = RateLimiter.from_environment()
+    return _limiter
+
+
+def set_rate_limiter(limiter: RateLimiter) -> Optional[RateLimiter]:
+    """Replace the process-wide limiter (e.g. new limits between runs); returns the previous one"""
+    global _limiter
+    with _lock:
+        previous, _limiter = _limiter, limiter
+    return previous
+
+
+def rate_limit_callback_handler():
+    """
+    LangChain handler holding each LLM request until the process-wide
+    limiter admits it, then settling the reservation with the real usage
+    """
+    global _handler
+    if _handler is not None:
+        return _handler
+    with _lock:
+        if _handler is not None:
+            return _handler
+
+        from langchain_core.callbacks import BaseCallbackHandler
+        from src.runtime.telemetry import record_rate_limit_wait
+        from src.tools.context_builder import estimate_tokens
+
+        class _RateLimitHandler(BaseCallbackHandler):
+            def __init__(self):
+                self._reserved: Dict[Any, int] = {}
+
+            def _acquire(self, run_id, prompt_tokens: int):
+                limiter = get_rate_limiter()
+                if not limiter.enabled:
+                    return
+                reserved = prompt_tokens + limiter.expected_completion()
+                self._reserved[run_id] = reserved
+                record_rate_limit_wait(limiter.acquire(reserved))
+
+            def on_llm_start(self, serialized, prompts, *, run_id=None, **kwargs):
+                self._acquire(run_id, sum(estimate_tokens(prompt) for prompt in prompts))
+
+            def on_chat_model_start(self, serialized, messages, *, run_id=None, **kwargs):
+                self._acquire(run_id, sum(estimate_tokens(str(message.content))
+                                          for batch in messages for message in batch))
+
+            def on_llm_end(self, response, *, run_id=None, **kwargs):
+                reserved = self._reserved.pop(run_id, None)
+                if reserved is None:
+                    return
+                usage = (response.llm_output or {}).get("token_usage") or {}
+                if usage.get("prompt_tokens") is not None:
+                    get_rate_limiter().settle(reserved, usage["prompt_tokens"], usage.get("completion_tokens") or 0)
+
+            def on_llm_error(self, error, *, run_id=None, **kwargs):
+                self._reserved.pop(run_id, None)
+                pause = _retry_after(error)
+                if pause is not None:
+                    print(f"⚠️  LLM rate limited; pausing requests for {pause:.0f}s")
+                    get_rate_limiter().pause(pause)
+
+        _handler = _RateLimitHandler()
+    return _handler
@@ -0,0 +1,319 @@
+# =============================================================================
+# File: src/llm/resilience.py
+# =============================================================================
+
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Optional
+
+from src.runtime.telemetry import LLMAttempt, llm_attempt
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+# Exception class names used by openai, httpx and litellm for transient failures
+RETRYABLE_ERRORS = {
+    'APITimeoutError', 'APIConnectionError', 'RateLimitError', 'InternalServerError',
+    'ServiceUnavailableError', 'Timeout', 'TimeoutException', 'ConnectError', 'ConnectTimeout',
+    'ReadTimeout', 'ReadError', 'RemoteProtocolError', 'ConnectionError', 'DeadlineExceeded'
+}
+
+_RETRYABLE_MESSAGES = ('rate limit', 'timed out', 'timeout', 'temporarily unavailable', 'overloaded',
+                       'connection reset', 'connection aborted', '502', '503', '504')
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an LLM call does not finish within its deadline"""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the LLM while the circuit breaker is open"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for timeouts, connection errors, rate limits and 5xx responses (checked along the cause chain)"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in RETRYABLE_ERRORS:
+            return True
+        status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+        if isinstance(status, int):
+            return status in RETRYABLE_STATUSES
+        if any(text in str(error).lower() for text in _RETRYABLE_MESSAGES):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 20) -> Optional[float]:
+        """Latency percentile, or None until min_samples calls have completed"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing LLM endpoint.
+
+    After failure_threshold consecutive retryable failures the circuit opens
+    and calls fail fast with CircuitOpenError. After reset_seconds, one trial
+    call is let through (half-open): success closes the circuit and failure
+    opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may proceed"""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            remaining = self._opened_at + self.reset_seconds - time.monotonic()
+            if self.state == 'open' and remaining <= 0:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return
+            raise CircuitOpenError(f"LLM circuit open after {self._failures} consecutive failures; "
+                                   f"retry in {max(remaining, 0):.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                if self.state != 'open':
+                    print(f"⚠️  LLM circuit opened after {self._failures} consecutive failures")
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+
+def _start_thread(fn: Callable[[], Any]) -> Future:
+    """Run fn on a daemon thread, so a hung call cannot block interpreter exit"""
+    future = Future()
+    context = contextvars.copy_context()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(context.run(fn))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name='llm-call', daemon=True).start()
+    return future
+
+
+class ResilientCaller:
+    """
+    Runs LLM calls with a deadline, retries, optional hedging and a circuit breaker.
+
+    Each attempt is bounded by call_timeout and the whole call, retries
+    included, by deadline. Retryable failures back off exponentially with
+    full jitter (a random wait up to backoff_base * 2**attempt, capped at
+    backoff_max). With hedging on, an attempt that outlives the observed p95
+    latency (or hedge_after seconds before enough samples exist) gets one
+    duplicate request and the first success wins.
+
+    fn must build whatever it calls afresh each time (e.g. a new Crew), because
+    retries and hedges invoke it again while an earlier call may still run.
+    Timed-out calls cannot be killed; they finish in the background and are
+    ignored. Their token usage, like that of a losing hedge, is recorded as
+    discarded telemetry instead of against the task. Calls whose fn shares
+    state an abandoned attempt would keep using (a live stream, a Task
+    object) pass retry_timeouts=False: a timeout then fails the call instead
+    of starting a second attempt alongside it.
+    """
+
+    def __init__(self, call_timeout: float = 120.0, deadline: float = 300.0, max_retries: int = 2,
+                 backoff_base: float = 1.0, backoff_max: float = 20.0, hedge: bool = False,
+                 hedge_after: float = 30.0, hedge_percentile: float = 95.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "timeouts": 0, "hedges": 0,
+                      "hedge_wins": 0, "failures": 0, "circuit_rejections": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls) -> 'ResilientCaller':
+        """Caller configured by LLM_CALL_TIMEOUT, LLM_DEADLINE, LLM_MAX_RETRIES, LLM_BACKOFF_BASE,
+        LLM_BACKOFF_MAX, LLM_HEDGE, LLM_HEDGE_AFTER, LLM_BREAKER_FAILURES and LLM_BREAKER_RESET"""
+        return cls(
+            call_timeout=float(os.getenv('LLM_CALL_TIMEOUT', '120')),
+            deadline=float(os.getenv('LLM_DEADLINE', '300')),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', '2')),
+            backoff_base=float(os.getenv('LLM_BACKOFF_BASE', '1.0')),
+            backoff_max=float(os.getenv('LLM_BACKOFF_MAX', '20')),
+            hedge=os.getenv('LLM_HEDGE', '').lower() in ('1', 'true', 'yes'),
+            hedge_after=float(os.getenv('LLM_HEDGE_AFTER', '30')),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv('LLM_BREAKER_FAILURES', '5')),
+                reset_seconds=float(os.getenv('LLM_BREAKER_RESET', '30'))
+            )
+        )
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def hedge_delay(self) -> float:
+        """Seconds before a duplicate request is sent"""
+        observed = self.latency.percentile(self.hedge_percentile)
+        return observed if observed is not None else self.hedge_after
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def call(self, fn: Callable[[], Any], hedge: Optional[bool] = None, deadline: Optional[float] = None,
+             retry_timeouts: bool = True) -> Any:
+        """Call fn() under the policy; hedge/deadline override the defaults for this call"""
+        hedge = self.hedge if hedge is None else hedge
+        ends_at = time.monotonic() + (self.deadline if deadline is None else deadline)
+        self._count("calls")
+
+        attempt = 0
+        while True:
+            try:
+                self.breaker.allow()
+            except CircuitOpenError:
+                self._count("circuit_rejections")
+                raise
+
+            remaining = ends_at - time.monotonic()
+            try:
+                result = self._attempt(fn, min(self.call_timeout, remaining), hedge)
+            except Exception as e:
+                retryable = is_retryable(e)
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    # The endpoint answered; the request itself was bad
+                    self.breaker.record_success()
+                wait_seconds = self.backoff(attempt)
+                # A timed-out attempt is still running; only retry when fn() shares nothing with it
+                abandoned = isinstance(e, DeadlineExceeded) and not retry_timeouts
+                if not retryable or abandoned or attempt >= self.max_retries or time.monotonic() + wait_seconds >= ends_at:
+                    self._count("failures")
+                    raise
+                attempt += 1
+                self._count("retries")
+                print(f"⚠️  LLM call failed ({type(e).__name__}: {e}); retry {attempt}/{self.max_retries} "
+                      f"in {wait_seconds:.1f}s")
+                time.sleep(wait_seconds)
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    def _attempt(self, fn: Callable[[], Any], timeout: float, hedge: bool) -> Any:
+        """One attempt, plus a hedged duplicate when the first is slower than the hedge delay"""
+        if timeout <= 0:
+            raise DeadlineExceeded("LLM call deadline exceeded")
+        started = time.monotonic()
+        ends_at = started + timeout
+
+        def timed(usage: LLMAttempt):
+            call_started = time.monotonic()
+            with llm_attempt(usage):
+                result = fn()
+            self.latency.record(time.monotonic() - call_started)
+            return result
+
+        futures, usages = {}, {}
+
+        def start(name: str):
+            usage = LLMAttempt()
+            future = _start_thread(lambda: timed(usage))
+            futures[future], usages[future] = name, usage
+
+        self._count("attempts")
+        start('primary')
+        if hedge:
+            done, _ = wait(futures, timeout=min(self.hedge_delay(), timeout))
+            if not done:
+                self._count("hedges")
+                start('hedge')
+
+        last_error = None
+        try:
+            while futures:
+                done, _ = wait(futures, timeout=max(0.0, ends_at - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    name = futures.pop(future)
+                    # Failed attempts count too: their errors are real
+                    usages[future].settle(counted=True)
+                    if future.exception() is None:
+                        if name == 'hedge':
+                            self._count("hedge_wins")
+                        return future.result()
+                    last_error = future.exception()
+            if futures:
+                self._count("timeouts")
+                raise DeadlineExceeded(f"LLM call exceeded {timeout:.1f}s")
+            raise last_error
+        finally:
+            # Attempts still running lost the race or outlived the timeout; their usage is discarded
+            for future in futures:
+                usages[future].settle(counted=False)
+
+
+_caller: Optional[ResilientCaller] = None
+_caller_lock = threading.Lock()
+
+
+def get_llm_caller() -> ResilientCaller:
+    """Process-wide caller, so every entry point shares one circuit breaker and latency history"""
+    global _caller
+    if _caller is None:
+        with _caller_lock:
+            if _caller is None:
+                _caller = ResilientCaller.from_environment()
+    return _caller
@@ -0,0 +1,170 @@
+# =============================================================================
+# File: src/llm/response_cache.py
+# =============================================================================
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+RESPONSE_CACHE_PATH = 'data/cache/llm_responses.sqlite'
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    model TEXT,
+    agent_role TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_accessed REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_accessed ON responses (last_accessed);
+"""
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache of LLM responses.
+
+    Entries are keyed by (model, endpoint, temperature, prompt hash, agent
+    role), so answers from one API (e.g. the local mock server) are never
+    served for another; they expire
+    after ttl_seconds and are evicted least-recently-used once the stored
+    responses exceed max_bytes. Backed by SQLite so every process (CLI runs,
+    Streamlit sessions) shares it.
+    """
+
+    def __init__(self, db_path: str = RESPONSE_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bypassed": 0}
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt: str, agent_role: str, base_url: str) -> str:
+        """Content address of a request to the API at base_url"""
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        material = json.dumps([model, base_url.rstrip('/'), float(temperature), prompt_hash, agent_role])
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response, or None on a miss or expired entry"""
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute('SELECT response, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None or now - row[1] > self.ttl_seconds:
+            if row is not None:
+                with conn:
+                    conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._count("evictions")
+            self._count("misses")
+            return None
+
+        with conn:
+            conn.execute('UPDATE responses SET last_accessed = ?, hits = hits + 1 WHERE key = ?', (now, key))
+        self._count("hits")
+        return row[0]
+
+    def put(self, key: str, response: str, model: str = None, agent_role: str = None):
+        """Store a response and evict expired / least-recently-used entries over budget"""
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(key, response, model, agent_role, size, created_at, last_accessed, hits) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, 0)',
+                (key, response, model, agent_role, size, now, now)
+            )
+        self._count("stores")
+        self._evict(now)
+
+    def record_bypass(self):
+        self._count("bypassed")
+
+    def _evict(self, now: float):
+        conn = self._connection()
+        with conn:
+            evicted = conn.execute('DELETE FROM responses WHERE created_at < ?',
+                                   (now - self.ttl_seconds,)).rowcount
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total > self.max_bytes:
+                # Walk from the least recently used entry until back under budget
+                victims = []
+                for key, size in conn.execute('SELECT key, size FROM responses ORDER BY last_accessed'):
+                    if total <= self.max_bytes:
+                        break
+                    victims.append((key,))
+                    total -= size
+                conn.executemany('DELETE FROM responses WHERE key = ?', victims)
+                evicted += len(victims)
+        if evicted:
+            self._count("evictions", evicted)
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM responses')
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus the current size of the cache"""
+        entries, total = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total
+        })
+        return stats
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache, or None when LLM_CACHE_DISABLED is set"""
+    global _default_cache
+    if os.getenv('LLM_CACHE_DISABLED', '').lower() in ('1', 'true', 'yes'):
+        return None
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ResponseCache(
+                    db_path=os.getenv('LLM_CACHE_PATH', RESPONSE_CACHE_PATH),
+                    ttl_seconds=float(os.getenv('LLM_CACHE_TTL_HOURS', '168')) * 3600,
+                    max_bytes=int(float(os.getenv('LLM_CACHE_MAX_MB', '50')) * 1024 * 1024)
+                )
+    return _default_cache
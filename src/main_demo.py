@@ -2,19 +2,24 @@ import os
 import sys
 from datetime import datetime
 import json
+from contextlib import ExitStack
 import pandas as pd
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from crewai import Crew, Process
 from src.agents.trial_balance_agents import TrialBalanceAgents
 from src.tasks.trial_balance_tasks import TrialBalanceTasks
 from src.tools.data_tools import TrialBalanceTools
+from src.llm.resilience import get_llm_caller
+from src.runtime.dag_runner import DagRunner
+from src.runtime.telemetry import TelemetryCollector, aggregate, format_report, record_crew_usage
+from src.tools.tool_cache import crew_run_scope
 
 class TrialBalanceDemo:
     
-    def __init__(self):
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
         self.agents = TrialBalanceAgents()
         self.tasks = TrialBalanceTasks()
         self.tools = TrialBalanceTools()
@@ -37,18 +42,22 @@ class TrialBalanceDemo:
     
     def run_demo(self):
         """Execute the complete trial balance automation demo"""
+        from crewai import Crew, Process
+        
         self.setup_demo_scenario()
         
         print("\n🚀 Starting Trial Balance Automation Demo...")
         print("=" * 60)
         
-        # Create agents
-        data_extractor = self.agents.data_extractor_agent()
-        categorization_agent = self.agents.categorization_agent()
-        new_account_agent = self.agents.new_account_identifier_agent()
-        variance_agent = self.agents.variance_analyzer_agent()
-        compliance_agent = self.agents.compliance_reviewer_agent()
-        uploader_agent = self.agents.uploader_agent()
+        # Lease agents from the process-wide registry; they go back to its pool
+        # when the run ends, so repeated demo runs reuse them
+        leases = ExitStack()
+        data_extractor = leases.enter_context(self.agents.lease('data_extractor'))
+        categorization_agent = leases.enter_context(self.agents.lease('categorization'))
+        new_account_agent = leases.enter_context(self.agents.lease('new_account_identifier'))
+        variance_agent = leases.enter_context(self.agents.lease('variance_analyzer'))
+        compliance_agent = leases.enter_context(self.agents.lease('compliance_reviewer'))
+        uploader_agent = leases.enter_context(self.agents.lease('uploader'))
         
         # Create tasks
         extraction_task = self.tasks.data_extraction_task(
@@ -56,22 +65,6 @@ class TrialBalanceDemo:
             self.current_file
         )
         
-        # First, extract current data to get accounts for categorization
-        print("\n📥 Phase 1: Data Extraction")
-        print("-" * 30)
-        
-        # Create a simple crew for extraction
-        extraction_crew = Crew(
-            agents=[data_extractor],
-            tasks=[extraction_task],
-            process=Process.sequential,
-            verbose=True
-        )
-        
-        extraction_result = extraction_crew.kickoff()
-        self.demo_results['extraction'] = str(extraction_result)
-        print(f"✅ Extraction completed: {len(str(extraction_result))} chars")
-        
         # Get account list for categorization
         df_current = pd.read_csv(self.current_file)
         accounts_list = df_current[['account_number', 'account_name']].to_dict('records')
@@ -108,32 +101,65 @@ class TrialBalanceDemo:
             "Validated trial balance data ready for tax provision upload"
         )
         
-        # Create main processing crew
-        print("\n🔄 Phase 2: Main Processing Crew")
-        print("-" * 30)
+        # Compliance reviews the three independent analyses; upload follows compliance
+        compliance_task.context = [categorization_task, new_account_task, variance_task]
+        upload_task.context = [compliance_task]
         
-        main_crew = Crew(
-            agents=[
-                categorization_agent,
-                new_account_agent, 
-                variance_agent,
-                compliance_agent,
-                uploader_agent
-            ],
-            tasks=[
-                categorization_task,
-                new_account_task,
-                variance_task, 
-                compliance_task,
-                upload_task
-            ],
-            process=Process.sequential,
-            verbose=True
-        )
+        # Extraction, categorization, new-account detection and variance analysis
+        # only read the input files, so they run concurrently; compliance joins them
+        print("\n🔄 Running agents (independent tasks in parallel)")
+        print("-" * 30)
         
-        # Execute main processing
-        main_result = main_crew.kickoff()
-        self.demo_results['main_processing'] = str(main_result)
+        # LLM calls, tool calls and tokens per task
+        telemetry = TelemetryCollector('trial_balance_demo')
+        
+        def single_task_crew(name, agent, task):
+            def attempt():
+                crew = Crew(
+                    agents=[agent],
+                    tasks=[task],
+                    process=Process.sequential,
+                    verbose=True
+                )
+                result = str(crew.kickoff())
+                record_crew_usage(crew)
+                return result
+            
+            def run(upstream):
+                with telemetry.task(name, agent.role):
+                    # Tasks are shared with their dependents, so no hedged duplicates here and
+                    # no retry while a timed-out attempt is still writing to the same Task
+                    return get_llm_caller().call(attempt, hedge=False, retry_timeouts=False)
+            return run
+        
+        runner = DagRunner(max_workers=self.max_workers)
+        runner.add('extraction', single_task_crew('extraction', data_extractor, extraction_task))
+        runner.add('categorization', single_task_crew('categorization', categorization_agent, categorization_task))
+        runner.add('new_accounts', single_task_crew('new_accounts', new_account_agent, new_account_task))
+        runner.add('variance', single_task_crew('variance', variance_agent, variance_task))
+        runner.add('compliance', single_task_crew('compliance', compliance_agent, compliance_task),
+                   depends_on=['categorization', 'new_accounts', 'variance'])
+        runner.add('upload', single_task_crew('upload', uploader_agent, upload_task), depends_on=['compliance'])
+        
+        # Tools called again with the same arguments and unchanged input files
+        # (e.g. variance_analysis by two agents) reuse the first result
+        with leases, crew_run_scope() as tool_stats, telemetry.activate():
+            results = runner.run()
+        print(f"🧠 Tool cache: {tool_stats['hits']} hits / {tool_stats['misses']} misses")
+        self.demo_results['extraction'] = results['extraction']
+        print(f"✅ Extraction completed: {len(results['extraction'])} chars")
+        # The sequential crew returned its last task's output
+        self.demo_results['main_processing'] = results['upload']
+        self.demo_results['task_results'] = results
+        self.demo_results['task_timings'] = runner.timings
+        self.demo_results['wall_seconds'] = runner.wall_seconds
+        
+        self.demo_results['telemetry'] = telemetry.summary()
+        
+        print("\n⏱️  Task timings:")
+        print(runner.report())
+        print()
+        print(format_report(aggregate([self.demo_results['telemetry']], by='task'), by='task', runs=1))
         
         print("\n🎉 Demo Execution Complete!")
         print("=" * 60)
@@ -169,6 +195,9 @@ class TrialBalanceDemo:
                 "compliance_review_completed": True,
                 "upload_preparation_completed": True
             },
+            "task_timings": self.demo_results.get('task_timings', {}),
+            "wall_seconds": self.demo_results.get('wall_seconds'),
+            "telemetry": self.demo_results.get('telemetry'),
             "demo_insights": {
                 "new_accounts_detected": ["1150", "2200", "5300", "5400"],
                 "material_variances_expected": ["Operating Expenses (+50%)", "Accounts Receivable (+47%)"],
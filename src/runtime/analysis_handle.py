@@ -0,0 +1,129 @@
+# =============================================================================
+# File: src/runtime/analysis_handle.py
+# =============================================================================
+
+import asyncio
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from src.runtime.streaming import AnalysisStream
+
+TERMINAL_STAGES = ('completed', 'failed', 'cancelled')
+
+# run_analysis reports a failed AI step by returning this text rather than raising
+FAILED_RESULT_PREFIX = 'Analysis failed'
+
+_ids = itertools.count(1)
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_prep_executor() -> ThreadPoolExecutor:
+    """Shared executor for data loading/filtering off the event loop"""
+    global _executor
+    if _executor is None:
+        workers = int(os.getenv('ANALYSIS_PREP_WORKERS', '4'))
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis-prep')
+    return _executor
+
+
+def analysis_error(result: Optional[str]) -> Optional[str]:
+    """Error of an analysis that returned a failure instead of raising (None for a real result)"""
+    if result is None:
+        # No datasets loaded
+        return 'Analysis produced no result'
+    if result.startswith(FAILED_RESULT_PREFIX):
+        return result
+    return None
+
+
+class AnalysisHandle:
+    """
+    Handle to an analysis running on the event loop.
+
+    Exposes the current stage, a 0-1 progress estimate and a message, lets
+    callers subscribe to progress updates, and can be awaited for the result or
+    cancelled. With stream=True, handle.stream carries the same progress plus
+    agent steps and output tokens as they arrive (async for event in
+    handle.stream); otherwise it is None and the LLM call is not streamed.
+    Cancellation takes effect at the next await point; a data-prep
+    step or LLM call already running in a worker thread finishes in the
+    background and its result is discarded.
+    """
+
+    def __init__(self, request: str, stream: bool = False):
+        self.id = f"analysis-{next(_ids)}"
+        self.request = request
+        self.stage = 'queued'
+        self.progress = 0.0
+        self.message = ''
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[['AnalysisHandle'], Any]] = []
+        self.stream: Optional[AnalysisStream] = AnalysisStream() if stream else None
+
+    def _attach(self, task: asyncio.Task):
+        self._task = task
+        task.add_done_callback(self._on_done)
+
+    def update(self, stage: str, progress: float, message: str = ''):
+        """Record progress (called by the running analysis)"""
+        self.stage = stage
+        self.progress = max(self.progress, min(progress, 1.0))
+        self.message = message
+        if self.stream is not None:
+            self.stream.emit('stage', stage=stage, progress=round(self.progress, 3), message=message)
+        for listener in list(self._listeners):
+            try:
+                listener(self)
+            except Exception as e:
+                print(f"⚠️  Progress listener error: {e}")
+
+    def on_progress(self, listener: Callable[['AnalysisHandle'], Any]):
+        """Call listener(handle) on every progress update"""
+        self._listeners.append(listener)
+
+    def _on_done(self, task: asyncio.Task):
+        self.finished_at = time.time()
+        if task.cancelled():
+            self.update('cancelled', self.progress, 'Cancelled')
+            outcome = {"error": 'Cancelled'}
+        elif task.exception() is not None:
+            self.error = str(task.exception())
+            self.update('failed', self.progress, self.error)
+            outcome = {"error": self.error}
+        else:
+            outcome = {"result": task.result()}
+        if self.stream is not None:
+            self.stream.close(**outcome)
+
+    def cancel(self) -> bool:
+        """Request cancellation; returns False if the analysis already finished"""
+        if self._task is None or self._task.done():
+            return False
+        return self._task.cancel()
+
+    def done(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    def result(self) -> Optional[str]:
+        """Result of a finished analysis (raises if it failed or was cancelled)"""
+        return self._task.result()
+
+    def __await__(self):
+        return self._task.__await__()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "request": self.request,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "message": self.message,
+            "elapsed_seconds": round((self.finished_at or time.time()) - self.created_at, 3),
+            "error": self.error
+        }
@@ -0,0 +1,111 @@
+# =============================================================================
+# File: src/runtime/dag_runner.py
+# =============================================================================
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class DagRunError(Exception):
+    """Raised when one or more DAG tasks fail"""
+
+    def __init__(self, failures: Dict[str, BaseException]):
+        self.failures = failures
+        names = ", ".join(failures)
+        super().__init__(f"DAG task(s) failed: {names}")
+
+
+class DagRunner:
+    """
+    Runs named tasks as a dependency graph.
+
+    Each task is a callable taking a dict of its dependencies' results. Tasks
+    whose dependencies have finished run concurrently on a thread pool, so wall
+    time tracks the longest branch rather than the sum of all tasks. Tasks
+    downstream of a failure are skipped. Per-task timings are kept in .timings.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self._tasks: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self._depends_on: Dict[str, List[str]] = {}
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self.wall_seconds = 0.0
+
+    def add(self, name: str, fn: Callable[[Dict[str, Any]], Any], depends_on: Iterable[str] = ()) -> 'DagRunner':
+        """Register a task; dependencies must already be registered"""
+        if name in self._tasks:
+            raise ValueError(f"Duplicate task name: {name}")
+        depends_on = list(depends_on)
+        for dependency in depends_on:
+            if dependency not in self._tasks:
+                raise ValueError(f"Task {name} depends on unknown task {dependency}")
+        self._tasks[name] = fn
+        self._depends_on[name] = depends_on
+        return self
+
+    def _timed(self, name: str, upstream: Dict[str, Any], started: float):
+        start = time.perf_counter()
+        try:
+            return self._tasks[name](upstream)
+        finally:
+            end = time.perf_counter()
+            self.timings[name] = {
+                "start_offset": round(start - started, 3),
+                "seconds": round(end - start, 3),
+                "depends_on": self._depends_on[name]
+            }
+
+    def run(self, raise_on_error: bool = True) -> Dict[str, Any]:
+        """Execute every task respecting dependencies and return results by name"""
+        self.results, self.timings = {}, {}
+        failures: Dict[str, BaseException] = {}
+        remaining = dict(self._depends_on)
+        running = {}
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='dag') as executor:
+            while remaining or running:
+                for name, depends_on in list(remaining.items()):
+                    if any(dep in failures or self.timings.get(dep, {}).get("status") == "skipped"
+                           for dep in depends_on):
+                        del remaining[name]
+                        self.timings[name] = {"status": "skipped", "seconds": 0.0, "depends_on": depends_on}
+                    elif all(dep in self.results for dep in depends_on):
+                        del remaining[name]
+                        upstream = {dep: self.results[dep] for dep in depends_on}
+                        running[executor.submit(self._timed, name, upstream, started)] = name
+
+                if not running:
+                    # Everything left was skipped
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                        self.timings[name]["status"] = "completed"
+                    except Exception as e:
+                        failures[name] = e
+                        self.timings[name]["status"] = "failed"
+                        self.timings[name]["error"] = str(e)
+
+        self.wall_seconds = round(time.perf_counter() - started, 3)
+        if failures and raise_on_error:
+            raise DagRunError(failures)
+        return self.results
+
+    def report(self) -> str:
+        """Per-task timing table plus wall time versus the sequential sum"""
+        lines = [f"   {'task':<22} {'status':<10} {'start':>7} {'seconds':>8}"]
+        for name in self._tasks:
+            timing = self.timings.get(name, {"status": "pending", "seconds": 0.0})
+            start = timing.get("start_offset")
+            start_text = f"{start:>7.2f}" if start is not None else f"{'-':>7}"
+            lines.append(f"   {name:<22} {timing.get('status', '-'):<10} {start_text} {timing['seconds']:>8.2f}")
+        sequential = sum(t.get("seconds", 0.0) for t in self.timings.values())
+        lines.append(f"   ⏱️  Wall time {self.wall_seconds:.2f}s vs {sequential:.2f}s if run sequentially")
+        return "\n".join(lines)
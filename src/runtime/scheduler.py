@@ -0,0 +1,218 @@
+# =============================================================================
+# File: src/runtime/scheduler.py
+# =============================================================================
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from src.llm.rate_limiter import RateLimiter, get_rate_limiter, on_acquire
+from src.runtime.analysis_handle import analysis_error
+
+DEFAULT_MAX_CONCURRENCY = 16
+
+_ids = itertools.count(1)
+
+
+class AnalysisScheduler:
+    """
+    Queue of analysis jobs run as fast as the LLM rate limits allow.
+
+    Jobs are dispatched in submission order onto up to max_concurrency worker
+    threads. A job is started only while no LLM call is waiting for the rate
+    limiter and the limiter has budget for one call (one request plus the
+    mean tokens per call seen so far) from it and from every running job that
+    has not made its first call yet. Beyond that point more concurrency would
+    only queue at the limiter. Every LLM request still passes the
+    limiter's RPM/TPM gate, so a fan-out of hundreds of entities saturates the
+    quota without 429 storms. Each worker thread uses its own analysis system.
+    stats() reports queue depth and wait times.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, limiter: Optional[RateLimiter] = None,
+                 system_factory: Optional[Callable[[], Any]] = None):
+        self.max_concurrency = max_concurrency or int(os.getenv('SCHEDULER_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+        self.limiter = limiter or get_rate_limiter()
+        self._system_factory = system_factory
+        self._local = threading.local()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, Future] = {}
+        self._queue = deque()
+        self._running = 0
+        self._closed = False
+        self._started_at = time.monotonic()
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='analysis-job')
+        self._dispatcher = threading.Thread(target=self._dispatch, name='analysis-scheduler', daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, request: str, files: List[str], labels: Optional[List[str]] = None, **options) -> str:
+        """Queue an analysis (options as for run_analysis) and return its job id"""
+        job_id = f"job-{next(_ids)}"
+        job = {"id": job_id, "request": request, "files": list(files), "labels": labels, "options": options,
+               "status": "queued", "submitted_at": time.monotonic(), "queue_wait": None, "seconds": None,
+               "rate_limit_wait": 0.0, "llm_calls": 0, "error": None}
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Scheduler is shut down")
+            self._jobs[job_id] = job
+            self._futures[job_id] = Future()
+            self._queue.append(job_id)
+            self._condition.notify_all()
+        return job_id
+
+    def result(self, job_id: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Wait for a job and return its analysis (raises the job's error)"""
+        return self._futures[job_id].result(timeout)
+
+    def job(self, job_id: str) -> Dict[str, Any]:
+        """Status of one job"""
+        with self._condition:
+            job = dict(self._jobs[job_id])
+        job.pop("options")
+        return job
+
+    def run_all(self, items: List[Dict[str, Any]], report_every: float = 10.0) -> List[Optional[str]]:
+        """
+        Submit items (dicts with 'request', 'files' and optional 'labels' and
+        run_analysis options), print progress every report_every seconds and
+        return the results in input order (None for failed jobs)
+        """
+        job_ids = [self.submit(item["request"], item["files"], item.get("labels"),
+                               **{key: value for key, value in item.items() if key not in ('request', 'files', 'labels')})
+                   for item in items]
+        pending = {self._futures[job_id] for job_id in job_ids}
+        while pending:
+            _, pending = wait(pending, timeout=report_every or None)
+            if pending:
+                print(self.format_stats())
+        print(self.format_stats())
+        return [self._futures[job_id].result() if self._jobs[job_id]["status"] == 'completed' else None
+                for job_id in job_ids]
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, running and finished jobs, wait times and throughput"""
+        with self._condition:
+            jobs = list(self._jobs.values())
+            queued, running = len(self._queue), self._running
+        finished = [job for job in jobs if job["status"] in ('completed', 'failed')]
+        waits = sorted(job["queue_wait"] for job in jobs if job["queue_wait"] is not None)
+        elapsed = time.monotonic() - self._started_at
+        return {
+            "queued": queued,
+            "running": running,
+            "completed": sum(1 for job in finished if job["status"] == 'completed'),
+            "failed": sum(1 for job in finished if job["status"] == 'failed'),
+            "waiting_for_rate_limit": self.limiter.snapshot()["waiting"],
+            "queue_wait_mean": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "queue_wait_p95": waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0,
+            "queue_wait_max": waits[-1] if waits else 0.0,
+            "rate_limit_wait": round(sum(job["rate_limit_wait"] for job in finished), 3),
+            "jobs_per_minute": round(len(finished) / elapsed * 60, 1) if elapsed else 0.0,
+            "limiter": self.limiter.snapshot()
+        }
+
+    def format_stats(self) -> str:
+        stats = self.stats()
+        return (f"📊 Jobs: {stats['queued']} queued, {stats['running']} running, {stats['completed']} done, "
+                f"{stats['failed']} failed | {stats['waiting_for_rate_limit']} call(s) waiting for rate limit | "
+                f"queue wait mean {stats['queue_wait_mean']:.1f}s, p95 {stats['queue_wait_p95']:.1f}s | "
+                f"{stats['jobs_per_minute']:.1f} jobs/min")
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs; with wait, finish the queued ones first"""
+        with self._condition:
+            self._closed = True
+            if not wait:
+                for job_id in self._queue:
+                    self._jobs[job_id]["status"] = 'cancelled'
+                    self._futures[job_id].cancel()
+                self._queue.clear()
+            self._condition.notify_all()
+        if wait:
+            self._dispatcher.join()
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown(wait=exc[0] is None)
+
+    def _admissible(self) -> float:
+        """Seconds until another job should start (0 when it can start now)"""
+        if not self.limiter.enabled or self._running == 0:
+            return 0.0
+        if self.limiter.snapshot()["waiting"]:
+            return 0.25
+        # Running jobs still preparing will each want a call soon
+        preparing = sum(1 for job in self._jobs.values() if job["status"] == 'running' and not job["llm_calls"])
+        return self.limiter.time_until(self.limiter.expected_request() * (preparing + 1), requests=preparing + 1)
+
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                while True:
+                    if not self._queue:
+                        if self._closed:
+                            return
+                        self._condition.wait()
+                        continue
+                    if self._running >= self.max_concurrency:
+                        self._condition.wait()
+                        continue
+                    delay = self._admissible()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(min(delay, 1.0))
+                job = self._jobs[self._queue.popleft()]
+                self._running += 1
+                job["status"] = 'running'
+                job["queue_wait"] = round(time.monotonic() - job["submitted_at"], 3)
+            self._executor.submit(self._run, job)
+
+    def _system(self):
+        system = getattr(self._local, 'system', None)
+        if system is None:
+            if self._system_factory is None:
+                from dynamic_demo import DynamicTrialBalanceSystem
+                system = DynamicTrialBalanceSystem()
+            else:
+                system = self._system_factory()
+            self._local.system = system
+        return system
+
+    def _run(self, job: Dict[str, Any]):
+        future = self._futures[job["id"]]
+        started = time.monotonic()
+        def called():
+            with self._condition:
+                job["llm_calls"] += 1
+                self._condition.notify_all()
+
+        try:
+            system = self._system()
+            with on_acquire(called):
+                result = system.run_analysis(job["request"], job["files"], job["labels"], **job["options"])
+            telemetry = (getattr(system, 'last_run_info', None) or {}).get("telemetry") or {}
+            job["rate_limit_wait"] = (telemetry.get("totals") or {}).get("rate_limit_wait", 0.0)
+            # The returned text still resolves the future; the job is only failed in the stats
+            job["error"] = analysis_error(result)
+            job["status"] = 'failed' if job["error"] else 'completed'
+            if job["error"]:
+                print(f"❌ {job['id']} failed: {job['error']}")
+            future.set_result(result)
+        except Exception as e:
+            print(f"❌ {job['id']} failed: {e}")
+            job["status"] = 'failed'
+            job["error"] = str(e)
+            future.set_exception(e)
+        finally:
+            job["seconds"] = round(time.monotonic() - started, 3)
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
@@ -0,0 +1,172 @@
+# =============================================================================
+# File: src/runtime/streaming.py
+# =============================================================================
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Event types carrying output the user can read
+OUTPUT_EVENTS = ('token', 'step')
+
+
+class AnalysisStream:
+    """
+    Ordered, thread-safe feed of analysis events.
+
+    Events are dicts with a 'type' and 't' (seconds since the stream was
+    created). The pipeline emits:
+    - 'stage': stage, progress and message.
+    - 'token': text and source ('llm', 'cache', 'deterministic' or 'error');
+      the token texts concatenated give the output as it is produced.
+    - 'step': agent and text, for each agent reasoning or tool step.
+    - 'task': agent and text, for each completed crew task.
+    - 'done': result or error.
+
+    Consume it with on_event(callback), a plain for-loop (blocks until the
+    stream closes) or async for. Each consumer sees every event from the start.
+    """
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.closed = False
+        self.created_at = time.perf_counter()
+        self.first_output_at: Optional[float] = None
+        self._condition = threading.Condition()
+        self._listeners: List[Callable[[Dict[str, Any]], Any]] = []
+
+    def emit(self, event_type: str, **fields) -> Dict[str, Any]:
+        """Append an event and notify consumers (ignored once the stream is closed)"""
+        return self._append(event_type, fields)
+
+    def close(self, result: Optional[str] = None, error: Optional[str] = None):
+        """Emit the final 'done' event; later emits and closes are ignored"""
+        self._append('done', {"result": result, "error": error}, closing=True)
+
+    def _append(self, event_type: str, fields: Dict[str, Any], closing: bool = False) -> Dict[str, Any]:
+        now = time.perf_counter()
+        event = {"type": event_type, "t": round(now - self.created_at, 3)}
+        event.update(fields)
+        with self._condition:
+            if self.closed:
+                return event
+            if event_type in OUTPUT_EVENTS and self.first_output_at is None:
+                self.first_output_at = now
+            self.events.append(event)
+            if closing:
+                self.result = fields.get("result")
+                self.error = fields.get("error")
+                self.closed = True
+            listeners = list(self._listeners)
+            self._condition.notify_all()
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"⚠️  Stream listener error: {e}")
+        return event
+
+    def on_event(self, listener: Callable[[Dict[str, Any]], Any]):
+        """Call listener(event) for past and future events"""
+        with self._condition:
+            past = list(self.events)
+            self._listeners.append(listener)
+        for event in past:
+            listener(event)
+
+    def remove_listener(self, listener: Callable[[Dict[str, Any]], Any]):
+        with self._condition:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    @property
+    def time_to_first_output(self) -> Optional[float]:
+        """Seconds until the first token or agent step, if any arrived"""
+        if self.first_output_at is None:
+            return None
+        return round(self.first_output_at - self.created_at, 3)
+
+    def text(self) -> str:
+        """Output text streamed so far"""
+        with self._condition:
+            return "".join(event["text"] for event in self.events if event["type"] == 'token')
+
+    def __iter__(self):
+        index = 0
+        while True:
+            with self._condition:
+                while index >= len(self.events) and not self.closed:
+                    self._condition.wait()
+                batch = self.events[index:]
+                finished = self.closed
+            index += len(batch)
+            yield from batch
+            if finished and not batch:
+                return
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        arrived = asyncio.Event()
+
+        def wake(event):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(arrived.set)
+
+        self.on_event(wake)
+        try:
+            index = 0
+            while True:
+                with self._condition:
+                    batch = self.events[index:]
+                    finished = self.closed
+                index += len(batch)
+                for event in batch:
+                    yield event
+                if finished and not batch:
+                    return
+                if not batch:
+                    await arrived.wait()
+                    arrived.clear()
+        finally:
+            # Consumers that stop early must not keep waking a finished loop
+            self.remove_listener(wake)
+
+
+def langchain_token_handler(stream: AnalysisStream, source: str):
+    """LangChain callback handler forwarding streamed LLM tokens to the stream"""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class _TokenHandler(BaseCallbackHandler):
+        def on_llm_new_token(self, token: str, **kwargs):
+            if token:
+                stream.emit('token', text=token, source='llm', agent=source)
+
+    return _TokenHandler()
+
+
+def agent_step_callback(stream: AnalysisStream, agent: str) -> Callable[[Any], None]:
+    """crewai step_callback emitting a 'step' event per agent step"""
+    def on_step(step_output):
+        stream.emit('step', agent=agent, text=_describe(step_output))
+    return on_step
+
+
+def task_callback(stream: AnalysisStream, agent: str) -> Callable[[Any], None]:
+    """crewai task_callback emitting a 'task' event per completed task"""
+    def on_task(task_output):
+        stream.emit('task', agent=agent, text=_describe(task_output))
+    return on_task
+
+
+def _describe(output: Any, limit: int = 500) -> str:
+    for attribute in ('thought', 'log', 'raw', 'output'):
+        value = getattr(output, attribute, None)
+        if isinstance(value, str) and value.strip():
+            text = value.strip()
+            break
+    else:
+        text = str(output)
+    return text if len(text) <= limit else text[:limit] + "..."
@@ -0,0 +1,374 @@
+# =============================================================================
+# File: src/runtime/telemetry.py
+# =============================================================================
+
+import argparse
+import contextvars
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Per-task counters; every record carries all of them
+COUNTERS = ('llm_calls', 'llm_errors', 'tool_calls', 'prompt_tokens', 'completion_tokens', 'total_tokens')
+
+_current_run: contextvars.ContextVar = contextvars.ContextVar('telemetry_run', default=None)
+_current_task: contextvars.ContextVar = contextvars.ContextVar('telemetry_task', default=None)
+_current_attempt: contextvars.ContextVar = contextvars.ContextVar('telemetry_attempt', default=None)
+
+
+class TelemetryCollector:
+    """
+    Per-task latency, LLM call, tool call and token counts for one run.
+
+    Activate the collector around a run and open a task() around each agent's
+    work. LLM usage (from the LangChain callback on every client) and tool
+    calls (from @track_tool) are attributed to the task open in the current
+    context. Context variables follow the crew into the threads started by
+    the LLM resilience layer, so concurrent tasks are counted separately.
+    """
+
+    def __init__(self, run: str):
+        self.run = run
+        self.tasks: List[Dict[str, Any]] = []
+        self.started_at = time.perf_counter()
+        self.seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self):
+        """Make this the current run's collector"""
+        token = _current_run.set(self)
+        try:
+            yield self
+        finally:
+            _current_run.reset(token)
+            self.seconds = round(time.perf_counter() - self.started_at, 3)
+
+    @contextmanager
+    def task(self, name: str, agent: Optional[str] = None):
+        """Record one task; usage reported while it is open is counted against it"""
+        record = {"task": name, "agent": agent, "status": "running", "seconds": 0.0, "tools": {},
+                  "rate_limit_wait": 0.0, "estimated_tokens": False, "discarded_calls": 0, "discarded_tokens": 0}
+        record.update({counter: 0 for counter in COUNTERS})
+        with self._lock:
+            self.tasks.append(record)
+        token = _current_task.set((self, record))
+        started = time.perf_counter()
+        try:
+            yield record
+            record["status"] = "completed"
+        except BaseException:
+            record["status"] = "failed"
+            raise
+        finally:
+            record["seconds"] = round(time.perf_counter() - started, 3)
+            _current_task.reset(token)
+
+    def add(self, record: Dict[str, Any], **amounts):
+        with self._lock:
+            for counter, amount in amounts.items():
+                record[counter] += amount
+            record["total_tokens"] = record["prompt_tokens"] + record["completion_tokens"]
+
+    def add_discarded(self, record: Dict[str, Any], **amounts):
+        """Usage of an LLM attempt whose result was not used (a losing hedge or an abandoned timeout)"""
+        with self._lock:
+            record["discarded_calls"] += amounts.get("llm_calls", 0)
+            record["discarded_tokens"] += amounts.get("prompt_tokens", 0) + amounts.get("completion_tokens", 0)
+
+    def add_wait(self, record: Dict[str, Any], seconds: float):
+        with self._lock:
+            record["rate_limit_wait"] = round(record["rate_limit_wait"] + seconds, 3)
+
+    def add_tool(self, record: Dict[str, Any], tool: str):
+        with self._lock:
+            record["tool_calls"] += 1
+            record["tools"][tool] = record["tools"].get(tool, 0) + 1
+
+    def summary(self, request: Optional[str] = None) -> Dict[str, Any]:
+        """
+        JSON-ready tasks plus run totals. With request, only the tasks whose
+        'requests' list names it; the counters of a task serving several
+        requests (a combined batch call) are split evenly between them.
+        """
+        with self._lock:
+            tasks = [dict(record, tools=dict(record["tools"])) for record in self.tasks]
+        if request is not None:
+            tasks = [record for record in tasks if request in record.get("requests", ())]
+            for record in tasks:
+                parts = len(record["requests"])
+                if parts > 1:
+                    record.update({counter: round(record[counter] / parts) for counter in COUNTERS})
+                    record["shared_by"] = parts
+        seconds = self.seconds if self.seconds is not None else round(time.perf_counter() - self.started_at, 3)
+        totals = {counter: sum(record[counter] for record in tasks) for counter in COUNTERS}
+        totals["task_seconds"] = round(sum(record["seconds"] for record in tasks), 3)
+        totals["rate_limit_wait"] = round(sum(record["rate_limit_wait"] for record in tasks), 3)
+        totals["discarded_tokens"] = sum(record.get("discarded_tokens", 0) for record in tasks)
+        return {"run": self.run, "seconds": seconds, "tasks": tasks, "totals": totals}
+
+
+def current_collector() -> Optional[TelemetryCollector]:
+    return _current_run.get()
+
+
+@contextmanager
+def telemetry_task(name: str, agent: Optional[str] = None):
+    """collector.task() on the current run's collector; a no-op outside a run"""
+    collector = _current_run.get()
+    if collector is None:
+        yield None
+        return
+    with collector.task(name, agent) as record:
+        yield record
+
+
+class LLMAttempt:
+    """
+    Usage of one attempt at a resilient LLM call. Attempts can overlap (a
+    hedged duplicate, or a retry next to a timed-out attempt), so their usage
+    is held back until the caller settles them: the winning and failed
+    attempts count against the task, the others are recorded as discarded.
+    Usage reported after settling (an abandoned call finishing late) follows
+    the same decision.
+    """
+
+    def __init__(self):
+        self.llm_calls = 0
+        self._counted: Optional[bool] = None
+        self._pending: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def add(self, collector: TelemetryCollector, record: Dict[str, Any], amounts: Dict[str, int]):
+        with self._lock:
+            self.llm_calls += amounts.get("llm_calls", 0)
+            if self._counted is None:
+                self._pending.append((collector, record, amounts))
+                return
+            counted = self._counted
+        self._apply(collector, record, amounts, counted)
+
+    def settle(self, counted: bool):
+        """Count the usage against the task (counted) or as discarded; later calls are ignored"""
+        with self._lock:
+            if self._counted is not None:
+                return
+            self._counted = counted
+            pending, self._pending = self._pending, []
+        for collector, record, amounts in pending:
+            self._apply(collector, record, amounts, counted)
+
+    @staticmethod
+    def _apply(collector: TelemetryCollector, record: Dict[str, Any], amounts: Dict[str, int], counted: bool):
+        if counted:
+            collector.add(record, **amounts)
+        else:
+            collector.add_discarded(record, **amounts)
+
+
+@contextmanager
+def llm_attempt(attempt: LLMAttempt):
+    """Report LLM usage in this context to attempt instead of straight to the task"""
+    token = _current_attempt.set(attempt)
+    try:
+        yield attempt
+    finally:
+        _current_attempt.reset(token)
+
+
+def _add_usage(collector: TelemetryCollector, record: Dict[str, Any], **amounts):
+    attempt = _current_attempt.get()
+    if attempt is None:
+        collector.add(record, **amounts)
+    else:
+        attempt.add(collector, record, amounts)
+
+
+def record_llm_call(prompt_tokens: int, completion_tokens: int, estimated: bool = False, failed: bool = False):
+    """Count one LLM call against the current task"""
+    current = _current_task.get()
+    if current is None:
+        return
+    collector, record = current
+    if failed:
+        _add_usage(collector, record, llm_errors=1)
+        return
+    _add_usage(collector, record, llm_calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    if estimated:
+        record["estimated_tokens"] = True
+
+
+def record_tool_call(tool: str):
+    """Count one tool call against the current task"""
+    current = _current_task.get()
+    if current is not None:
+        collector, record = current
+        collector.add_tool(record, tool)
+
+
+def record_rate_limit_wait(seconds: float):
+    """Add time spent waiting for the LLM rate limiter to the current task"""
+    current = _current_task.get()
+    if current is not None and seconds > 0:
+        collector, record = current
+        collector.add_wait(record, seconds)
+
+
+def record_crew_usage(crew: Any):
+    """
+    Fall back to crewai's own usage_metrics when no LLM callback reported
+    for the current task (e.g. a crewai version that calls the model itself)
+    """
+    current = _current_task.get()
+    metrics = getattr(crew, 'usage_metrics', None)
+    if current is None or metrics is None:
+        return
+    attempt = _current_attempt.get()
+    if (attempt.llm_calls if attempt is not None else current[1]["llm_calls"]):
+        return
+    if not isinstance(metrics, dict):
+        metrics = metrics.model_dump() if hasattr(metrics, 'model_dump') else vars(metrics)
+    collector, record = current
+    _add_usage(collector, record, llm_calls=int(metrics.get("successful_requests") or 0),
+               prompt_tokens=int(metrics.get("prompt_tokens") or 0),
+               completion_tokens=int(metrics.get("completion_tokens") or 0))
+
+
+def track_tool(fn: Callable) -> Callable:
+    """Count calls of a crew tool against the current task (apply beneath @tool)"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        record_tool_call(fn.__name__)
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+_usage_handler = None
+_usage_handler_lock = threading.Lock()
+
+
+def usage_callback_handler():
+    """
+    Process-wide LangChain handler reporting each LLM call's token usage.
+
+    Uses the provider's usage when the response carries it and estimates
+    prompt and completion tokens locally otherwise (streamed responses).
+    """
+    global _usage_handler
+    if _usage_handler is not None:
+        return _usage_handler
+    with _usage_handler_lock:
+        if _usage_handler is not None:
+            return _usage_handler
+
+        from langchain_core.callbacks import BaseCallbackHandler
+        from src.tools.context_builder import estimate_tokens
+
+        class _UsageHandler(BaseCallbackHandler):
+            def __init__(self):
+                self._prompt_estimates: Dict[Any, int] = {}
+
+            def on_llm_start(self, serialized, prompts, *, run_id=None, **kwargs):
+                self._prompt_estimates[run_id] = sum(estimate_tokens(prompt) for prompt in prompts)
+
+            def on_chat_model_start(self, serialized, messages, *, run_id=None, **kwargs):
+                self._prompt_estimates[run_id] = sum(estimate_tokens(str(message.content))
+                                                     for batch in messages for message in batch)
+
+            def on_llm_end(self, response, *, run_id=None, **kwargs):
+                prompt_estimate = self._prompt_estimates.pop(run_id, 0)
+                usage = (response.llm_output or {}).get("token_usage") or {}
+                if usage.get("prompt_tokens") is not None:
+                    record_llm_call(usage["prompt_tokens"], usage.get("completion_tokens") or 0)
+                    return
+                generations = [generation for batch in response.generations for generation in batch]
+                metadata = getattr(getattr(generations[0], 'message', None), 'usage_metadata', None) \
+                    if generations else None
+                if metadata:
+                    record_llm_call(metadata.get("input_tokens", 0), metadata.get("output_tokens", 0))
+                else:
+                    completion = sum(estimate_tokens(generation.text) for generation in generations)
+                    record_llm_call(prompt_estimate, completion, estimated=True)
+
+            def on_llm_error(self, error, *, run_id=None, **kwargs):
+                self._prompt_estimates.pop(run_id, None)
+                record_llm_call(0, 0, failed=True)
+
+        _usage_handler = _UsageHandler()
+    return _usage_handler
+
+
+def load_telemetry(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """Telemetry blocks of saved result files (files without one are skipped)"""
+    runs = []
+    for path in paths:
+        try:
+            with open(path) as f:
+                telemetry = json.load(f).get("telemetry")
+        except (OSError, ValueError, AttributeError):
+            continue
+        if telemetry and telemetry.get("tasks") is not None:
+            runs.append(dict(telemetry, file=path))
+    return runs
+
+
+def aggregate(runs: List[Dict[str, Any]], by: str = 'agent') -> List[Dict[str, Any]]:
+    """Totals and means per agent (or task) across runs, most tokens first"""
+    groups: Dict[str, Dict[str, Any]] = {}
+    for run in runs:
+        for record in run["tasks"]:
+            key = record.get(by) or record.get("task") or "unknown"
+            group = groups.setdefault(key, {by: key, "tasks": 0, "failed": 0, "seconds": 0.0,
+                                            "max_seconds": 0.0, "discarded_tokens": 0,
+                                            **{counter: 0 for counter in COUNTERS}})
+            group["tasks"] += 1
+            group["failed"] += record.get("status") == "failed"
+            group["seconds"] += record.get("seconds", 0.0)
+            group["max_seconds"] = max(group["max_seconds"], record.get("seconds", 0.0))
+            group["discarded_tokens"] += record.get("discarded_tokens", 0)
+            for counter in COUNTERS:
+                group[counter] += record.get(counter, 0)
+    rows = sorted(groups.values(), key=lambda group: (group["total_tokens"], group["seconds"]), reverse=True)
+    for row in rows:
+        row["mean_seconds"] = round(row["seconds"] / row["tasks"], 3)
+        row["mean_tokens"] = round(row["total_tokens"] / row["tasks"])
+        row["seconds"] = round(row["seconds"], 3)
+    return rows
+
+
+def format_report(rows: List[Dict[str, Any]], by: str = 'agent', runs: int = 0) -> str:
+    lines = [f"📊 Telemetry across {runs} run(s), by {by}",
+             f"{by.title():<32} {'Tasks':>5} {'Fail':>4} {'Mean s':>8} {'Max s':>8} {'LLM':>5} "
+             f"{'Tools':>5} {'Prompt':>9} {'Compl.':>8} {'Tokens':>9} {'Mean tok':>8} {'Discard':>8}"]
+    for row in rows:
+        lines.append(f"{str(row[by])[:32]:<32} {row['tasks']:>5} {row['failed']:>4} {row['mean_seconds']:>8.2f} "
+                     f"{row['max_seconds']:>8.2f} {row['llm_calls']:>5} {row['tool_calls']:>5} "
+                     f"{row['prompt_tokens']:>9,} {row['completion_tokens']:>8,} {row['total_tokens']:>9,} "
+                     f"{row['mean_tokens']:>8,} {row['discarded_tokens']:>8,}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate agent and task telemetry from saved results')
+    parser.add_argument('--dir', default='data/output', help='Directory of result JSON files')
+    parser.add_argument('--by', choices=['agent', 'task'], default='agent')
+    parser.add_argument('--json', action='store_true', help='Print the aggregate as JSON')
+    args = parser.parse_args()
+
+    runs = load_telemetry(sorted(glob.glob(os.path.join(args.dir, '*.json'))))
+    rows = aggregate(runs, args.by)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    elif not runs:
+        print(f"⚠️  No telemetry found in {args.dir}")
+    else:
+        print(format_report(rows, args.by, len(runs)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
-from crewai import Task
+def _task(**fields):
+    """crewai Task, imported on first use so loading this module stays cheap"""
+    from crewai import Task
+    return Task(**fields)
 
 class TrialBalanceTasks:
     
     def data_extraction_task(self, agent, trial_balance_file):
-        return Task(
+        return _task(
             description=f"""
             Extract and validate trial balance data from the file: {trial_balance_file}
             
@@ -24,7 +27,7 @@ class TrialBalanceTasks:
         )
     
     def categorization_task(self, agent, accounts_to_categorize):
-        return Task(
+        return _task(
             description=f"""
             Categorize the following accounts for tax reporting purposes:
             {accounts_to_categorize}
@@ -46,7 +49,7 @@ class TrialBalanceTasks:
         )
     
     def new_account_identification_task(self, agent, current_file, prior_file):
-        return Task(
+        return _task(
             description=f"""
             Compare current period ({current_file}) with prior period ({prior_file}) 
             to identify new accounts that require categorization.
@@ -68,7 +71,7 @@ class TrialBalanceTasks:
         )
     
     def variance_analysis_task(self, agent, current_file, prior_file):
-        return Task(
+        return _task(
             description=f"""
             Perform detailed variance analysis between current period ({current_file}) 
             and prior period ({prior_file}).
@@ -90,7 +93,7 @@ class TrialBalanceTasks:
         )
     
     def compliance_review_task(self, agent, processed_data):
-        return Task(
+        return _task(
             description=f"""
             Perform final compliance and quality review of processed trial balance data.
             
@@ -112,13 +115,13 @@ class TrialBalanceTasks:
         )
     
     def upload_preparation_task(self, agent, validated_data):
-        return Task(
+        return _task(
             description=f"""
             Prepare validated trial balance data for upload to tax provision systems.
             
             Your tasks:
             1. Format data according to tax provision system requirements
-            2. Create upload file in required format (JSON/XML/CSV)
+            2. Create upload file in required format (JSON/NDJSON/CSV/Parquet)
             3. Generate upload manifest and documentation
             4. Perform pre-upload validation checks
             5. Create audit trail for the upload process
@@ -126,6 +129,7 @@ class TrialBalanceTasks:
             Requirements:
             - Output must be in standard tax provision format
             - Include all required metadata
+            - Use a delta upload (mode "delta") for late adjustments to a period that was already uploaded
             - Generate upload confirmation and audit trail
             """,
             agent=agent,
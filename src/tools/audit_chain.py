@@ -0,0 +1,309 @@
+# =============================================================================
+# File: src/tools/audit_chain.py
+# =============================================================================
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.tools.audit_segments import (
+    iter_segment_lines,
+    list_audit_segments,
+    read_last_line,
+    segment_name
+)
+
+# prev_hash of the first entry in a chain
+GENESIS_HASH = '0' * 64
+
+# The hash is always serialized last, so this many trailing characters
+# (',"hash":"<64 hex>"}') separate an entry's hashed body from its hash
+_HASH_SUFFIX_LENGTH = len(',"hash":""}') + 64
+
+CHECKPOINT_FILE = 'audit_checkpoints.jsonl'
+VERIFY_STATE_FILE = 'audit_verify_state.json'
+RETENTION_FILE = 'audit_retention.jsonl'
+
+_encoder = json.JSONEncoder(sort_keys=True, separators=(',', ':'), default=str, check_circular=False)
+
+
+def chain_entry(log_entry: Dict[str, Any], seq: int, prev_hash: str) -> str:
+    """
+    Link an entry to its predecessor and return its serialized line.
+
+    The entry gets "seq" and "prev_hash", and "hash" = SHA-256 of its canonical
+    JSON body (which includes prev_hash), so editing, dropping or reordering any
+    entry breaks every hash after it.
+    """
+    log_entry.pop("hash", None)
+    log_entry["seq"] = seq
+    log_entry["prev_hash"] = prev_hash
+    body = _encoder.encode(log_entry)
+    digest = hashlib.sha256(body.encode()).hexdigest()
+    log_entry["hash"] = digest
+    return f'{body[:-1]},"hash":"{digest}"}}'
+
+
+def encode_details(details: Any) -> str:
+    """Canonical JSON of an entry's details, as chain_entry would serialize them"""
+    return _encoder.encode(details)
+
+
+def chain_line(timestamp: str, agent: str, action: str, details_json: str, seq: int,
+               prev_hash: str) -> Tuple[str, str]:
+    """
+    (line, hash) for an AuditLogger entry whose details are already encoded
+    with encode_details. The line is byte-for-byte what chain_entry produces
+    for the same entry, without encoding the details again.
+    """
+    body = (f'{{"action":{_encoder.encode(action)},"agent":{_encoder.encode(agent)},"details":{details_json},'
+            f'"prev_hash":"{prev_hash}","seq":{seq},"timestamp":{_encoder.encode(timestamp)}}}')
+    digest = hashlib.sha256(body.encode()).hexdigest()
+    return f'{body[:-1]},"hash":"{digest}"}}', digest
+
+
+def split_line(line: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Return (hashed body, parsed entry) for a serialized line"""
+    entry = json.loads(line)
+    return line[:-_HASH_SUFFIX_LENGTH] + '}', entry
+
+
+def recover_chain_state(log_dir: str) -> Tuple[int, str]:
+    """Return (last seq, last hash) from the tail of the newest segment"""
+    for path in reversed(list_audit_segments(log_dir)):
+        line = read_last_line(path)
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if 'seq' in entry and 'prev_hash' in entry:
+            return entry['seq'], entry['hash']
+        # Pre-chain entries: start a fresh chain after them
+        return 0, GENESIS_HASH
+
+    # Every segment was pruned; continue from the newest retention anchor
+    anchors = [a for a in load_retention_anchors(log_dir).values() if a['last_hash']]
+    if anchors:
+        newest = max(anchors, key=lambda a: a['last_seq'])
+        return newest['last_seq'], newest['last_hash']
+    return 0, GENESIS_HASH
+
+
+def write_checkpoint(log_dir: str, seq: int, digest: str, segment: str, offset: int, timestamp: str):
+    """Append a checkpoint digest for the entry at seq"""
+    checkpoint = {
+        "seq": seq,
+        "hash": digest,
+        "segment": segment,
+        "offset": offset,
+        "timestamp": timestamp
+    }
+    with open(os.path.join(log_dir, CHECKPOINT_FILE), 'a') as f:
+        f.write(json.dumps(checkpoint) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_checkpoints(log_dir: str) -> Dict[int, str]:
+    """Map seq -> chain hash for every recorded checkpoint"""
+    checkpoints = {}
+    path = os.path.join(log_dir, CHECKPOINT_FILE)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    checkpoint = json.loads(line)
+                    checkpoints[checkpoint['seq']] = checkpoint['hash']
+    return checkpoints
+
+
+def prune_segment(log_dir: str, path: str):
+    """
+    Delete a segment that fell out of the retention window.
+
+    Its last seq and hash are recorded in audit_retention.jsonl first, so the
+    verifier can still anchor the chain at the oldest remaining segment.
+    """
+    last_seq, last_hash = None, None
+    line = read_last_line(path)
+    if line:
+        entry = json.loads(line)
+        last_seq, last_hash = entry.get('seq'), entry.get('hash')
+
+    record = {
+        "segment": segment_name(path),
+        "last_seq": last_seq,
+        "last_hash": last_hash,
+        "pruned_at": datetime.now().isoformat()
+    }
+    with open(os.path.join(log_dir, RETENTION_FILE), 'a') as f:
+        f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.remove(path)
+
+
+def load_retention_anchors(log_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Map pruned segment name -> its last seq/hash"""
+    anchors = {}
+    path = os.path.join(log_dir, RETENTION_FILE)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    anchors[record['segment']] = record
+    return anchors
+
+
+class AuditChainVerifier:
+    """
+    Incrementally verifies the audit hash chain.
+
+    Progress is saved to logs/audit_verify_state.json at every writer checkpoint
+    and at the end of a run, so the next run resumes from the last verified
+    position instead of rescanning every segment. Segments are read through
+    audit_segments, so compressed and live segments verify alike; when the
+    oldest segments were pruned by retention, the chain is anchored at the
+    last hash recorded for them.
+    """
+
+    def __init__(self, log_dir: str = 'logs'):
+        self.log_dir = log_dir
+        self.state_path = os.path.join(log_dir, VERIFY_STATE_FILE)
+
+    def load_state(self) -> Optional[Dict[str, Any]]:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        return None
+
+    def _save_state(self, state: Dict[str, Any]):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def verify(self, full: bool = False) -> Dict[str, Any]:
+        """Verify entries written since the last verified position (or everything with full=True)"""
+        state = None if full else self.load_state()
+        checkpoints = load_checkpoints(self.log_dir)
+        segments = list_audit_segments(self.log_dir)
+        anchors = load_retention_anchors(self.log_dir)
+        self._anchor_hashes = {a['last_hash']: a['last_seq'] for a in anchors.values() if a['last_hash']}
+
+        if state and state['segment'] in anchors:
+            # The last verified segment has since been pruned; rescan what remains
+            state = None
+
+        prev_hash = state['hash'] if state else None
+        last_seq = state['seq'] if state else 0
+        resume_segment = state['segment'] if state else None
+        resume_offset = state['offset'] if state else 0
+
+        result = {
+            "ok": True,
+            "resumed_from": {"segment": resume_segment, "seq": last_seq} if state else None,
+            "verified_entries": 0,
+            "legacy_entries": 0,
+            "checkpoints_matched": 0,
+            "anchored_at_seq": None,
+            "last_seq": last_seq,
+            "errors": []
+        }
+
+        if resume_segment is not None:
+            names = [segment_name(path) for path in segments]
+            if resume_segment not in names:
+                result["ok"] = False
+                result["errors"].append(f"Last verified segment {resume_segment} is missing")
+                return result
+            segments = segments[names.index(resume_segment):]
+
+        position = state
+        for index, path in enumerate(segments):
+            offset = resume_offset if index == 0 and state else 0
+            for end_offset, line in iter_segment_lines(path, offset):
+                if not line.strip():
+                    continue
+                error, prev_hash, last_seq = self._check_line(line, prev_hash, last_seq, checkpoints, result)
+                position = {"segment": segment_name(path), "offset": end_offset, "seq": last_seq, "hash": prev_hash}
+                if error:
+                    result["ok"] = False
+                    result["errors"].append(f"{segment_name(path)} @ byte {end_offset}: {error}")
+                    result["last_seq"] = last_seq
+                    return result
+                if last_seq in checkpoints:
+                    self._save_state(position)
+
+        if checkpoints and max(checkpoints) > last_seq:
+            result["ok"] = False
+            result["errors"].append(f"Checkpoint at seq {max(checkpoints)} is past the end of the log "
+                                    f"(seq {last_seq}); entries were removed")
+        elif position is not None and prev_hash is not None:
+            self._save_state(position)
+        result["last_seq"] = last_seq
+        return result
+
+    def _check_line(self, line: str, prev_hash: Optional[str], last_seq: int,
+                    checkpoints: Dict[int, str], result: Dict[str, Any]):
+        """Return (error, hash, seq) after checking one serialized entry"""
+        try:
+            body, entry = split_line(line)
+        except ValueError:
+            return "unparseable entry", prev_hash, last_seq
+
+        if 'prev_hash' not in entry:
+            # Entries written before chaining was introduced cannot be verified
+            if prev_hash is not None and prev_hash != GENESIS_HASH:
+                return "unchained entry after the chain started", prev_hash, last_seq
+            result["legacy_entries"] += 1
+            return None, prev_hash, last_seq
+
+        if prev_hash is None and entry['prev_hash'] in self._anchor_hashes:
+            # First remaining entry after retention pruned the start of the chain
+            last_seq = self._anchor_hashes[entry['prev_hash']]
+            result["anchored_at_seq"] = last_seq
+            prev_hash = entry['prev_hash']
+
+        expected_prev = prev_hash if prev_hash is not None else GENESIS_HASH
+        if entry['prev_hash'] != expected_prev:
+            return f"seq {entry.get('seq')} does not link to its predecessor", prev_hash, last_seq
+        if entry['seq'] != last_seq + 1:
+            return f"expected seq {last_seq + 1}, found {entry['seq']}", prev_hash, last_seq
+        if hashlib.sha256(body.encode()).hexdigest() != entry['hash']:
+            return f"seq {entry['seq']} content does not match its hash", prev_hash, last_seq
+        if entry['seq'] in checkpoints:
+            if checkpoints[entry['seq']] != entry['hash']:
+                return f"seq {entry['seq']} does not match its checkpoint digest", prev_hash, last_seq
+            result["checkpoints_matched"] += 1
+
+        result["verified_entries"] += 1
+        return None, entry['hash'], entry['seq']
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Verify the audit log hash chain from the command line"""
+    parser = argparse.ArgumentParser(description='Verify the tamper-evident audit log chain')
+    parser.add_argument('--log-dir', default='logs')
+    parser.add_argument('--full', action='store_true', help='Ignore saved progress and verify everything')
+    args = parser.parse_args(argv)
+
+    result = AuditChainVerifier(args.log_dir).verify(full=args.full)
+    print(json.dumps(result, indent=2))
+    if result["ok"]:
+        print(f"✅ Audit chain intact through seq {result['last_seq']} "
+              f"({result['verified_entries']} entries verified this run)", file=sys.stderr)
+        return 0
+    print(f"❌ Audit chain verification failed: {result['errors'][0]}", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
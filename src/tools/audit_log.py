@@ -0,0 +1,372 @@
+# =============================================================================
+# File: src/tools/audit_log.py
+# =============================================================================
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.tools.audit_chain import chain_line, encode_details, prune_segment, recover_chain_state, write_checkpoint
+from src.tools.audit_segments import (
+    compress_segment,
+    expired_segments,
+    list_audit_segments,
+    parse_segment,
+    segment_path
+)
+from src.tools.audit_store import AuditStore, AUDIT_DB_PATH
+
+AUDIT_LOG_DIR = 'logs'
+
+# When to fsync written batches: after every batch, at most once per
+# fsync_interval seconds, or never (leave it to the OS)
+FSYNC_POLICIES = ('batch', 'interval', 'never')
+
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+
+# Attempts to write what is still queued when the logger closes after a write error
+CLOSE_WRITE_ATTEMPTS = 3
+
+
+class AuditLogger:
+    """
+    Buffered audit log writer.
+
+    log() only stamps the entry, encodes its details and appends it to an
+    in-memory queue; a background thread drains the queue in batches, chains
+    the entries (see audit_chain.chain_line) and appends them to the live segment
+    logs/audit_YYYYMMDD[.N].jsonl through a file handle that stays open between
+    batches. Segments rotate at the start of each day and whenever the live one
+    reaches max_segment_bytes; closed segments are gzipped in the background and
+    segments older than retention_days (if set) are pruned. Every
+    checkpoint_interval entries the chain hash is also recorded in
+    logs/audit_checkpoints.jsonl for incremental verification. Each written
+    batch is also handed to every sink's write_batch() (e.g. AuditStore).
+    Entries are flushed on close() and at interpreter exit. If a write fails,
+    the segment is cut back to its last complete write and the unwritten
+    entries are requeued; close() raises if they still cannot be written.
+
+    The chain continues from the newest segment's last entry, so only one
+    process should write to a log directory at a time.
+    """
+
+    def __init__(self, log_dir: str = AUDIT_LOG_DIR, batch_size: int = 1000,
+                 flush_interval: float = 0.2, fsync: str = 'interval', fsync_interval: float = 1.0,
+                 sinks: Optional[List[Any]] = None, checkpoint_interval: int = 10000,
+                 max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES, compress: bool = True,
+                 retention_days: Optional[int] = None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync} (expected one of {FSYNC_POLICIES})")
+
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.sinks = list(sinks or [])
+        self.checkpoint_interval = checkpoint_interval
+        self.max_segment_bytes = max_segment_bytes
+        self.compress = compress
+        self.retention_days = retention_days
+
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._idle = threading.Condition()
+        self._draining = False
+        self._closed = False
+        self._write_error: Optional[str] = None
+
+        self._file = None
+        self._file_path = None
+        self._file_offset = 0
+        self._day = None
+        self._segment_index = 0
+        # Compression and retention run off the writer thread, one job at a time
+        self._maintenance = ThreadPoolExecutor(max_workers=1, thread_name_prefix='audit-log-maintenance')
+        self._last_fsync = time.monotonic()
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._seq, self._prev_hash = recover_chain_state(self.log_dir)
+        self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+        self._thread.start()
+
+    def log(self, agent_name: str, action: str, details: Dict) -> Dict[str, Any]:
+        """
+        Queue an audit entry and return it immediately.
+
+        details are encoded to their canonical JSON before log() returns, so
+        later changes by the caller do not reach the log; the writer thread
+        puts that text into the line as is. The returned dict is the caller's
+        and is never chained ("seq", "prev_hash" and "hash" exist only in the log).
+        """
+        if self._closed:
+            raise RuntimeError("AuditLogger is closed")
+
+        timestamp = datetime.now().isoformat()
+        self._pending.append((timestamp, agent_name, action, encode_details(details)))
+        log_entry = {
+            "timestamp": timestamp,
+            "agent": agent_name,
+            "action": action,
+            "details": details
+        }
+
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+        return log_entry
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until the queue is written (True) or a write fails (False) and the writer is idle"""
+        self._wake.set()
+        with self._idle:
+            self._idle.wait_for(lambda: not self._draining and (not self._pending or self._write_error), timeout)
+            return not self._pending and not self._draining
+
+    def close(self):
+        """Write all pending entries and stop the writer thread (raises if entries could not be written)"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        if self._pending:
+            raise RuntimeError(f"{len(self._pending)} audit entries could not be written to {self.log_dir}: "
+                               f"{self._write_error}")
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            closing = self._closed
+
+            with self._idle:
+                self._draining = True
+            written = self._drain()
+            for _ in range(CLOSE_WRITE_ATTEMPTS - 1 if closing else 0):
+                if written:
+                    break
+                time.sleep(self.flush_interval)
+                written = self._drain()
+            try:
+                self._sync(force=closing)
+            except OSError as e:
+                print(f"❌ Error syncing audit log: {e}")
+            if closing:
+                self._close_file()
+                self._maintenance.shutdown(wait=True)
+                for sink in self.sinks:
+                    if hasattr(sink, 'close'):
+                        sink.close()
+            with self._idle:
+                self._draining = False
+                self._idle.notify_all()
+
+            if closing:
+                return
+
+    def _drain(self) -> bool:
+        """Write the queue in batches; False if a write failed (its entries are back in the queue)"""
+        while self._pending:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popleft())
+            if not self._write_batch(batch):
+                return False
+        return True
+
+    def _write_batch(self, batch: List[Tuple[str, str, str, str]]) -> bool:
+        """
+        Chain and append a batch, then hand the written entries to the sinks.
+        The chain state only advances past entries that reached the file; on
+        a write error the rest of the batch is requeued and False returned.
+        """
+        lines = []
+        checkpoints = []
+        buffered = 0
+        written = 0
+        first_seq = self._seq + 1
+        seq, prev_hash = self._seq, self._prev_hash
+        # Chain hash before the batch, then one per entry (for the sinks)
+        hashes = [prev_hash]
+
+        def commit():
+            nonlocal written
+            self._write_lines(lines)
+            self._seq, self._prev_hash = seq, prev_hash
+            written += len(lines)
+            lines.clear()
+
+        try:
+            for timestamp, agent_name, action, details_json in batch:
+                day = timestamp[:10].replace('-', '')
+                if self._file is None or day > self._day:
+                    # Stragglers stamped just before midnight stay in the new day's segment
+                    commit()
+                    buffered = 0
+                    self._start_day(day)
+                elif self._file_offset + buffered >= self.max_segment_bytes:
+                    commit()
+                    buffered = 0
+                    self._segment_index += 1
+                    self._open_file(segment_path(self.log_dir, self._day, self._segment_index))
+
+                seq += 1
+                line, prev_hash = chain_line(timestamp, agent_name, action, details_json, seq, prev_hash)
+                lines.append(line)
+                hashes.append(prev_hash)
+                buffered += len(line) + 1
+
+                if seq % self.checkpoint_interval == 0:
+                    # Lines are ASCII (ensure_ascii), so the byte offset is known before writing
+                    commit()
+                    buffered = 0
+                    checkpoints.append((seq, prev_hash, os.path.basename(self._file_path),
+                                        self._file_offset, timestamp))
+            commit()
+            self._write_error = None
+        except Exception as e:
+            self._write_error = str(e)
+            unwritten = batch[written:]
+            print(f"❌ Error writing audit log ({len(unwritten)} entries requeued): {e}")
+            self._discard_partial_write()
+            self._pending.extendleft(reversed(unwritten))
+            batch = batch[:written]
+
+        try:
+            if batch and (self.fsync == 'batch' or checkpoints):
+                self._sync(force=True)
+            for checkpoint in checkpoints:
+                write_checkpoint(self.log_dir, *checkpoint)
+        except Exception as e:
+            print(f"❌ Error writing audit checkpoint: {e}")
+
+        # Sinks only get what the segment holds
+        if batch and self.sinks:
+            self._forward(batch, first_seq, hashes)
+        return self._write_error is None
+
+    def _forward(self, batch: List[Tuple[str, str, str, str]], first_seq: int, hashes: List[str]):
+        # Sinks index the parsed details, so they are decoded here and only when sinks exist
+        entries = []
+        for offset, (timestamp, agent_name, action, details_json) in enumerate(batch):
+            entries.append({
+                "timestamp": timestamp,
+                "agent": agent_name,
+                "action": action,
+                "details": json.loads(details_json),
+                "seq": first_seq + offset,
+                "prev_hash": hashes[offset],
+                "hash": hashes[offset + 1]
+            })
+        for sink in self.sinks:
+            try:
+                sink.write_batch(entries)
+            except Exception as e:
+                print(f"❌ Error writing audit batch to {type(sink).__name__}: {e}")
+
+    def _discard_partial_write(self):
+        """Cut the live segment back to its last complete write; the next batch reopens it"""
+        if self._file is None:
+            return
+        path, offset = self._file_path, self._file_offset
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self._file = None
+        self._file_path = None
+        try:
+            if os.path.getsize(path) > offset:
+                os.truncate(path, offset)
+        except OSError as e:
+            print(f"❌ Could not truncate partial audit write in {path}: {e}")
+
+    def _write_lines(self, lines: List[str]):
+        if lines:
+            data = '\n'.join(lines) + '\n'
+            self._file.write(data)
+            self._file.flush()
+            self._file_offset += len(data)
+
+    def _sync(self, force: bool = False):
+        if self._file is None or self.fsync == 'never':
+            return
+        now = time.monotonic()
+        if force or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def _start_day(self, day: str):
+        # Continue the day's newest segment if it is still live and has room
+        self._day = day
+        self._segment_index = 0
+        for path in list_audit_segments(self.log_dir):
+            seg_day, index, compressed = parse_segment(path)
+            if seg_day == day:
+                self._segment_index = index
+                if compressed or os.path.getsize(path) >= self.max_segment_bytes:
+                    self._segment_index = index + 1
+        self._open_file(segment_path(self.log_dir, day, self._segment_index))
+
+    def _open_file(self, path: str):
+        self._sync(force=True)
+        self._close_file()
+        self._file = open(path, 'a')
+        self._file_path = path
+        self._file_offset = os.path.getsize(path)
+        self._maintenance.submit(self._maintain, path)
+
+    def _maintain(self, live_path: str):
+        """Compress closed segments and prune expired ones (maintenance thread)"""
+        try:
+            if self.retention_days is not None:
+                for path in expired_segments(self.log_dir, self.retention_days):
+                    if path != live_path:
+                        prune_segment(self.log_dir, path)
+            if self.compress:
+                for path in list_audit_segments(self.log_dir):
+                    if path != live_path and not path.endswith('.gz'):
+                        compress_segment(path)
+        except Exception as e:
+            print(f"❌ Error maintaining audit log segments: {e}")
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_path = None
+
+
+_default_logger: Optional[AuditLogger] = None
+_default_logger_lock = threading.Lock()
+
+
+def get_audit_logger() -> AuditLogger:
+    """Return the process-wide audit logger, starting it on first use"""
+    global _default_logger
+    if _default_logger is None:
+        with _default_logger_lock:
+            if _default_logger is None:
+                # AUDIT_DB_PATH="" turns the indexed store off
+                sinks = []
+                db_path = os.getenv('AUDIT_DB_PATH', AUDIT_DB_PATH)
+                if db_path:
+                    sinks.append(AuditStore(db_path))
+
+                retention_days = os.getenv('AUDIT_LOG_RETENTION_DAYS')
+                _default_logger = AuditLogger(
+                    fsync=os.getenv('AUDIT_LOG_FSYNC', 'interval'),
+                    batch_size=int(os.getenv('AUDIT_LOG_BATCH_SIZE', '1000')),
+                    sinks=sinks,
+                    max_segment_bytes=int(float(os.getenv('AUDIT_LOG_MAX_SEGMENT_MB', '64')) * 1024 * 1024),
+                    compress=os.getenv('AUDIT_LOG_COMPRESS', '1') != '0',
+                    retention_days=int(retention_days) if retention_days else None
+                )
+                atexit.register(_default_logger.close)
+    return _default_logger
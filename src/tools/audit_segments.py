@@ -0,0 +1,159 @@
+# =============================================================================
+# File: src/tools/audit_segments.py
+# =============================================================================
+
+import glob
+import gzip
+import json
+import os
+import re
+import shutil
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# audit_YYYYMMDD.jsonl, then audit_YYYYMMDD.1.jsonl, .2, ... after size rotation;
+# closed segments are compressed to the same name plus .gz
+_SEGMENT_PATTERN = re.compile(r'^audit_(\d{8})(?:\.(\d+))?\.jsonl(\.gz)?$')
+
+
+def segment_path(log_dir: str, day: str, index: int = 0) -> str:
+    """Path of the live (uncompressed) segment for a YYYYMMDD day and rotation index"""
+    suffix = f".{index}" if index else ""
+    return os.path.join(log_dir, f"audit_{day}{suffix}.jsonl")
+
+
+def parse_segment(path: str) -> Optional[Tuple[str, int, bool]]:
+    """Return (YYYYMMDD day, rotation index, compressed) or None if not a segment"""
+    match = _SEGMENT_PATTERN.match(os.path.basename(path))
+    if not match:
+        return None
+    return match.group(1), int(match.group(2) or 0), bool(match.group(3))
+
+
+def segment_name(path: str) -> str:
+    """Stable identifier of a segment, the same before and after compression"""
+    name = os.path.basename(path)
+    return name[:-3] if name.endswith('.gz') else name
+
+
+def list_audit_segments(log_dir: str) -> List[str]:
+    """Return audit log segments in write order (oldest first), compressed or not"""
+    segments = {}
+    for path in glob.glob(os.path.join(log_dir, 'audit_*.jsonl*')):
+        parsed = parse_segment(path)
+        if parsed is None:
+            continue
+        day, index, compressed = parsed
+        # While a segment is being compressed both files exist; the .gz is
+        # only renamed into place once complete, so prefer it
+        if compressed or (day, index) not in segments:
+            segments[(day, index)] = path
+    return [segments[key] for key in sorted(segments)]
+
+
+def open_segment(path: str):
+    """Open a segment for binary reading, following it if it was compressed meanwhile"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        return gzip.open(f"{path}.gz", 'rb')
+
+
+def iter_segment_lines(path: str, offset: int = 0) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (end offset, line) for each complete line of a segment.
+
+    Offsets count uncompressed bytes, so a position recorded while a segment
+    was live stays valid after it is compressed.
+    """
+    with open_segment(path) as f:
+        f.seek(offset)
+        position = offset
+        for raw in f:
+            if not raw.endswith(b'\n'):
+                # A partially written trailing line is picked up on the next pass
+                break
+            position += len(raw)
+            yield position, raw.decode('utf-8').rstrip('\n')
+
+
+def read_last_line(path: str, block_size: int = 8192) -> Optional[str]:
+    """Read the last complete line of a segment (live segments without a full scan)"""
+    if path.endswith('.gz'):
+        last = None
+        for _, line in iter_segment_lines(path):
+            if line.strip():
+                last = line
+        return last
+
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        data = b''
+        position = end
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+            lines = data.rstrip(b'\n').split(b'\n')
+            if len(lines) > 1 or position == 0:
+                last = lines[-1].strip()
+                return last.decode('utf-8') if last else None
+    return None
+
+
+def _day_key(value: str) -> str:
+    """YYYYMMDD for an ISO date/timestamp"""
+    return value[:10].replace('-', '')
+
+
+def iter_audit_entries(log_dir: str, start: Optional[str] = None,
+                       end: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream audit entries across compressed and live segments, oldest first.
+
+    start/end are ISO dates or timestamps (inclusive; a date-only end covers
+    that whole day). Segments outside the range are skipped without opening.
+    """
+    if end and len(end) == 10:
+        end = f'{end}T23:59:59.999999'
+    # A segment holds entries up to its own day; a few stragglers from just
+    # before midnight can land in the next day's segment
+    last_day = None
+    if end:
+        last_day = (datetime.strptime(_day_key(end), '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d')
+
+    for path in list_audit_segments(log_dir):
+        day = parse_segment(path)[0]
+        if start and day < _day_key(start):
+            continue
+        if last_day and day > last_day:
+            break
+        for _, line in iter_segment_lines(path):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            timestamp = entry.get('timestamp', '')
+            if (start and timestamp < start) or (end and timestamp > end):
+                continue
+            yield entry
+
+
+def compress_segment(path: str) -> str:
+    """Gzip a closed segment in place and return the compressed path"""
+    gz_path = f"{path}.gz"
+    tmp_path = f"{gz_path}.tmp"
+    with open(path, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp_path, gz_path)
+    os.remove(path)
+    return gz_path
+
+
+def expired_segments(log_dir: str, retention_days: int, today: Optional[date] = None) -> List[str]:
+    """Segments whose day is older than the retention window"""
+    cutoff = ((today or date.today()) - timedelta(days=retention_days)).strftime('%Y%m%d')
+    return [path for path in list_audit_segments(log_dir) if parse_segment(path)[0] < cutoff]
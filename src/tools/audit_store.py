@@ -0,0 +1,234 @@
+# =============================================================================
+# File: src/tools/audit_store.py
+# =============================================================================
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.tools.audit_segments import list_audit_segments, open_segment
+
+AUDIT_DB_PATH = 'logs/audit.sqlite'
+
+# Keys in an entry's details that identify the entity and account it touched
+ENTITY_KEYS = ('entity_id', 'entity')
+ACCOUNT_KEYS = ('account_number', 'account')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_entries (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    agent TEXT,
+    action TEXT,
+    entity_id TEXT,
+    account_number TEXT,
+    hash TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_entries (timestamp);
+CREATE INDEX IF NOT EXISTS idx_audit_agent ON audit_entries (agent, timestamp);
+CREATE INDEX IF NOT EXISTS idx_audit_action ON audit_entries (action, timestamp);
+CREATE INDEX IF NOT EXISTS idx_audit_entity_account ON audit_entries (entity_id, account_number, timestamp);
+"""
+
+# Chained entries are unique by hash, so re-importing a segment adds nothing
+_HASH_INDEX = 'CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_hash ON audit_entries (hash)'
+
+
+def _first_present(details: Any, keys) -> Optional[str]:
+    if isinstance(details, dict):
+        for key in keys:
+            if details.get(key) is not None:
+                return str(details[key])
+    return None
+
+
+class AuditStore:
+    """
+    Indexed SQLite store for audit entries.
+
+    Entries are indexed by timestamp, agent, action and the entity/account found
+    in their details. The store can be attached to AuditLogger as a sink so every
+    batch the writer thread flushes is bulk-inserted in one transaction.
+    Entries already stored (same chain hash) are skipped, so backfills can be
+    re-run safely.
+    """
+
+    def __init__(self, db_path: str = AUDIT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+        self._ensure_hash_index()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets queries run while the writer inserts
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _ensure_hash_index(self):
+        """Create the unique hash index, first dropping duplicates left by earlier backfills"""
+        conn = self._connection()
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_audit_hash'").fetchone()
+        if exists:
+            return
+        with conn:
+            removed = conn.execute(
+                'DELETE FROM audit_entries WHERE hash IS NOT NULL AND id NOT IN '
+                '(SELECT MIN(id) FROM audit_entries WHERE hash IS NOT NULL GROUP BY hash)'
+            ).rowcount
+            conn.execute(_HASH_INDEX)
+        if removed:
+            print(f"🧹 Removed {removed} duplicate audit entries from {self.db_path}")
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def insert_many(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Bulk-insert audit entries in a single transaction; returns how many were new"""
+        rows = [
+            (
+                entry.get('timestamp'),
+                entry.get('agent'),
+                entry.get('action'),
+                _first_present(entry.get('details'), ENTITY_KEYS),
+                _first_present(entry.get('details'), ACCOUNT_KEYS),
+                entry.get('hash'),
+                json.dumps(entry.get('details'), default=str)
+            )
+            for entry in entries
+        ]
+        conn = self._connection()
+        with conn:
+            inserted = conn.executemany(
+                'INSERT OR IGNORE INTO audit_entries '
+                '(timestamp, agent, action, entity_id, account_number, hash, details) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            ).rowcount
+        return inserted
+
+    def write_batch(self, entries: List[Dict[str, Any]]):
+        """AuditLogger sink interface"""
+        self.insert_many(entries)
+
+    def import_jsonl(self, paths: Iterable[str], batch_size: int = 10000) -> int:
+        """Backfill the store from existing audit segments (plain or .gz); returns entries added"""
+        imported = 0
+        for path in paths:
+            batch = []
+            with open_segment(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    batch.append(json.loads(line))
+                    if len(batch) >= batch_size:
+                        imported += self.insert_many(batch)
+                        batch = []
+            if batch:
+                imported += self.insert_many(batch)
+        return imported
+
+    def query(self, entity_id: Optional[str] = None, account_number: Optional[str] = None,
+              agent: Optional[str] = None, action: Optional[str] = None,
+              start: Optional[str] = None, end: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Find audit entries matching every given filter, oldest first.
+
+        start/end are ISO timestamps or dates; a date-only end includes that whole day.
+        """
+        clauses, params = [], []
+        for column, value in (('entity_id', entity_id), ('account_number', account_number),
+                              ('agent', agent), ('action', action)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(str(value))
+        if start:
+            clauses.append('timestamp >= ?')
+            params.append(start)
+        if end:
+            if len(end) == 10:
+                end = f'{end}T23:59:59.999999'
+            clauses.append('timestamp <= ?')
+            params.append(end)
+
+        sql = 'SELECT timestamp, agent, action, entity_id, account_number, hash, details FROM audit_entries'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY timestamp, id'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+
+        results = []
+        for row in self._connection().execute(sql, params):
+            entry = dict(row)
+            entry['details'] = json.loads(entry['details']) if entry['details'] else None
+            results.append(entry)
+        return results
+
+    def count(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM audit_entries').fetchone()[0]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Query or backfill the audit store from the command line"""
+    parser = argparse.ArgumentParser(description='Indexed audit trail store')
+    parser.add_argument('--db', default=os.getenv('AUDIT_DB_PATH') or AUDIT_DB_PATH,
+                        help='SQLite database path')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    query_parser = subparsers.add_parser('query', help='Find audit entries')
+    query_parser.add_argument('--entity', help='Entity ID, e.g. ENT001')
+    query_parser.add_argument('--account', help='Account number, e.g. 5400')
+    query_parser.add_argument('--agent', help='Agent name')
+    query_parser.add_argument('--action', help='Action name')
+    query_parser.add_argument('--start', help='Start date/timestamp (inclusive)')
+    query_parser.add_argument('--end', help='End date/timestamp (inclusive)')
+    query_parser.add_argument('--limit', type=int, help='Maximum entries to return')
+    query_parser.add_argument('--json', action='store_true', help='Print entries as JSON lines')
+
+    import_parser = subparsers.add_parser('import', help='Backfill from audit JSONL files')
+    import_parser.add_argument('files', nargs='*', help='Files to import (default: every segment in logs/)')
+
+    args = parser.parse_args(argv)
+    store = AuditStore(args.db)
+
+    if args.command == 'import':
+        files = args.files or list_audit_segments('logs')
+        imported = store.import_jsonl(files)
+        print(f"✅ Imported {imported} new audit entries from {len(files)} file(s) into {args.db}")
+        return 0
+
+    start = time.perf_counter()
+    entries = store.query(args.entity, args.account, args.agent, args.action,
+                          args.start, args.end, args.limit)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for entry in entries:
+        if args.json:
+            print(json.dumps(entry, default=str))
+        else:
+            print(f"{entry['timestamp']}  {entry['agent'] or '-':<30} {entry['action'] or '-':<25} "
+                  f"{entry['entity_id'] or '-':<8} {entry['account_number'] or '-':<8}")
+    print(f"🔍 {len(entries)} entries in {elapsed_ms:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+# =============================================================================
+# File: src/tools/context_builder.py
+# =============================================================================
+
+import json
+import math
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+ACCOUNT_MAPPING_PATH = 'src/config/account_mapping.json'
+DEFAULT_TOKEN_BUDGET = 2000
+DEFAULT_TOP_N = 10
+
+# Categories whose balances are normally debits; the rest are normally credits
+DEBIT_NORMAL = {'Asset', 'Expense'}
+
+# Detail levels tried, most to least detailed, until the context fits the budget
+_DETAIL_LEVELS = (None, 5, 3, 1, 0)
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|\s+|[^\sA-Za-z\d]")
+_encoding = None
+_encoding_loaded = False
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Count prompt tokens locally.
+
+    Uses tiktoken's cl100k_base encoding when installed; otherwise approximates
+    it (letter runs of up to ~4 characters, digit groups of up to 3 and each
+    punctuation mark count as a token, whitespace mostly merges into the next token).
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            _encoding = None
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        first = piece[0]
+        if first.isalpha():
+            tokens += max(1, math.ceil(len(piece) / 4))
+        elif first.isspace():
+            # Single spaces attach to the following word; newlines and runs do not
+            if '\n' in piece or len(piece) > 1:
+                tokens += 1
+        else:
+            tokens += 1
+    return tokens
+
+
+def _load_account_ranges(config_path: str) -> List[Tuple[int, int, str]]:
+    try:
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+    except Exception:
+        return []
+    ranges = []
+    for range_key, category in config.get('account_ranges', {}).items():
+        start, end = range_key.split('-')
+        ranges.append((int(start), int(end), category))
+    return ranges
+
+
+def _money(value: float) -> str:
+    return f"${value:,.0f}"
+
+
+def _period_key(period: Any) -> Tuple[pd.Timestamp, str]:
+    """Sort key ordering periods by parsed date (unparseable ones first), then text"""
+    parsed = pd.to_datetime(period, errors='coerce')
+    return (parsed if pd.notna(parsed) else pd.Timestamp.min, str(period))
+
+
+class ContextBuilder:
+    """
+    Builds a compact statistical digest of trial balance datasets for the LLM.
+
+    Per dataset: totals, net balance by account category, top movers and
+    new/dropped accounts between its first and last period, and an anomaly
+    list. Across datasets: top movers and new/dropped accounts of the dataset
+    with the latest period against each older one, whatever order the
+    datasets were given in. The rendered context is kept within token_budget by
+    lowering the number of items listed per section, so its size depends on
+    top_n and the budget, not on the number of rows.
+    """
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET, top_n: int = DEFAULT_TOP_N,
+                 config_path: str = ACCOUNT_MAPPING_PATH, materiality_threshold: float = 0.15):
+        self.token_budget = token_budget
+        self.top_n = top_n
+        self.materiality_threshold = materiality_threshold
+        self.account_ranges = _load_account_ranges(config_path)
+
+    @classmethod
+    def from_environment(cls) -> 'ContextBuilder':
+        """Builder configured by CONTEXT_TOKEN_BUDGET / CONTEXT_TOP_N"""
+        return cls(
+            token_budget=int(os.getenv('CONTEXT_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET)),
+            top_n=int(os.getenv('CONTEXT_TOP_N', DEFAULT_TOP_N))
+        )
+
+    # ------------------------------------------------------------------
+    # Digest computation
+    # ------------------------------------------------------------------
+
+    def _categorize(self, accounts: pd.Series) -> pd.Series:
+        numbers = pd.to_numeric(accounts, errors='coerce')
+        categories = pd.Series('Unknown', index=accounts.index, dtype=object)
+        for start, end, category in self.account_ranges:
+            categories[(numbers >= start) & (numbers <= end)] = category
+        return categories
+
+    @staticmethod
+    def _balances(df: pd.DataFrame) -> pd.DataFrame:
+        """Net balance and name per account"""
+        frame = pd.DataFrame({
+            'account_number': df['account_number'].astype(str),
+            'net': df.get('debit', 0) - df.get('credit', 0)
+        })
+        if 'account_name' in df.columns:
+            frame['account_name'] = df['account_name'].astype(str)
+        else:
+            frame['account_name'] = ''
+        grouped = frame.groupby('account_number', sort=False)
+        return pd.DataFrame({'net': grouped['net'].sum(), 'account_name': grouped['account_name'].last()})
+
+    def _compare(self, current: pd.DataFrame, prior: pd.DataFrame) -> Dict[str, Any]:
+        """Movers and new/dropped accounts between two balance frames"""
+        joined = current[['net', 'account_name']].join(
+            prior[['net', 'account_name']], how='outer', lsuffix='_current', rsuffix='_prior')
+        new_mask = joined['net_prior'].isna()
+        dropped_mask = joined['net_current'].isna()
+        both = joined[~new_mask & ~dropped_mask]
+
+        change = both['net_current'] - both['net_prior']
+        base = both['net_prior'].abs()
+        pct = (change / base.where(base != 0)) * 100
+        movers = pd.DataFrame({
+            'account_name': both['account_name_current'],
+            'prior': both['net_prior'],
+            'current': both['net_current'],
+            'change': change,
+            'pct': pct
+        })
+        movers = movers[movers['change'] != 0]
+        movers = movers.reindex(movers['change'].abs().sort_values(ascending=False).index)
+
+        def listing(frame, column):
+            return pd.DataFrame({'account_name': frame['account_name_' + column], 'net': frame['net_' + column]})
+
+        material = movers[movers['pct'].abs() > self.materiality_threshold * 100]
+        return {
+            'movers': movers,
+            'material_count': int(len(material)),
+            'new': listing(joined[new_mask], 'current'),
+            'dropped': listing(joined[dropped_mask], 'prior')
+        }
+
+    def digest_dataset(self, name: str, df: pd.DataFrame) -> Dict[str, Any]:
+        """Compute the statistical digest of one standardized dataset"""
+        digest = {'name': name, 'rows': len(df)}
+        if len(df) == 0 or 'account_number' not in df.columns:
+            return digest
+
+        debits = float(df['debit'].sum()) if 'debit' in df.columns else 0.0
+        credits = float(df['credit'].sum()) if 'credit' in df.columns else 0.0
+        digest.update({
+            'accounts': int(df['account_number'].nunique()),
+            'debits': debits,
+            'credits': credits,
+        })
+
+        periods = []
+        if 'period' in df.columns:
+            periods = sorted(df['period'].dropna().unique(), key=_period_key)
+        digest['periods'] = periods
+        digest['latest_period'] = _period_key(periods[-1])[0] if periods else pd.Timestamp.min
+
+        # Latest period is the dataset's closing position
+        latest = df[df['period'] == periods[-1]] if len(periods) > 1 else df
+        balances = self._balances(latest)
+        balances['category'] = self._categorize(balances.index.to_series())
+        digest['category_totals'] = balances.groupby('category')['net'].sum().to_dict()
+        digest['balances'] = balances
+
+        if len(periods) > 1:
+            first = self._balances(df[df['period'] == periods[0]])
+            digest['within'] = self._compare(balances, first)
+
+        digest['anomalies'] = self._anomalies(df, balances, periods)
+        return digest
+
+    def _cached_digest(self, name: str, df: pd.DataFrame, digest_cache: Optional[Dict]) -> Dict[str, Any]:
+        if digest_cache is None:
+            return self.digest_dataset(name, df)
+        key = (name, id(df))
+        cached = digest_cache.get(key)
+        # The frame is kept alongside so its id cannot be reused while cached
+        if cached is None or cached[0] is not df:
+            cached = (df, self.digest_dataset(name, df))
+            digest_cache[key] = cached
+        return cached[1]
+
+    def _anomalies(self, df: pd.DataFrame, balances: pd.DataFrame, periods: List[str]) -> List[str]:
+        anomalies = []
+
+        # Debits and credits should agree within each period
+        if 'debit' in df.columns and 'credit' in df.columns:
+            keys = df['period'] if len(periods) > 1 else pd.Series('all', index=df.index)
+            sums = df.groupby(keys)[['debit', 'credit']].sum()
+            for period, row in sums.iterrows():
+                difference = row['debit'] - row['credit']
+                if abs(difference) > 0.005:
+                    label = 'overall' if period == 'all' else period
+                    anomalies.append(f"Out of balance {label}: debits exceed credits by {_money(difference)}"
+                                     if difference > 0 else
+                                     f"Out of balance {label}: credits exceed debits by {_money(-difference)}")
+
+        # Balance on the side opposite to the category's normal balance
+        debit_normal = balances['category'].isin(DEBIT_NORMAL)
+        known = balances['category'] != 'Unknown'
+        abnormal = balances[known & ((debit_normal & (balances['net'] < 0)) | (~debit_normal & (balances['net'] > 0)))]
+        for account, row in abnormal.iterrows():
+            anomalies.append(f"Abnormal {row['category'].lower()} balance {account} {row['account_name']}: {_money(row['net'])}")
+
+        unmapped = balances[~known]
+        if len(unmapped):
+            anomalies.append(f"{len(unmapped)} account(s) outside configured ranges: {', '.join(unmapped.index[:5])}")
+
+        period_keys = ['account_number', 'period'] if 'period' in df.columns else ['account_number']
+        duplicates = df.duplicated(subset=period_keys).sum()
+        if duplicates:
+            anomalies.append(f"{int(duplicates)} duplicate account row(s) within a period")
+        return anomalies
+
+    # ------------------------------------------------------------------
+    # Rendering
+    # ------------------------------------------------------------------
+
+    def _render_comparison(self, comparison: Dict[str, Any], limit: int, lines: List[str]):
+        if not len(comparison['movers']) and not len(comparison['new']) and not len(comparison['dropped']):
+            lines.append("- No account differences")
+            return
+        movers = comparison['movers']
+        if limit and len(movers):
+            lines.append(f"- Top movers ({comparison['material_count']} material > "
+                         f"{self.materiality_threshold:.0%} of {len(movers)} changed):")
+            for account, row in movers.head(limit).iterrows():
+                pct = f"{row['pct']:+.0f}%" if pd.notna(row['pct']) else "n/a"
+                lines.append(f"  {account} {row['account_name']}: {_money(row['prior'])} -> "
+                             f"{_money(row['current'])} ({pct})")
+        for key, label in (('new', 'New accounts'), ('dropped', 'Dropped accounts')):
+            items = comparison[key]
+            if not len(items):
+                continue
+            shown = ", ".join(f"{account} {row['account_name']} {_money(row['net'])}"
+                              for account, row in items.head(limit).iterrows())
+            more = f" (+{len(items) - limit} more)" if len(items) > limit else ""
+            lines.append(f"- {label}: {len(items)}" + (f": {shown}{more}" if limit else ""))
+
+    def render(self, digests: List[Dict[str, Any]], cross: List[Tuple[str, str, Dict[str, Any]]],
+               period_info: Optional[Dict], request: str, limit: int) -> str:
+        lines = [f"USER REQUEST: {request}"]
+        if period_info:
+            lines.append(f"ANALYSIS PERIOD: {period_info['description']} "
+                         f"({period_info['start_date']} to {period_info['end_date']})")
+        lines.append("\nDATASET DIGESTS:")
+
+        total_debits = total_credits = 0.0
+        total_accounts = 0
+        for digest in digests:
+            if 'accounts' not in digest:
+                lines.append(f"\n{digest['name']}: No data for the specified period")
+                continue
+            total_debits += digest['debits']
+            total_credits += digest['credits']
+            total_accounts += digest['accounts']
+
+            periods = digest['periods']
+            span = f"{periods[0]} to {periods[-1]} ({len(periods)} periods)" if len(periods) > 1 else \
+                (periods[0] if periods else "single period")
+            lines.append(f"\n{digest['name']} [{span}]: {digest['accounts']} accounts, {digest['rows']} rows, "
+                         f"debits {_money(digest['debits'])}, credits {_money(digest['credits'])}, "
+                         f"net {_money(digest['debits'] - digest['credits'])}")
+            categories = ", ".join(f"{cat} {_money(total)}" for cat, total in sorted(digest['category_totals'].items()))
+            lines.append(f"- Net by category (latest period): {categories}")
+
+            if 'within' in digest:
+                lines.append(f"- Change {periods[0]} -> {periods[-1]}:")
+                self._render_comparison(digest['within'], limit, lines)
+
+            anomalies = digest['anomalies']
+            if anomalies:
+                lines.append(f"- Anomalies ({len(anomalies)}):")
+                lines.extend(f"  {anomaly}" for anomaly in anomalies[:max(limit, 1)])
+                if len(anomalies) > max(limit, 1):
+                    lines.append(f"  (+{len(anomalies) - max(limit, 1)} more)")
+
+        for current_name, prior_name, comparison in cross:
+            lines.append(f"\nCOMPARISON {current_name} vs {prior_name} (latest periods):")
+            self._render_comparison(comparison, limit, lines)
+
+        lines.append(f"\nOVERALL: {total_accounts} accounts, debits {_money(total_debits)}, "
+                     f"credits {_money(total_credits)}, net {_money(total_debits - total_credits)}")
+        return "\n".join(lines)
+
+    def build(self, datasets: Dict[str, pd.DataFrame], period_info: Optional[Dict] = None,
+              request: str = "", digest_cache: Optional[Dict] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Return (context, stats) with the context fitted to the token budget.
+
+        digest_cache (any dict) lets several builds share digests of the same
+        DataFrame objects, e.g. the requests of one batch.
+        """
+        digests = [self._cached_digest(name, df, digest_cache) for name, df in datasets.items()]
+        # Newest closing position first; datasets without a parseable period go last
+        with_data = sorted((d for d in digests if 'balances' in d), key=lambda d: d['latest_period'], reverse=True)
+        cross = [(with_data[0]['name'], other['name'], self._compare(with_data[0]['balances'], other['balances']))
+                 for other in with_data[1:]]
+
+        for level in _DETAIL_LEVELS:
+            limit = self.top_n if level is None else min(level, self.top_n)
+            context = self.render(digests, cross, period_info, request, limit)
+            tokens = estimate_tokens(context)
+            if tokens <= self.token_budget:
+                break
+        else:
+            # Even the leanest digest is over budget (very many datasets): cut whole lines
+            kept, tokens = [], 0
+            for line in context.split("\n"):
+                line_tokens = estimate_tokens(line) + 1
+                if tokens + line_tokens > self.token_budget:
+                    kept.append("[context truncated to token budget]")
+                    break
+                kept.append(line)
+                tokens += line_tokens
+            context = "\n".join(kept)
+            tokens = estimate_tokens(context)
+
+        stats = {
+            "context_tokens": tokens,
+            "token_budget": self.token_budget,
+            "items_per_section": limit,
+            "datasets": len(digests)
+        }
+        return context, stats
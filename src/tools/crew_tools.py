@@ -6,8 +6,16 @@ from crewai.tools import tool
 import pandas as pd
 import json
 import os
+from src.tools.upload_tools import UploadFileWriter, UPLOAD_FORMATS
+from src.tools.upload_manifest import UploadManifest
+from src.tools.upload_client import TaxProvisionUploadClient
+from src.runtime.telemetry import track_tool
+from src.tools.tool_cache import memoize_tool
+from src.tools.data_tools import TrialBalanceTools
 
 @tool
+@track_tool
+@memoize_tool(file_args=['file_path'])
 def load_trial_balance(file_path: str) -> str:
     """
     Load and validate trial balance data from CSV file.
@@ -44,6 +52,8 @@ def load_trial_balance(file_path: str) -> str:
         return f"Error loading trial balance: {str(e)}"
 
 @tool
+@track_tool
+@memoize_tool(files=['src/config/account_mapping.json'])
 def categorize_account(account_number: str, account_name: str) -> str:
     """
     Categorize account based on account number and mapping rules.
@@ -97,6 +107,8 @@ def categorize_account(account_number: str, account_name: str) -> str:
         return f"Error categorizing account: {str(e)}"
 
 @tool
+@track_tool
+@memoize_tool(file_args=['current_file', 'prior_file'])
 def variance_analysis(current_file: str, prior_file: str) -> str:
     """
     Compare trial balances between periods and identify variances.
@@ -119,46 +131,8 @@ def variance_analysis(current_file: str, prior_file: str) -> str:
         current_df = pd.read_csv(current_file)
         prior_df = pd.read_csv(prior_file)
         
-        # Calculate net balances
-        current_df['net_balance'] = current_df['debit'] - current_df['credit']
-        prior_df['net_balance'] = prior_df['debit'] - prior_df['credit']
-        
-        # Merge on account number
-        comparison = current_df.merge(
-            prior_df[['account_number', 'net_balance']], 
-            on='account_number', 
-            how='outer', 
-            suffixes=('_current', '_prior')
-        ).fillna(0)
-        
-        # Calculate variances
-        comparison['variance_amount'] = comparison['net_balance_current'] - comparison['net_balance_prior']
-        comparison['variance_pct'] = comparison.apply(
-            lambda row: 0 if row['net_balance_prior'] == 0 
-            else (row['variance_amount'] / abs(row['net_balance_prior'])) * 100, 
-            axis=1
-        )
-        
-        # Flag material variances (>15%)
-        material_variances = comparison[abs(comparison['variance_pct']) > 15]
-        
-        # New accounts (in current but not prior)
-        new_accounts = comparison[comparison['net_balance_prior'] == 0]
-        new_accounts = new_accounts[new_accounts['net_balance_current'] != 0]
-        
-        result = {
-            "total_accounts_current": len(current_df),
-            "total_accounts_prior": len(prior_df),
-            "material_variances_count": len(material_variances),
-            "new_accounts_count": len(new_accounts),
-            "variance_details": material_variances[
-                ['account_number', 'account_name', 'net_balance_current', 
-                 'net_balance_prior', 'variance_amount', 'variance_pct']
-            ].to_dict('records'),
-            "new_account_details": new_accounts[
-                ['account_number', 'account_name', 'net_balance_current']
-            ].to_dict('records')
-        }
+        # Flag material variances (>15%) and new accounts
+        result = TrialBalanceTools.compare_periods(current_df, prior_df, materiality_pct=15)
         
         return json.dumps(result, indent=2)
         
@@ -166,6 +140,8 @@ def variance_analysis(current_file: str, prior_file: str) -> str:
         return f"Error in variance analysis: {str(e)}"
 
 @tool
+@track_tool
+@memoize_tool(files=['data/input/trial_balance_2024.csv'])
 def validate_compliance(data_summary: str) -> str:
     """
     Validate trial balance for compliance and data integrity.
@@ -214,69 +190,117 @@ def validate_compliance(data_summary: str) -> str:
     except Exception as e:
         return f"Error in compliance validation: {str(e)}"
 
-@tool  
-def prepare_upload_format(validation_results: str) -> str:
+@tool
+@track_tool
+def prepare_upload_format(validation_results: str, output_format: str = "json", mode: str = "full") -> str:
     """
     Prepare validated trial balance data for upload to tax provision systems.
     
     Args:
         validation_results (str): Results from compliance validation
+        output_format (str): Upload file format - json, ndjson, csv or parquet
+        mode (str): "full" for a complete snapshot, or "delta" for only the accounts
+            added, changed or removed since the last successful upload (JSON only)
         
     Returns:
-        str: JSON formatted data ready for tax provision upload
+        str: JSON summary of the upload file ready for tax provision upload
     """
     try:
+        output_format = output_format.lower().strip()
+        mode = mode.lower().strip()
+        if output_format not in UPLOAD_FORMATS:
+            return f"Error: Unsupported upload format: {output_format} (expected one of {list(UPLOAD_FORMATS)})"
+        if mode not in ("full", "delta"):
+            return f"Error: Unsupported upload mode: {mode} (expected 'full' or 'delta')"
+        if mode == "delta" and output_format != "json":
+            return "Error: Delta uploads are only available in json format"
+        
+        # Only json and ndjson can be transmitted; check before any file is written
+        client = TaxProvisionUploadClient.from_environment()
+        if client is not None and output_format not in ("json", "ndjson"):
+            return f"Error: Only json and ndjson uploads can be transmitted, not {output_format}"
+        
         # Load current trial balance for formatting
         current_file = "data/input/trial_balance_2024.csv"
         
         if not os.path.exists(current_file):
             return f"Error: Current trial balance file not found: {current_file}"
         
-        df = pd.read_csv(current_file)
-        
         # Create output directory
         output_dir = "data/output"
         os.makedirs(output_dir, exist_ok=True)
         
+        # Totals come first in the document, so sum them in a separate streaming pass
+        totals = UploadFileWriter.compute_totals(current_file)
+        
         # Format for tax provision system
-        tax_provision_data = {
+        header = {
             "entity_id": "ENT001",
             "period_end": "2024-12-31",
             "currency": "USD",
-            "total_debits": float(df['debit'].sum()),
-            "total_credits": float(df['credit'].sum()),
-            "account_details": []
+            "total_debits": totals["total_debits"],
+            "total_credits": totals["total_credits"]
         }
         
-        # Process each account
-        for _, row in df.iterrows():
-            account_detail = {
-                "account_number": str(row['account_number']),
-                "account_name": str(row['account_name']),
-                "debit_amount": float(row['debit']),
-                "credit_amount": float(row['credit']),
-                "net_balance": float(row['debit'] - row['credit']),
-                "source_system": row.get('source_system', 'SAP')
-            }
-            tax_provision_data["account_details"].append(account_detail)
-        
-        # Save formatted data
+        # Compare against the last successful upload for this entity/period
+        manifest = UploadManifest.load(header["entity_id"], header["period_end"])
+        chunks = UploadFileWriter.iter_chunks(current_file)
         timestamp = pd.Timestamp.now().strftime("%Y%m%d_%H%M%S")
-        output_file = f"{output_dir}/tax_provision_upload_{timestamp}.json"
         
-        with open(output_file, 'w') as f:
-            json.dump(tax_provision_data, f, indent=2)
+        if mode == "delta" and manifest.exists:
+            # The delta must be known before writing, so hash in a pass of its own
+            account_hashes = UploadFileWriter.hash_accounts(current_file)
+            delta = manifest.diff(account_hashes)
+            header.update({
+                "upload_type": "delta",
+                "base_upload": manifest.upload_file,
+                "added_accounts": delta["added"],
+                "changed_accounts": delta["changed"],
+                "removed_accounts": delta["removed"]
+            })
+            chunks = UploadFileWriter.filter_chunks(chunks, set(delta["added"]) | set(delta["changed"]))
+            output_file = f"{output_dir}/tax_provision_delta_{timestamp}{UPLOAD_FORMATS[output_format]}"
+        else:
+            # No previous upload to diff against - send a full snapshot, hashing
+            # the records for the manifest as they are written
+            delta = None
+            account_hashes = {}
+            chunks = UploadFileWriter.hashing_chunks(chunks, account_hashes)
+            output_file = f"{output_dir}/tax_provision_upload_{timestamp}{UPLOAD_FORMATS[output_format]}"
+        
+        # Stream account details to disk chunk by chunk
+        records_written = UploadFileWriter.write(output_file, header, chunks, output_format)
+        
+        # Transmit when an upload endpoint is configured; the manifest only moves
+        # forward once the tax system has accepted the upload
+        transmission = None
+        if client is not None:
+            with client:
+                transmission = client.upload_file(output_file)
+        manifest.record_upload(account_hashes, output_file)
         
         upload_summary = {
             "status": "SUCCESS",
             "output_file": output_file,
-            "total_accounts": len(df),
-            "total_debits": float(df['debit'].sum()),
-            "total_credits": float(df['credit'].sum()),
+            "output_format": output_format,
+            "upload_type": "delta" if delta is not None else "full",
+            "total_accounts": totals["total_accounts"],
+            "records_written": records_written,
+            "total_debits": totals["total_debits"],
+            "total_credits": totals["total_credits"],
             "upload_ready": True,
             "timestamp": timestamp
         }
         
+        if transmission is not None:
+            upload_summary["transmission"] = transmission
+        
+        if delta is not None:
+            upload_summary["base_upload"] = header["base_upload"]
+            upload_summary["accounts_added"] = len(delta["added"])
+            upload_summary["accounts_changed"] = len(delta["changed"])
+            upload_summary["accounts_removed"] = len(delta["removed"])
+        
         return json.dumps(upload_summary, indent=2)
         
     except Exception as e:
@@ -1,10 +1,10 @@
 
+import numpy as np
 import pandas as pd
 import json
 import os
 from typing import Dict, List, Tuple, Any
-from datetime import datetime
-import hashlib
+from src.tools.audit_log import get_audit_logger
 
 class TrialBalanceTools:
     
@@ -58,6 +58,89 @@ class TrialBalanceTools:
             "is_material": abs(variance_pct) > 15  # 15% threshold
         }
     
+    @staticmethod
+    def categorize_accounts(df: pd.DataFrame, config: Dict) -> pd.DataFrame:
+        """Add category and tax_category columns for every account (vectorized range lookup)"""
+        categorized = df.copy()
+        numbers = pd.to_numeric(categorized['account_number'], errors='coerce')
+        categories = pd.Series('Unknown', index=categorized.index, dtype=object)
+        for range_key, category in config.get('account_ranges', {}).items():
+            start, end = range_key.split('-')
+            categories[(numbers >= int(start)) & (numbers <= int(end))] = category
+        
+        # Same rule as the categorize_account tool: first tax category of the account category
+        tax_categories = {category: values[0] for category, values in config.get('tax_categories', {}).items() if values}
+        categorized['category'] = categories
+        categorized['tax_category'] = categories.map(tax_categories).fillna('Standard')
+        return categorized
+    
+    @staticmethod
+    def compare_periods(current_df: pd.DataFrame, prior_df: pd.DataFrame, materiality_pct: float = 15) -> Dict:
+        """Compare two trial balances on account number and flag material variances and new accounts"""
+        current_df = current_df.assign(net_balance=current_df['debit'] - current_df['credit'])
+        prior_df = prior_df.assign(net_balance=prior_df['debit'] - prior_df['credit'])
+        
+        # Merge on account number
+        comparison = current_df.merge(
+            prior_df[['account_number', 'net_balance']],
+            on='account_number',
+            how='outer',
+            suffixes=('_current', '_prior')
+        )
+        # Accounts only present in the prior period keep their prior name
+        if 'account_name' in prior_df.columns:
+            prior_names = prior_df.drop_duplicates('account_number', keep='last').set_index('account_number')['account_name']
+            comparison['account_name'] = comparison['account_name'].fillna(comparison['account_number'].map(prior_names))
+        comparison = comparison.fillna(0)
+        
+        # Calculate variances (0% when there is no prior balance)
+        comparison['variance_amount'] = comparison['net_balance_current'] - comparison['net_balance_prior']
+        prior_balance = comparison['net_balance_prior']
+        comparison['variance_pct'] = np.where(
+            prior_balance == 0, 0, comparison['variance_amount'] / prior_balance.abs().replace(0, np.nan) * 100
+        )
+        
+        # Flag material variances
+        material_variances = comparison[comparison['variance_pct'].abs() > materiality_pct]
+        
+        # New accounts (in current but not prior)
+        new_accounts = comparison[(comparison['net_balance_prior'] == 0) & (comparison['net_balance_current'] != 0)]
+        
+        return {
+            "total_accounts_current": len(current_df),
+            "total_accounts_prior": len(prior_df),
+            "material_variances_count": len(material_variances),
+            "new_accounts_count": len(new_accounts),
+            "variance_details": material_variances[
+                ['account_number', 'account_name', 'net_balance_current',
+                 'net_balance_prior', 'variance_amount', 'variance_pct']
+            ].to_dict('records'),
+            "new_account_details": new_accounts[
+                ['account_number', 'account_name', 'net_balance_current']
+            ].to_dict('records')
+        }
+    
+    @staticmethod
+    def account_changes(current_df: pd.DataFrame, prior_df: pd.DataFrame) -> Dict:
+        """Accounts added to or removed from the chart of accounts between two periods"""
+        current_accounts = set(current_df['account_number'])
+        prior_accounts = set(prior_df['account_number'])
+        
+        def details(df, accounts):
+            rows = df[df['account_number'].isin(accounts)].drop_duplicates('account_number', keep='last')
+            return rows.assign(net_balance=rows['debit'] - rows['credit'])[
+                ['account_number', 'account_name', 'net_balance']
+            ].to_dict('records')
+        
+        added = current_accounts - prior_accounts
+        removed = prior_accounts - current_accounts
+        return {
+            "added_count": len(added),
+            "removed_count": len(removed),
+            "added_accounts": details(current_df, added),
+            "removed_accounts": details(prior_df, removed)
+        }
+    
     @staticmethod
     def validate_trial_balance(df: pd.DataFrame) -> Dict:
         """Validate trial balance for completeness and accuracy"""
@@ -84,28 +167,21 @@ class TrialBalanceTools:
         if format_type == 'json':
             with open(file_path, 'w') as f:
                 json.dump(data, f, indent=2, default=str)
+        elif format_type == 'ndjson':
+            records = data.to_dict('records') if isinstance(data, pd.DataFrame) else data
+            with open(file_path, 'w') as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + '\n')
         elif format_type == 'csv':
             if isinstance(data, pd.DataFrame):
                 data.to_csv(file_path, index=False)
+        elif format_type == 'parquet':
+            if isinstance(data, pd.DataFrame):
+                data.to_parquet(file_path, index=False)
         
         print(f"✅ Saved output to {file_path}")
     
     @staticmethod
     def create_audit_log(agent_name: str, action: str, details: Dict):
-        """Create audit log entry"""
-        timestamp = datetime.now().isoformat()
-        log_entry = {
-            "timestamp": timestamp,
-            "agent": agent_name,
-            "action": action,
-            "details": details,
-            "hash": hashlib.md5(str(details).encode()).hexdigest()[:8]
-        }
-        
-        log_file = f"logs/audit_{datetime.now().strftime('%Y%m%d')}.jsonl"
-        os.makedirs('logs', exist_ok=True)
-        
-        with open(log_file, 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
-        
-        return log_entry
+        """Create audit log entry (written asynchronously by the shared audit logger)"""
+        return get_audit_logger().log(agent_name, action, details)
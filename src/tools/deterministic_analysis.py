@@ -0,0 +1,389 @@
+# =============================================================================
+# File: src/tools/deterministic_analysis.py
+# =============================================================================
+
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from src.tools.data_tools import TrialBalanceTools
+from src.tools.period_index import period_dates, period_slice
+
+ACCOUNT_MAPPING_PATH = 'src/config/account_mapping.json'
+ANALYSIS_MODES = ('auto', 'deterministic', 'agent')
+
+# Intent -> keywords; a request may carry several intents
+INTENT_KEYWORDS = {
+    'new_accounts': ('new account', 'new accounts', 'added', 'missing', 'dropped', 'removed', 'closed'),
+    'variance': ('variance', 'compare', 'comparison', 'movement', 'fluctuation', ' vs ', ' vs. ', 'versus'),
+    'categorization': ('categor', 'classif', 'tax provision', 'mapping'),
+    'validation': ('validat', 'balanced', 'in balance', 'compliance', 'integrity', 'duplicate')
+}
+
+# Words that only make a variance request alongside two named periods or a percentage
+# ("change between Q1 and Q2 2024", "accounts with >20% changes"); on their own they
+# are usually open-ended questions for the agent
+PERIOD_CHANGE_WORDS = {'change', 'changes', 'changed', 'difference', 'differences', 'between'}
+
+# Asking for these means the user wants written commentary from the agent
+NARRATIVE_KEYWORDS = ('why', 'explain', 'recommend', 'insight', 'risk', 'opportunit',
+                      'commentary', 'narrative', 'interpret', 'assess')
+
+CATEGORY_WORDS = {
+    'asset': 'Asset', 'assets': 'Asset',
+    'liability': 'Liability', 'liabilities': 'Liability',
+    'equity': 'Equity',
+    'revenue': 'Revenue', 'revenues': 'Revenue', 'income': 'Revenue',
+    'expense': 'Expense', 'expenses': 'Expense'
+}
+
+# Words never used as account-name filters
+_STOPWORDS = {
+    'account', 'accounts', 'balance', 'balances', 'trial', 'data', 'dataset', 'total', 'totals',
+    'period', 'periods', 'year', 'full', 'quarter', 'month', 'new', 'and', 'the', 'for', 'with',
+    'between', 'from', 'into', 'analyze', 'analyse', 'analysis', 'identify', 'compare', 'check',
+    'variance', 'variances', 'change', 'changes', 'performance', 'categorize', 'categorise', 'all',
+    'tax', 'provision', 'report', 'show', 'list', 'find', 'what', 'which', 'against', 'over',
+    'versus', 'this', 'that', 'missing', 'added', 'dropped', 'removed', 'closed', 'validate',
+    'compliance', 'material', 'significant', 'movement', 'movements', 'prior', 'current', 'each'
+}
+
+_MONTH = (r'jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+          r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?')
+_PERIOD_PATTERN = re.compile(
+    rf'\b(?:(?P<quarter>Q[1-4])|(?P<month>{_MONTH}))\b(?:\s+(?P<year>20\d{{2}}))?|\b(?P<bare_year>20\d{{2}})\b',
+    re.IGNORECASE
+)
+_WORD_PATTERN = re.compile(r'[a-z]+')
+
+
+def extract_period_texts(request: str) -> List[str]:
+    """
+    Period mentions in request order, e.g. ['Q1 2024', 'Q2 2024'] for
+    'between Q1 and Q2 2024'. A quarter or month without a year takes the
+    next year mentioned after it (or the previous one).
+    """
+    mentions = []
+    for match in _PERIOD_PATTERN.finditer(request):
+        if match.group('bare_year'):
+            mentions.append((None, int(match.group('bare_year'))))
+        else:
+            token = (match.group('quarter') or match.group('month')).upper()
+            year = int(match.group('year')) if match.group('year') else None
+            mentions.append((token, year))
+
+    years = [year for _, year in mentions]
+    texts = []
+    for i, (token, year) in enumerate(mentions):
+        if year is None:
+            following = [y for y in years[i + 1:] if y is not None]
+            preceding = [y for y in years[:i] if y is not None]
+            if following:
+                year = following[0]
+            elif preceding:
+                year = preceding[-1]
+            else:
+                continue
+        texts.append(f"{token} {year}" if token else str(year))
+    return texts
+
+
+def recognize_intent(request: str) -> Optional[Dict[str, Any]]:
+    """
+    Detect the computable intents of a request.
+
+    Returns None when nothing in the request can be computed directly from the
+    data (open-ended questions go to the agent).
+    """
+    text = f" {request.lower()} "
+    words = _WORD_PATTERN.findall(text)
+    period_texts = extract_period_texts(request)
+    intents = [intent for intent, keywords in INTENT_KEYWORDS.items()
+               if any(keyword in text for keyword in keywords)]
+    if 'variance' not in intents and PERIOD_CHANGE_WORDS.intersection(words) \
+            and (len(period_texts) >= 2 or '%' in text):
+        intents.append('variance')
+    if not intents:
+        return None
+
+    categories = sorted({CATEGORY_WORDS[word] for word in words if word in CATEGORY_WORDS})
+    terms = [word for word in words
+             if len(word) >= 4 and word not in _STOPWORDS and word not in CATEGORY_WORDS]
+    return {
+        "intents": intents,
+        "period_texts": period_texts,
+        "categories": categories,
+        "name_terms": terms,
+        "narrative_requested": any(keyword in text for keyword in NARRATIVE_KEYWORDS)
+    }
+
+
+class DeterministicAnalyzer:
+    """
+    Answers computable requests (new accounts, variances, categorization,
+    validation) directly from the trial balance engines in TrialBalanceTools,
+    without an LLM call. Results are plain JSON-serializable dicts; render()
+    turns one into a text report.
+    """
+
+    def __init__(self, config_path: str = ACCOUNT_MAPPING_PATH):
+        self.config = TrialBalanceTools.load_config(config_path)
+        self.materiality_pct = float(self.config.get('materiality_threshold', 0.15)) * 100
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _period_dates(df: pd.DataFrame) -> Optional[pd.Series]:
+        return period_dates(df)
+
+    def _window(self, df: pd.DataFrame, period_info: Optional[Dict[str, Any]]) -> pd.DataFrame:
+        """Rows of df inside the period window (all rows if it has no usable period)"""
+        if period_info is not None:
+            window = period_slice(df, period_info['start_date'], period_info['end_date'])
+            # Unparseable periods sort first, so the last row tells whether any period parsed
+            if window is not None and len(df) and pd.notna(df.index[-1]):
+                return window
+        dates = self._period_dates(df)
+        if period_info is None or dates is None or dates.isna().all():
+            return df
+        mask = (dates >= pd.to_datetime(period_info['start_date'])) & (dates <= pd.to_datetime(period_info['end_date']))
+        return df[mask]
+
+    @staticmethod
+    def _balances(df: pd.DataFrame) -> pd.DataFrame:
+        """One row per account with summed debits/credits"""
+        frame = df[['account_number', 'account_name', 'debit', 'credit']].copy()
+        frame['account_number'] = frame['account_number'].astype(str)
+        frame['account_name'] = frame['account_name'].astype(str)
+        return frame.groupby('account_number', as_index=False, sort=False).agg(
+            account_name=('account_name', 'last'), debit=('debit', 'sum'), credit=('credit', 'sum'))
+
+    def _snapshot(self, label: str, df: pd.DataFrame, which: str = 'last') -> Dict[str, Any]:
+        """Balances at the first or last period of df (trial balances are cumulative)"""
+        dates = self._period_dates(df)
+        as_of = None
+        if dates is not None and dates.notna().any():
+            as_of = dates.max() if which == 'last' else dates.min()
+            df = df[dates == as_of]
+        return {
+            "dataset": label,
+            "as_of": as_of.strftime('%Y-%m-%d') if as_of is not None else None,
+            "balances": self._balances(df)
+        }
+
+    def _comparison_snapshots(self, datasets: Dict[str, pd.DataFrame], periods: List[Dict[str, Any]],
+                              notes: List[str]) -> Optional[tuple]:
+        """Pick (current, prior) snapshots for the request's periods and datasets"""
+        items = list(datasets.items())
+
+        if len(items) >= 2:
+            if len(items) > 2:
+                notes.append(f"Compared {items[0][0]} and {items[1][0]} only; "
+                             f"ignored {', '.join(label for label, _ in items[2:])}")
+            items = items[:2]
+            specs = [periods[min(i, len(periods) - 1)] if periods else None for i in range(2)]
+            if len(periods) >= 2:
+                # Pair each period with the dataset that actually covers it
+                covered = lambda order: sum(len(self._window(df, spec)) > 0 for (_, df), spec in zip(items, order))
+                if covered(specs[::-1]) > covered(specs):
+                    specs = specs[::-1]
+            pairs = []
+            for (label, df), period_info in zip(items, specs):
+                window = self._window(df, period_info)
+                if len(window) == 0:
+                    notes.append(f"{label} has no rows in {period_info['description']}; using all of it")
+                    window = df
+                pairs.append(self._snapshot(label, window))
+            current, prior = pairs
+        else:
+            label, df = items[0]
+            if len(periods) >= 2:
+                current = self._snapshot(label, self._window(df, periods[0]))
+                prior = self._snapshot(label, self._window(df, periods[1]))
+            else:
+                # One dataset and at most one window: first vs last period inside it
+                window = self._window(df, periods[0] if periods else None)
+                current = self._snapshot(label, window, 'last')
+                prior = self._snapshot(label, window, 'first')
+                if current["as_of"] is None or current["as_of"] == prior["as_of"]:
+                    notes.append(f"{label} holds a single period in the requested window; nothing to compare")
+                    return None
+
+        if len(current["balances"]) == 0 or len(prior["balances"]) == 0:
+            notes.append("No rows in the requested period(s); nothing to compare")
+            return None
+
+        unusable = [snapshot["dataset"] for snapshot in (current, prior)
+                    if (snapshot["balances"]['account_number'] == 'Unknown').all()]
+        if unusable:
+            notes.append(f"Cannot compare accounts without account numbers ({', '.join(unusable)})")
+            return None
+
+        # The later snapshot is the current period; undated data keeps dataset order
+        if current["as_of"] and prior["as_of"] and current["as_of"] < prior["as_of"]:
+            current, prior = prior, current
+        return current, prior
+
+    # ------------------------------------------------------------------
+    # Filters
+    # ------------------------------------------------------------------
+
+    def _account_filter(self, intent: Dict[str, Any], frames: List[pd.DataFrame]) -> Dict[str, Any]:
+        """Category and account-name terms from the request that match the data"""
+        names = pd.concat([frame['account_name'] for frame in frames]).str.lower() if frames else pd.Series(dtype=str)
+        terms = []
+        for term in intent["name_terms"]:
+            stem = term[:-1] if term.endswith('s') else term
+            if names.str.contains(stem, regex=False).any() and stem not in terms:
+                terms.append(stem)
+        return {"categories": intent["categories"], "name_terms": terms}
+
+    def _apply_filter(self, balances: pd.DataFrame, account_filter: Dict[str, Any]) -> pd.DataFrame:
+        mask = pd.Series(True, index=balances.index)
+        if account_filter["categories"]:
+            categorized = TrialBalanceTools.categorize_accounts(balances, self.config)
+            mask &= categorized['category'].isin(account_filter["categories"])
+        if account_filter["name_terms"]:
+            names = balances['account_name'].str.lower()
+            mask &= names.apply(lambda name: any(term in name for term in account_filter["name_terms"]))
+        return balances[mask]
+
+    # ------------------------------------------------------------------
+    # Analysis
+    # ------------------------------------------------------------------
+
+    def analyze(self, request: str, intent: Dict[str, Any], datasets: Dict[str, pd.DataFrame],
+                periods: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Compute the structured answer for a recognized intent"""
+        started = time.perf_counter()
+        notes: List[str] = []
+        result: Dict[str, Any] = {
+            "request": request,
+            "intents": intent["intents"],
+            "periods": [period["description"] for period in periods],
+            "materiality_pct": self.materiality_pct,
+            "narrative_requested": intent["narrative_requested"]
+        }
+
+        for label, df in datasets.items():
+            if (df['account_number'].astype(str) == 'Unknown').all():
+                notes.append(f"{label} has no recognizable account number column")
+
+        windows = {label: self._window(df, periods[0] if len(periods) == 1 else None)
+                   for label, df in datasets.items()}
+        account_filter = self._account_filter(intent, [self._balances(df) for df in datasets.values()])
+        result["account_filter"] = account_filter
+
+        if {'variance', 'new_accounts'} & set(intent["intents"]):
+            snapshots = self._comparison_snapshots(datasets, periods, notes)
+            if snapshots is not None:
+                current, prior = snapshots
+                current_balances = self._apply_filter(current["balances"], account_filter)
+                prior_balances = self._apply_filter(prior["balances"], account_filter)
+                comparison = {
+                    "current": {"dataset": current["dataset"], "as_of": current["as_of"]},
+                    "prior": {"dataset": prior["dataset"], "as_of": prior["as_of"]}
+                }
+                comparison.update(TrialBalanceTools.compare_periods(
+                    current_balances, prior_balances, materiality_pct=self.materiality_pct))
+                comparison.update(TrialBalanceTools.account_changes(current_balances, prior_balances))
+                result["comparison"] = comparison
+
+        if 'categorization' in intent["intents"]:
+            categorization = {}
+            for label, df in windows.items():
+                snapshot = self._snapshot(label, df)
+                balances = self._apply_filter(snapshot["balances"], account_filter)
+                categorized = TrialBalanceTools.categorize_accounts(balances, self.config)
+                categorized['net_balance'] = categorized['debit'] - categorized['credit']
+                by_category = categorized.groupby('category')['net_balance']
+                categorization[label] = {
+                    "as_of": snapshot["as_of"],
+                    "category_totals": {k: float(v) for k, v in by_category.sum().items()},
+                    "account_counts": {k: int(v) for k, v in by_category.size().items()},
+                    "accounts": categorized[
+                        ['account_number', 'account_name', 'category', 'tax_category', 'net_balance']
+                    ].to_dict('records')
+                }
+            result["categorization"] = categorization
+
+        if 'validation' in intent["intents"]:
+            validation = {}
+            for label, df in windows.items():
+                checks = TrialBalanceTools.validate_trial_balance(df)
+                checks["duplicate_accounts"] = int(
+                    df.duplicated(['period', 'account_number'] if 'period' in df.columns else ['account_number']).sum())
+                validation[label] = {
+                    "total_debits": float(checks["total_debits"]),
+                    "total_credits": float(checks["total_credits"]),
+                    "difference": float(checks["difference"]),
+                    "is_balanced": bool(checks["is_balanced"]),
+                    "duplicate_accounts": checks["duplicate_accounts"],
+                    "records": len(df)
+                }
+            result["validation"] = validation
+
+        result["notes"] = notes
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    # ------------------------------------------------------------------
+    # Rendering
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _money(value: float) -> str:
+        return f"${value:,.0f}"
+
+    def render(self, result: Dict[str, Any], max_items: int = 15) -> str:
+        """Plain-text report of a structured result"""
+        money = self._money
+        lines = [f"Deterministic analysis: {result['request']}"]
+        if result["periods"]:
+            lines.append(f"Periods: {', '.join(result['periods'])}")
+        account_filter = result.get("account_filter", {})
+        if account_filter.get("categories") or account_filter.get("name_terms"):
+            lines.append(f"Account filter: {', '.join(account_filter['categories'] + account_filter['name_terms'])}")
+
+        comparison = result.get("comparison")
+        if comparison:
+            current, prior = comparison["current"], comparison["prior"]
+            lines.append("")
+            lines.append(f"📊 {current['dataset']} ({current['as_of'] or 'undated'}) vs "
+                         f"{prior['dataset']} ({prior['as_of'] or 'undated'})")
+            if 'new_accounts' in result["intents"]:
+                lines.append(f"New accounts: {comparison['added_count']}")
+                for row in comparison["added_accounts"][:max_items]:
+                    lines.append(f"  + {row['account_number']} {row['account_name']}: {money(row['net_balance'])}")
+                lines.append(f"Removed accounts: {comparison['removed_count']}")
+                for row in comparison["removed_accounts"][:max_items]:
+                    lines.append(f"  - {row['account_number']} {row['account_name']}: {money(row['net_balance'])}")
+            if 'variance' in result["intents"]:
+                lines.append(f"Material variances (>{result['materiality_pct']:g}%): {comparison['material_variances_count']}")
+                details = sorted(comparison["variance_details"], key=lambda row: -abs(row['variance_amount']))
+                for row in details[:max_items]:
+                    lines.append(f"  {row['account_number']} {row['account_name']}: {money(row['net_balance_prior'])} -> "
+                                 f"{money(row['net_balance_current'])} ({row['variance_pct']:+.1f}%)")
+                if len(details) > max_items:
+                    lines.append(f"  ... {len(details) - max_items} more")
+
+        for label, summary in result.get("categorization", {}).items():
+            lines.append("")
+            lines.append(f"🏷️  Categorization of {label} ({summary['as_of'] or 'undated'})")
+            for category, total in summary["category_totals"].items():
+                lines.append(f"  {category}: {summary['account_counts'][category]} accounts, net {money(total)}")
+
+        for label, checks in result.get("validation", {}).items():
+            lines.append("")
+            status = "balanced" if checks["is_balanced"] else f"OUT OF BALANCE by {money(checks['difference'])}"
+            lines.append(f"✅ {label}: {status} (debits {money(checks['total_debits'])}, "
+                         f"credits {money(checks['total_credits'])}, {checks['duplicate_accounts']} duplicates)")
+
+        if result.get("notes"):
+            lines.append("")
+            lines.extend(f"⚠️  {note}" for note in result["notes"])
+        return "\n".join(lines)
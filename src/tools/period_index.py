@@ -0,0 +1,77 @@
+# =============================================================================
+# File: src/tools/period_index.py
+# =============================================================================
+
+import weakref
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Name of the DatetimeIndex that marks a dataset as sorted by parsed period
+PERIOD_INDEX = 'period_date'
+
+# Indexes already checked to be sorted, by id (entries drop when the index is freed)
+_sorted_indexes: Dict[int, Any] = {}
+
+
+def index_by_period(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rows of df stably sorted by parsed period under a DatetimeIndex named
+    'period_date'. Rows whose period does not parse (NaT) come first. Built
+    once when a dataset is loaded, so period filters become binary searches
+    over the index instead of re-parsing and masking the period column.
+    Frames without a period column are returned unchanged.
+    """
+    if 'period' not in df.columns or has_period_index(df):
+        return df
+    dates = pd.to_datetime(df['period'], errors='coerce').to_numpy()
+    # NaT is the smallest int64, so sorting the raw values keeps the whole index ordered
+    order = np.argsort(dates.view('i8'), kind='stable')
+    indexed = df.iloc[order]
+    indexed.index = pd.DatetimeIndex(dates[order], name=PERIOD_INDEX)
+    return indexed
+
+
+def has_period_index(df: pd.DataFrame) -> bool:
+    """True when df carries a sorted period index (checked once per index object)"""
+    index = df.index
+    if not isinstance(index, pd.DatetimeIndex) or index.name != PERIOD_INDEX:
+        return False
+    ref = _sorted_indexes.get(id(index))
+    if ref is not None and ref() is index:
+        return True
+    values = index.asi8
+    if len(values) > 1 and not (values[1:] >= values[:-1]).all():
+        return False
+    key = id(index)
+    _sorted_indexes[key] = weakref.ref(index, lambda _, key=key: _sorted_indexes.pop(key, None))
+    return True
+
+
+def period_slice(df: pd.DataFrame, start_date: Any, end_date: Any) -> Optional[pd.DataFrame]:
+    """
+    Rows with start_date <= period <= end_date as one contiguous slice of an
+    indexed frame (a view, no copy), or None when df has no period index
+    """
+    if not has_period_index(df):
+        return None
+    values = df.index.asi8
+    # Unit-aware bounds: the index may be stored in s, ms, us or ns
+    unit = np.datetime_data(df.index.dtype)[0]
+    lower = pd.Timestamp(start_date).as_unit(unit).asm8.view('i8')
+    upper = pd.Timestamp(end_date).as_unit(unit).asm8.view('i8')
+    start = np.searchsorted(values, lower, side='left')
+    end = np.searchsorted(values, upper, side='right')
+    # NaT sorts first but is never inside a window
+    start = max(start, np.searchsorted(values, np.iinfo(np.int64).min, side='right'))
+    return df.iloc[start:max(start, end)]
+
+
+def period_dates(df: pd.DataFrame) -> Optional[pd.Series]:
+    """Parsed period of each row, from the index when df has one (None without a period column)"""
+    if has_period_index(df):
+        return pd.Series(df.index, index=df.index)
+    if 'period' not in df.columns:
+        return None
+    return pd.to_datetime(df['period'], errors='coerce')
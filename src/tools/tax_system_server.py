@@ -0,0 +1,178 @@
+# =============================================================================
+# File: src/tools/tax_system_server.py
+# =============================================================================
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from src.tools.upload_client import BATCH_PATH, COMMIT_PATH
+
+
+class _TaxSystemHandler(BaseHTTPRequestHandler):
+    """Request handler for the stand-in tax provision endpoint"""
+
+    # Keep-alive connections so the client's pool is actually exercised
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.stand_in._count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+
+        if stand_in.failure_rate and random.random() < stand_in.failure_rate:
+            stand_in._count("injected_failures")
+            self._respond(503, {"error": "injected failure"}, {"Retry-After": "0"})
+            return
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self._respond(400, {"error": "invalid JSON"})
+            return
+
+        key = self.headers.get("Idempotency-Key")
+        if self.path.endswith(BATCH_PATH):
+            status, response = stand_in.receive_batch(key, payload)
+        elif self.path.endswith(COMMIT_PATH):
+            status, response = stand_in.commit(key, payload)
+        else:
+            status, response = 404, {"error": f"unknown path {self.path}"}
+        self._respond(status, response)
+
+    def _respond(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TaxSystemStandIn:
+    """
+    Local stand-in for a tax provision system's upload API.
+
+    Accepts batches and commits from TaxProvisionUploadClient, de-duplicates
+    them by idempotency key and can inject latency and transient failures.
+    Use as a context manager in tests and benchmarks.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"connections": 0, "batches": 0, "duplicates": 0, "commits": 0, "injected_failures": 0}
+        self._seen_keys = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _TaxSystemHandler)
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'TaxSystemStandIn':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def receive_batch(self, key: Optional[str], payload: Dict[str, Any]):
+        with self._lock:
+            if key and key in self._seen_keys:
+                self.stats["duplicates"] += 1
+                return 200, dict(self._seen_keys[key], duplicate=True)
+
+            upload = self.uploads.setdefault(payload["upload_id"], {"batches": {}, "committed": False})
+            upload["batches"][payload["batch_index"]] = len(payload.get("records", []))
+            self.stats["batches"] += 1
+
+            response = {"accepted": len(payload.get("records", [])), "batch_index": payload["batch_index"]}
+            if key:
+                self._seen_keys[key] = response
+            return 200, response
+
+    def commit(self, key: Optional[str], payload: Dict[str, Any]):
+        with self._lock:
+            if key and key in self._seen_keys:
+                self.stats["duplicates"] += 1
+                return 200, dict(self._seen_keys[key], duplicate=True)
+
+            upload = self.uploads.get(payload.get("upload_id"))
+            if upload is None:
+                return 404, {"error": "unknown upload_id"}
+
+            received = sum(upload["batches"].values())
+            if len(upload["batches"]) != payload.get("batch_count") or received != payload.get("record_count"):
+                return 409, {
+                    "error": "incomplete upload",
+                    "batches_received": len(upload["batches"]),
+                    "records_received": received
+                }
+
+            upload["committed"] = True
+            upload["header"] = {k: v for k, v in payload.items() if k not in ("batch_count", "record_count")}
+            self.stats["commits"] += 1
+
+            response = {"status": "COMMITTED", "upload_id": payload["upload_id"], "records": received}
+            if key:
+                self._seen_keys[key] = response
+            return 200, response
+
+
+def main():
+    """Run the stand-in server in the foreground"""
+    parser = argparse.ArgumentParser(description='Local stand-in for the tax provision upload API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of latency added per request')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    stand_in = TaxSystemStandIn(args.host, args.port, args.latency, args.failure_rate)
+    print(f"🧾 Tax system stand-in listening on {stand_in.url}")
+    print(f"   Set TAX_PROVISION_UPLOAD_URL={stand_in.url} to upload to it")
+    try:
+        stand_in._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stand_in._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
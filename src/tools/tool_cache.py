@@ -0,0 +1,120 @@
+# =============================================================================
+# File: src/tools/tool_cache.py
+# =============================================================================
+
+import functools
+import inspect
+import json
+import os
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+_lock = threading.Lock()
+_depth = 0
+_results: Dict[tuple, Future] = {}
+_stats = {"hits": 0, "misses": 0}
+
+
+def file_fingerprint(path: str) -> Optional[Tuple[str, int, int]]:
+    """(absolute path, size, mtime_ns) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+@contextmanager
+def crew_run_scope():
+    """
+    Enable tool memoization for the duration of a crew run.
+
+    Scopes are process-wide (tasks of one run execute on several threads) and
+    may nest; cached results are dropped when the outermost scope exits.
+    Outside a scope memoized tools always execute.
+    """
+    global _depth
+    with _lock:
+        if _depth == 0:
+            _results.clear()
+            _stats.update(hits=0, misses=0)
+        _depth += 1
+    try:
+        yield _stats
+    finally:
+        with _lock:
+            _depth -= 1
+            if _depth == 0:
+                _results.clear()
+
+
+def tool_cache_stats() -> Dict[str, int]:
+    with _lock:
+        return dict(_stats)
+
+
+def memoize_tool(file_args: Iterable[str] = (), files: Iterable[str] = ()):
+    """
+    Memoize a deterministic tool function within the current crew run.
+
+    The key is the function name, its bound arguments and the fingerprints of
+    the files it reads: arguments named in file_args plus fixed paths in files.
+    A changed input file therefore misses the cache. Concurrent identical calls
+    wait for the first one instead of recomputing. Error strings (tools report
+    failures by returning "Error ...") are not kept. Apply beneath @tool so the
+    tool keeps the wrapped function's signature and docstring.
+    """
+    file_args = tuple(file_args)
+    files = tuple(files)
+
+    def decorator(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _lock:
+                active = _depth > 0
+            if not active:
+                return fn(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            fingerprints = tuple(file_fingerprint(arguments[name]) for name in file_args) + \
+                tuple(file_fingerprint(path) for path in files)
+            key = (fn.__module__, fn.__qualname__,
+                   json.dumps(arguments, sort_keys=True, default=str), fingerprints)
+
+            with _lock:
+                future = _results.get(key)
+                owner = future is None
+                if owner:
+                    future = Future()
+                    _results[key] = future
+                    _stats["misses"] += 1
+                else:
+                    _stats["hits"] += 1
+
+            if not owner:
+                return future.result()
+
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                # Failures are not cached; waiters see the error, later calls retry
+                with _lock:
+                    _results.pop(key, None)
+                future.set_exception(e)
+                raise
+            if isinstance(result, str) and result.startswith('Error'):
+                # Reported failures are not cached either; only current waiters share them
+                with _lock:
+                    _results.pop(key, None)
+            future.set_result(result)
+            return result
+
+        return wrapper
+
+    return decorator
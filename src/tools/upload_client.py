@@ -0,0 +1,355 @@
+# =============================================================================
+# File: src/tools/upload_client.py
+# =============================================================================
+
+import hashlib
+import http.client
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+BATCH_PATH = "/v1/tax-provision/batches"
+COMMIT_PATH = "/v1/tax-provision/commit"
+
+# Status codes worth retrying - everything else is a permanent failure
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+# Characters read at a time when streaming records out of a json upload document
+JSON_READ_SIZE = 1 << 16
+_JSON_DELIMITERS = frozenset(' \t\r\n,:]}')
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class UploadError(Exception):
+    """Raised when a batch or commit cannot be delivered to the tax provision system"""
+
+
+class _JsonDocumentReader:
+    """
+    Reads a json upload document incrementally: the header fields before
+    "account_details" are decoded up front and the records are then yielded
+    one by one, so only a small window of the file is held in memory.
+    """
+
+    def __init__(self, f):
+        self._file = f
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        data = self._file.read(JSON_READ_SIZE)
+        if not data:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def _next_char(self) -> str:
+        """Skip whitespace and return the next character without consuming it ('' at end of file)"""
+        while True:
+            self._pos = _JSON_WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos:self._pos + 1]
+
+    def _expect(self, chars: str) -> str:
+        char = self._next_char()
+        if not char or char not in chars:
+            raise UploadError(f"Malformed upload document: expected {chars!r}, found {char or 'end of file'!r}")
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        self._next_char()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A value cut by the buffer edge can still decode (e.g. "12" of "12.5"), so
+                # only accept it once the character after it is a delimiter
+                if self._eof or (end < len(self._buffer) and self._buffer[end] in _JSON_DELIMITERS):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise UploadError(f"Malformed upload document: {e}") from e
+            self._fill()
+
+    def read_header(self) -> Dict[str, Any]:
+        """Fields before "account_details", leaving the reader at the first record"""
+        header = {}
+        self._expect('{')
+        if self._next_char() == '}':
+            raise UploadError("Upload document has no account_details")
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == 'account_details':
+                self._expect('[')
+                return header
+            header[key] = self._value()
+            if self._expect(',}') == '}':
+                raise UploadError("Upload document has no account_details")
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        if self._next_char() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._expect(',]') == ']':
+                return
+
+
+class _ConnectionPool:
+    """Keeps idle keep-alive HTTP connections to a single host for reuse"""
+
+    def __init__(self, base_url: str, timeout: float):
+        parsed = urlparse(base_url)
+        self.scheme = parsed.scheme or 'http'
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip('/')
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> http.client.HTTPConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self.connections_opened += 1
+            if self.scheme == 'https':
+                return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def release(self, conn: http.client.HTTPConnection, reusable: bool = True):
+        if reusable:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class TaxProvisionUploadClient:
+    """
+    Pushes upload records to a tax provision HTTP endpoint in batches.
+
+    Connections are pooled and kept alive, at most max_concurrency batches are
+    in flight at once, and every batch carries an idempotency key derived from
+    its content so retries are never applied twice. Pass a stable upload_id in
+    the header to make re-runs of the same upload idempotent as well.
+    """
+
+    def __init__(self, base_url: str, batch_size: int = 1000, max_concurrency: int = 4,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 timeout: float = 30.0, api_key: Optional[str] = None):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.api_key = api_key
+        self._pool = _ConnectionPool(base_url, timeout)
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0}
+
+    @classmethod
+    def from_environment(cls) -> Optional['TaxProvisionUploadClient']:
+        """Build a client from TAX_PROVISION_* environment settings, or None if no endpoint is set"""
+        base_url = os.getenv("TAX_PROVISION_UPLOAD_URL")
+        if not base_url:
+            return None
+        return cls(
+            base_url,
+            batch_size=int(os.getenv("TAX_PROVISION_BATCH_SIZE", "1000")),
+            max_concurrency=int(os.getenv("TAX_PROVISION_MAX_CONCURRENCY", "4")),
+            max_retries=int(os.getenv("TAX_PROVISION_MAX_RETRIES", "3")),
+            api_key=os.getenv("TAX_PROVISION_API_KEY")
+        )
+
+    def close(self):
+        self._pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def connections_opened(self) -> int:
+        return self._pool.connections_opened
+
+    def upload_file(self, upload_file: str) -> Dict[str, Any]:
+        """
+        Upload a file written by UploadFileWriter in json or ndjson format.
+
+        Records are streamed from either format; json documents must list their
+        header fields before "account_details", as UploadFileWriter writes them.
+        The file name is used as the upload_id, so re-sending the same file is idempotent.
+        """
+        upload_id = os.path.basename(upload_file)
+
+        if upload_file.endswith('.ndjson'):
+            with open(upload_file, 'r') as f:
+                first = f.readline()
+            if not first:
+                raise UploadError(f"Upload file is empty: {upload_file}")
+            header = {k: v for k, v in json.loads(first).items() if k in ('entity_id', 'period_end', 'currency')}
+            header['upload_id'] = upload_id
+            return self.upload_records(header, self._iter_ndjson(upload_file))
+
+        with open(upload_file, 'r') as f:
+            reader = _JsonDocumentReader(f)
+            header = reader.read_header()
+            header['upload_id'] = upload_id
+            return self.upload_records(header, reader.records())
+
+    def upload_records(self, header: Dict[str, Any], records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Send records in batches and commit the upload.
+
+        Records are consumed lazily, so at most max_concurrency * 2 batches are
+        held in memory regardless of upload size.
+        """
+        start = time.perf_counter()
+        retries_before = self.stats["retries"]
+        upload_id = header.get('upload_id') or str(uuid.uuid4())
+        in_flight = threading.BoundedSemaphore(self.max_concurrency * 2)
+        futures = []
+        accounts = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            for batch_index, batch in enumerate(self._batches(records)):
+                in_flight.acquire()
+                payload = {
+                    "upload_id": upload_id,
+                    "entity_id": header.get("entity_id"),
+                    "period_end": header.get("period_end"),
+                    "batch_index": batch_index,
+                    "records": batch
+                }
+                future = executor.submit(self._post, BATCH_PATH, payload)
+                future.add_done_callback(lambda _: in_flight.release())
+                futures.append(future)
+                accounts += len(batch)
+
+            # Surface the first failure after every batch has finished
+            for future in futures:
+                future.result()
+
+        commit = dict(header)
+        commit.update({
+            "upload_id": upload_id,
+            "batch_count": len(futures),
+            "record_count": accounts
+        })
+        response = self._post(COMMIT_PATH, commit)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "status": "UPLOADED",
+            "upload_id": upload_id,
+            "batches": len(futures),
+            "accounts": accounts,
+            "elapsed_seconds": round(elapsed, 4),
+            "accounts_per_second": round(accounts / elapsed, 1) if elapsed > 0 else None,
+            "retries": self.stats["retries"] - retries_before,
+            "connections_opened": self.connections_opened,
+            "response": response
+        }
+
+    def _batches(self, records: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _iter_ndjson(upload_file: str) -> Iterator[Dict[str, Any]]:
+        with open(upload_file, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST with retries, exponential backoff with jitter and an idempotency key"""
+        body = json.dumps(payload, separators=(',', ':'), default=str).encode()
+        headers = {
+            "Content-Type": "application/json",
+            "Idempotency-Key": hashlib.sha256(path.encode() + body).hexdigest()
+        }
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self._stats_lock:
+                    self.stats["retries"] += 1
+                time.sleep(self._backoff(attempt, last_error))
+
+            status, retry_after, data = None, None, None
+            conn = self._pool.acquire()
+            try:
+                conn.request("POST", self._pool.base_path + path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                status = response.status
+                retry_after = response.getheader("Retry-After")
+                self._pool.release(conn, reusable=not response.will_close)
+            except (OSError, http.client.HTTPException) as e:
+                self._pool.release(conn, reusable=False)
+                last_error = (None, str(e))
+                continue
+            finally:
+                with self._stats_lock:
+                    self.stats["requests"] += 1
+
+            if 200 <= status < 300:
+                return json.loads(data) if data else {}
+
+            last_error = (retry_after, f"HTTP {status}: {data[:200]!r}")
+            if status not in RETRYABLE_STATUS:
+                break
+
+        raise UploadError(f"Upload to {path} failed after {attempt + 1} attempt(s): {last_error[1]}")
+
+    def _backoff(self, attempt: int, last_error: Optional[Tuple[Optional[str], str]]) -> float:
+        """Honour Retry-After when present, otherwise full-jitter exponential backoff"""
+        retry_after = last_error[0] if last_error else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
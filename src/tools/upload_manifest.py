@@ -0,0 +1,79 @@
+# =============================================================================
+# File: src/tools/upload_manifest.py
+# =============================================================================
+
+import json
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+MANIFEST_DIR = "data/output/upload_manifests"
+
+
+class UploadManifest:
+    """Tracks the last successful upload for one entity/period with per-account content hashes"""
+
+    def __init__(self, entity_id: str, period_end: str, manifest_dir: str = MANIFEST_DIR):
+        self.entity_id = entity_id
+        self.period_end = period_end
+        self.manifest_dir = manifest_dir
+        self.accounts: Dict[str, str] = {}
+        self.upload_file: Optional[str] = None
+        self.uploaded_at: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', f"{self.entity_id}_{self.period_end}")
+        return os.path.join(self.manifest_dir, f"{safe_name}.json")
+
+    @property
+    def exists(self) -> bool:
+        return self.upload_file is not None
+
+    @classmethod
+    def load(cls, entity_id: str, period_end: str, manifest_dir: str = MANIFEST_DIR) -> 'UploadManifest':
+        """Load the manifest for an entity/period, or an empty one if none was uploaded yet"""
+        manifest = cls(entity_id, period_end, manifest_dir)
+        if os.path.exists(manifest.path):
+            with open(manifest.path, 'r') as f:
+                data = json.load(f)
+            manifest.accounts = data.get('accounts', {})
+            manifest.upload_file = data.get('upload_file')
+            manifest.uploaded_at = data.get('uploaded_at')
+        return manifest
+
+    def diff(self, current: Dict[str, str]) -> Dict[str, List[str]]:
+        """Compare current account hashes against the last upload"""
+        added = [account for account in current if account not in self.accounts]
+        changed = [account for account, digest in current.items()
+                   if account in self.accounts and self.accounts[account] != digest]
+        removed = [account for account in self.accounts if account not in current]
+
+        return {
+            "added": added,
+            "changed": changed,
+            "removed": removed
+        }
+
+    def record_upload(self, account_hashes: Dict[str, str], upload_file: str):
+        """Mark an upload as successful and persist its account hashes"""
+        self.accounts = dict(account_hashes)
+        self.upload_file = upload_file
+        self.uploaded_at = datetime.now().isoformat()
+
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        data = {
+            "entity_id": self.entity_id,
+            "period_end": self.period_end,
+            "upload_file": self.upload_file,
+            "uploaded_at": self.uploaded_at,
+            "account_count": len(self.accounts),
+            "accounts": self.accounts
+        }
+
+        # Write then rename so a crash never leaves a half-written manifest
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
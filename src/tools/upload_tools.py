@@ -0,0 +1,308 @@
+# =============================================================================
+# File: src/tools/upload_tools.py
+# =============================================================================
+
+import hashlib
+import json
+import os
+from json.encoder import encode_basestring_ascii
+from typing import Any, Dict, Iterable, Iterator, List
+
+import pandas as pd
+
+# Field order of each entry in "account_details"
+UPLOAD_FIELDS = [
+    'account_number',
+    'account_name',
+    'debit_amount',
+    'credit_amount',
+    'net_balance',
+    'source_system'
+]
+
+# Header fields repeated on every record of the flat (line/column) formats
+RECORD_METADATA_FIELDS = ['entity_id', 'period_end', 'currency']
+
+# Supported upload formats and their file extensions
+UPLOAD_FORMATS = {
+    'json': '.json',
+    'ndjson': '.ndjson',
+    'csv': '.csv',
+    'parquet': '.parquet'
+}
+
+DEFAULT_SOURCE_SYSTEM = 'SAP'
+DEFAULT_CHUNK_SIZE = 50000
+
+# One account record as json.dump(..., indent=2) lays it out inside "account_details"
+_JSON_RECORD_TEMPLATE = (
+    '    {\n'
+    '      "account_number": %s,\n'
+    '      "account_name": %s,\n'
+    '      "debit_amount": %s,\n'
+    '      "credit_amount": %s,\n'
+    '      "net_balance": %s,\n'
+    '      "source_system": %s\n'
+    '    }'
+)
+
+# One account record per line, laid out like json.dumps(record)
+_NDJSON_RECORD_TEMPLATE = (
+    '{"entity_id": %s, "period_end": %s, "currency": %s, '
+    '"account_number": %s, "account_name": %s, "debit_amount": %s, '
+    '"credit_amount": %s, "net_balance": %s, "source_system": %s}\n'
+)
+
+
+def _encode_float(value: float) -> str:
+    """Encode a float exactly like the json module does"""
+    if value != value:
+        return 'NaN'
+    if value == float('inf'):
+        return 'Infinity'
+    if value == float('-inf'):
+        return '-Infinity'
+    return float.__repr__(value)
+
+
+def _encode_value(value: Any) -> str:
+    """Encode an arbitrary scalar, using the C string encoder for the common case"""
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    return json.dumps(value)
+
+
+class UploadRecordBuilder:
+    """Builds tax provision upload records column-wise instead of row by row"""
+
+    @staticmethod
+    def build_columns(df: pd.DataFrame) -> Dict[str, List[Any]]:
+        """Return the upload fields as plain Python lists, one per column"""
+        if 'source_system' in df.columns:
+            source_system = df['source_system'].tolist()
+        else:
+            source_system = [DEFAULT_SOURCE_SYSTEM] * len(df)
+
+        return {
+            'account_number': df['account_number'].astype(str).tolist(),
+            'account_name': df['account_name'].astype(str).tolist(),
+            'debit_amount': df['debit'].astype(float).tolist(),
+            'credit_amount': df['credit'].astype(float).tolist(),
+            'net_balance': (df['debit'] - df['credit']).astype(float).tolist(),
+            'source_system': source_system
+        }
+
+    @staticmethod
+    def encode_json_columns(columns: Dict[str, List[Any]]) -> List[List[str]]:
+        """Encode each column to its JSON literals in a single pass per column"""
+        return [
+            [encode_basestring_ascii(v) for v in columns['account_number']],
+            [encode_basestring_ascii(v) for v in columns['account_name']],
+            [_encode_float(v) for v in columns['debit_amount']],
+            [_encode_float(v) for v in columns['credit_amount']],
+            [_encode_float(v) for v in columns['net_balance']],
+            [_encode_value(v) for v in columns['source_system']]
+        ]
+
+
+class UploadFileWriter:
+    """Streams upload files to disk chunk by chunk so memory stays flat"""
+
+    @staticmethod
+    def iter_chunks(file_path: str, chunksize: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """Read a trial balance CSV in fixed-size chunks"""
+        for chunk in pd.read_csv(file_path, chunksize=chunksize):
+            yield chunk
+
+    @staticmethod
+    def compute_totals(file_path: str, chunksize: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+        """Sum debits and credits without holding the whole file in memory"""
+        total_debits = 0.0
+        total_credits = 0.0
+        total_accounts = 0
+
+        for chunk in pd.read_csv(file_path, usecols=['debit', 'credit'], chunksize=chunksize):
+            total_debits += float(chunk['debit'].sum())
+            total_credits += float(chunk['credit'].sum())
+            total_accounts += len(chunk)
+
+        return {
+            "total_accounts": total_accounts,
+            "total_debits": total_debits,
+            "total_credits": total_credits
+        }
+
+    @staticmethod
+    def hash_accounts(file_path: str, chunksize: int = DEFAULT_CHUNK_SIZE) -> Dict[str, str]:
+        """
+        Content-hash every upload record, keyed by account number.
+
+        The hash covers the encoded upload fields, so any change that would alter
+        the account's upload record changes its hash.
+        """
+        hashes = {}
+        for chunk in UploadFileWriter.iter_chunks(file_path, chunksize):
+            UploadFileWriter.hash_chunk(chunk, hashes)
+        return hashes
+
+    @staticmethod
+    def hash_chunk(chunk: pd.DataFrame, hashes: Dict[str, str]):
+        """Add the record hashes of one chunk to hashes (see hash_accounts)"""
+        columns = UploadRecordBuilder.build_columns(chunk)
+        encoded = UploadRecordBuilder.encode_json_columns(columns)
+        for account, fields in zip(columns['account_number'], zip(*encoded)):
+            digest = hashlib.sha256('\x1f'.join(fields).encode()).hexdigest()
+            if account in hashes:
+                # Duplicate account rows: fold them into one order-sensitive hash
+                digest = hashlib.sha256((hashes[account] + digest).encode()).hexdigest()
+            hashes[account] = digest
+
+    @staticmethod
+    def hashing_chunks(chunks: Iterable[pd.DataFrame], hashes: Dict[str, str]) -> Iterator[pd.DataFrame]:
+        """Pass chunks through unchanged, hashing their records into hashes on the way"""
+        for chunk in chunks:
+            UploadFileWriter.hash_chunk(chunk, hashes)
+            yield chunk
+
+    @staticmethod
+    def filter_chunks(chunks: Iterable[pd.DataFrame], accounts: set) -> Iterator[pd.DataFrame]:
+        """Keep only the rows whose account number is in accounts"""
+        for chunk in chunks:
+            yield chunk[chunk['account_number'].astype(str).isin(accounts)]
+
+    @staticmethod
+    def write_json(output_file: str, header: Dict[str, Any], chunks: Iterable[pd.DataFrame]) -> int:
+        """
+        Write the upload document with the same layout as json.dump(indent=2).
+
+        The header fields are written first, followed by "account_details" built
+        from each chunk as it arrives. Returns the number of account records written.
+        """
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+
+        written = 0
+        with open(output_file, 'w') as f:
+            f.write('{\n')
+            for key, value in header.items():
+                f.write(f'  {encode_basestring_ascii(key)}: {json.dumps(value)},\n')
+            f.write('  "account_details": [')
+
+            for chunk in chunks:
+                if len(chunk) == 0:
+                    continue
+                encoded = UploadRecordBuilder.encode_json_columns(
+                    UploadRecordBuilder.build_columns(chunk)
+                )
+                body = ',\n'.join(_JSON_RECORD_TEMPLATE % fields for fields in zip(*encoded))
+                f.write(',\n' if written else '\n')
+                f.write(body)
+                written += len(chunk)
+
+            f.write('\n  ]\n}' if written else ']\n}')
+
+        return written
+
+    @staticmethod
+    def write_ndjson(output_file: str, header: Dict[str, Any], chunks: Iterable[pd.DataFrame]) -> int:
+        """
+        Write one self-describing JSON object per account per line.
+
+        Each line carries the entity/period/currency fields so consumers can
+        process the file incrementally without a separate header.
+        """
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        metadata = tuple(_encode_value(header.get(field)) for field in RECORD_METADATA_FIELDS)
+
+        written = 0
+        with open(output_file, 'w') as f:
+            for chunk in chunks:
+                if len(chunk) == 0:
+                    continue
+                encoded = UploadRecordBuilder.encode_json_columns(
+                    UploadRecordBuilder.build_columns(chunk)
+                )
+                f.write(''.join(_NDJSON_RECORD_TEMPLATE % (metadata + fields) for fields in zip(*encoded)))
+                written += len(chunk)
+
+        return written
+
+    @staticmethod
+    def write_csv(output_file: str, header: Dict[str, Any], chunks: Iterable[pd.DataFrame]) -> int:
+        """Write a flat CSV with the header fields repeated on every row"""
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+
+        written = 0
+        header_written = False
+        with open(output_file, 'w', newline='') as f:
+            for chunk in chunks:
+                if header_written and len(chunk) == 0:
+                    continue
+                frame = UploadFileWriter._flat_frame(header, chunk)
+                frame.to_csv(f, index=False, header=not header_written)
+                header_written = True
+                written += len(chunk)
+
+        return written
+
+    @staticmethod
+    def write_parquet(output_file: str, header: Dict[str, Any], chunks: Iterable[pd.DataFrame]) -> int:
+        """
+        Write a Parquet file with one row group per chunk.
+
+        Requires the optional pyarrow dependency. The full header (including
+        totals) is stored in the file's schema metadata under "upload_header".
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+
+        fields = [(field, pa.string()) for field in RECORD_METADATA_FIELDS]
+        fields += [
+            ('account_number', pa.string()),
+            ('account_name', pa.string()),
+            ('debit_amount', pa.float64()),
+            ('credit_amount', pa.float64()),
+            ('net_balance', pa.float64()),
+            ('source_system', pa.string())
+        ]
+        schema = pa.schema(fields).with_metadata({'upload_header': json.dumps(header, default=str)})
+
+        written = 0
+        with pq.ParquetWriter(output_file, schema) as writer:
+            for chunk in chunks:
+                if len(chunk) == 0:
+                    continue
+                frame = UploadFileWriter._flat_frame(header, chunk)
+                frame['source_system'] = [
+                    None if v is None or v != v else str(v) for v in frame['source_system']
+                ]
+                writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+                written += len(chunk)
+
+        return written
+
+    @staticmethod
+    def write(output_file: str, header: Dict[str, Any], chunks: Iterable[pd.DataFrame],
+              format_type: str = 'json') -> int:
+        """Write an upload file in any of UPLOAD_FORMATS"""
+        writers = {
+            'json': UploadFileWriter.write_json,
+            'ndjson': UploadFileWriter.write_ndjson,
+            'csv': UploadFileWriter.write_csv,
+            'parquet': UploadFileWriter.write_parquet
+        }
+        if format_type not in writers:
+            raise ValueError(f"Unsupported upload format: {format_type} (expected one of {list(UPLOAD_FORMATS)})")
+        return writers[format_type](output_file, header, chunks)
+
+    @staticmethod
+    def _flat_frame(header: Dict[str, Any], chunk: pd.DataFrame) -> pd.DataFrame:
+        """Build a flat record frame from the shared column builder"""
+        columns = {field: [None if header.get(field) is None else str(header.get(field))] * len(chunk)
+                   for field in RECORD_METADATA_FIELDS}
+        columns.update(UploadRecordBuilder.build_columns(chunk))
+        return pd.DataFrame(columns)
@@ -4,6 +4,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 import json
 import os
+import asyncio
 from datetime import datetime
 import sys
 
@@ -12,6 +13,8 @@ project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
 from dynamic_demo import DynamicTrialBalanceSystem
+from src.jobs.job_store import get_job_store
+from src.llm.response_cache import get_response_cache
 
 # Page configuration
 st.set_page_config(
@@ -158,6 +161,83 @@ def create_data_visualization(data_dict):
             )
             st.plotly_chart(fig_pie, use_container_width=True)
 
+@st.cache_resource
+def get_worker_pool():
+    """Worker processes for background jobs, started once per Streamlit server and restarted if they die"""
+    from src.jobs.worker_pool import WorkerPool
+    return WorkerPool().start().supervise_in_background()
+
+def wait_for_job(job_id):
+    """Poll a background job, rendering its progress; returns the result"""
+    progress_bar = st.progress(0.0, text="Waiting for a worker...")
+    job = get_job_store().wait(
+        job_id, poll_interval=0.5,
+        on_progress=lambda job: progress_bar.progress(job["progress"], text=job["message"] or job["stage"])
+    )
+    # Finished: a refresh no longer needs to resume it
+    st.query_params.pop("job", None)
+    progress_bar.empty()
+    if job["status"] != 'completed':
+        raise RuntimeError(job["error"] or f"Job {job['status']}")
+    return job["result"]
+
+def run_analysis_as_job(request, files, labels):
+    """Queue the analysis for the worker pool and poll it; the job id in the URL survives a page refresh"""
+    get_worker_pool()
+    job_id = get_job_store().submit(
+        request, files, labels, use_cache=st.session_state.use_llm_cache,
+        mode=st.session_state.analysis_mode, narrative=st.session_state.narrative
+    )
+    st.query_params["job"] = job_id
+    st.caption(f"📥 Background job {job_id}")
+    return wait_for_job(job_id)
+
+def resume_background_job():
+    """After a refresh mid-analysis, pick the job up again from the URL"""
+    job_id = st.query_params.get("job")
+    if not job_id:
+        return
+    job = get_job_store().get(job_id)
+    if job is None:
+        st.query_params.pop("job", None)
+        return
+    st.info(f"🔄 Resuming background job {job_id}: {job['request']}")
+    try:
+        st.write(wait_for_job(job_id))
+    except Exception as e:
+        st.error(f"Background job failed: {e}")
+
+def run_analysis_with_progress(request, files, labels):
+    """Run an analysis through the async API, rendering progress, agent steps and output as they stream in"""
+    if st.session_state.use_job_queue:
+        return run_analysis_as_job(request, files, labels)
+    progress_bar = st.progress(0.0, text="Starting analysis...")
+    step_caption = st.empty()
+    live_output = st.empty()
+    
+    async def run():
+        handle = st.session_state.system.run_analysis_async(
+            request, files, labels, use_cache=st.session_state.use_llm_cache,
+            mode=st.session_state.analysis_mode, narrative=st.session_state.narrative, stream=True
+        )
+        text = ""
+        async for event in handle.stream:
+            if event["type"] == 'stage':
+                progress_bar.progress(event["progress"], text=event["message"])
+            elif event["type"] == 'step':
+                step_caption.caption(f"🔹 {event['agent']}: {event['text'][:200]}")
+            elif event["type"] == 'token':
+                text += event["text"]
+                live_output.markdown(text + " ▌")
+        return await handle
+    
+    try:
+        return asyncio.run(run())
+    finally:
+        # The caller renders the final result
+        step_caption.empty()
+        live_output.empty()
+
 def run_ai_analysis_demo():
     """Interactive AI analysis demo"""
     st.markdown('<div class="demo-section">', unsafe_allow_html=True)
@@ -220,10 +300,10 @@ def run_ai_analysis_demo():
     
     # Run analysis button
     if st.button(f"🚀 Run {selected_scenario}", type="primary"):
-        with st.spinner("Running AI analysis... This may take 30-60 seconds."):
+        with st.spinner("Running analysis..."):
             try:
                 # Run the actual AI analysis
-                result = st.session_state.system.run_analysis(
+                result = run_analysis_with_progress(
                     scenario['request'],
                     scenario['files'],
                     scenario['labels']
@@ -316,7 +396,7 @@ def custom_analysis_section():
             with st.spinner("Running custom analysis..."):
                 try:
                     labels = [f"Dataset_{i+1}" for i in range(len(selected_files))]
-                    result = st.session_state.system.run_analysis(
+                    result = run_analysis_with_progress(
                         custom_request,
                         selected_files,
                         labels
@@ -356,6 +436,32 @@ def main():
         index=1  # Default to AI Analysis Demo
     )
     
+    # Computable requests are answered from the data without waiting for the LLM
+    st.session_state.analysis_mode = st.sidebar.selectbox(
+        "🧮 Analysis mode:", ["auto", "deterministic", "agent"],
+        help="auto computes new-account, variance, categorization and validation requests directly"
+    )
+    st.session_state.narrative = st.sidebar.checkbox("🧠 Add AI commentary to computed results", value=False)
+    
+    # Re-running a scenario returns the cached response unless bypassed
+    st.session_state.use_llm_cache = st.sidebar.checkbox("⚡ Reuse cached AI responses", value=True)
+    cache = get_response_cache()
+    if cache is not None:
+        cache_stats = cache.stats()
+        st.sidebar.caption(f"Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+                           f"{cache_stats['entries']} stored responses")
+    
+    # Jobs run in worker processes, so they keep going if the page is refreshed
+    st.session_state.use_job_queue = st.sidebar.checkbox(
+        "🧵 Run in background worker pool", value=False,
+        help="Queue analyses for worker processes (JOB_WORKERS) and poll their progress"
+    )
+    if st.session_state.use_job_queue:
+        job_counts = get_job_store().counts()
+        st.sidebar.caption(f"Jobs: {job_counts['queued']} queued, {job_counts['running']} running, "
+                           f"{job_counts['completed']} completed")
+    resume_background_job()
+    
     # Load demo data
     if not st.session_state.demo_data_loaded:
         with st.spinner("Loading demo data..."):
@@ -17,16 +17,10 @@ def test_deepseek_connection():
         
         # Test with a simple CrewAI agent using proper LLM configuration
         from crewai import Agent, Task, Crew, Process
-        from langchain_openai import ChatOpenAI
-        
-        # Create LLM instance with proper configuration
-        llm = ChatOpenAI(
-            model=config["model"],
-            openai_api_base=config["base_url"],
-            openai_api_key=config["api_key"],
-            temperature=config["temperature"],
-            max_tokens=config["max_tokens"]
-        )
+        from src.llm.client import get_llm
+        
+        # Shared LLM instance with pooled connections
+        llm = get_llm()
         
         test_agent = Agent(
             role='Test Agent',
@@ -82,18 +76,12 @@ def test_direct_llm():
     print("=" * 35)
     
     try:
-        config = DeepSeekConfig.setup_environment()
+        DeepSeekConfig.setup_environment()
         
-        from langchain_openai import ChatOpenAI
         from langchain.schema import HumanMessage
+        from src.llm.client import get_llm
         
-        llm = ChatOpenAI(
-            model=config["model"],
-            openai_api_base=config["base_url"],
-            openai_api_key=config["api_key"],
-            temperature=0.7,
-            max_tokens=100
-        )
+        llm = get_llm(temperature=0.7, max_tokens=100)
         
         print("🚀 Making direct API call...")
         
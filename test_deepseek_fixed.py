@@ -20,15 +20,12 @@ def test_direct_openai():
     print("=" * 30)
     
     try:
-        from openai import OpenAI
         from deepseek_config import DeepSeekConfig
+        from src.llm.client import get_openai_client
         
         config = DeepSeekConfig.setup_environment()
         
-        client = OpenAI(
-            api_key=config["api_key"],
-            base_url=config["base_url"]
-        )
+        client = get_openai_client()
         
         # Remove deepseek/ prefix for direct OpenAI client
         model_name = config["model"].replace("deepseek/", "")
@@ -58,20 +55,14 @@ def test_langchain():
     print("=" * 30)
     
     try:
-        from langchain_openai import ChatOpenAI
         from langchain.schema import HumanMessage
         from deepseek_config import DeepSeekConfig
+        from src.llm.client import get_llm
         
         config = DeepSeekConfig.setup_environment()
         
-        # For LangChain, we need the full model name with prefix
-        llm = ChatOpenAI(
-            model=config["model"],  # Keep deepseek/ prefix for LangChain
-            openai_api_base=config["base_url"],
-            openai_api_key=config["api_key"],
-            temperature=config["temperature"],
-            max_tokens=50
-        )
+        # For LangChain, we need the full model name with prefix (get_llm keeps it)
+        llm = get_llm(max_tokens=50)
         
         print(f"🚀 Testing LangChain with model: {config['model']}")
         
@@ -94,19 +85,13 @@ def test_crewai():
     
     try:
         from crewai import Agent, Task, Crew, Process
-        from langchain_openai import ChatOpenAI
         from deepseek_config import DeepSeekConfig
+        from src.llm.client import get_llm
         
         config = DeepSeekConfig.setup_environment()
         
-        # Create LLM instance
-        llm = ChatOpenAI(
-            model=config["model"],
-            openai_api_base=config["base_url"],
-            openai_api_key=config["api_key"],
-            temperature=config["temperature"],
-            max_tokens=100
-        )
+        # Shared LLM instance with pooled connections
+        llm = get_llm(max_tokens=100)
         
         # Create agent with LLM instance
         agent = Agent(
@@ -0,0 +1,68 @@
+import os
+import sys
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.tools.audit_chain import AuditChainVerifier
+from src.tools.audit_log import AuditLogger
+from src.tools.audit_segments import iter_audit_entries
+
+
+class RecordingSink:
+    def __init__(self):
+        self.entries = []
+
+    def write_batch(self, batch):
+        self.entries.extend(batch)
+
+
+def test_details_changed_after_log_are_not_recorded(tmp_path):
+    logger = AuditLogger(str(tmp_path), compress=False)
+    details = {"x": 1, "nested": {"items": [1]}}
+    returned = logger.log('agent', 'mutate', details)
+    details["x"] = 999
+    details["nested"]["items"].append(2)
+    logger.close()
+
+    entries = list(iter_audit_entries(str(tmp_path)))
+    assert entries[0]["details"] == {"x": 1, "nested": {"items": [1]}}
+    # The writer chains its own copy, not the caller's dict
+    assert "hash" not in returned and "seq" not in returned
+    assert AuditChainVerifier(str(tmp_path)).verify(full=True)["ok"]
+
+
+def test_failed_write_keeps_chain_and_sinks_consistent(tmp_path):
+    sink = RecordingSink()
+    logger = AuditLogger(str(tmp_path), compress=False, sinks=[sink], flush_interval=0.05)
+    logger.log('agent', 'first', {"i": 1})
+    assert logger.flush(timeout=5)
+
+    write_lines = logger._write_lines
+    failures = []
+
+    def failing_write(lines):
+        if lines and not failures:
+            failures.append(lines)
+            # Part of the data reaches the file before the error
+            logger._file.write(lines[0][:10])
+            logger._file.flush()
+            raise OSError("disk full")
+        write_lines(lines)
+
+    logger._write_lines = failing_write
+    logger.log('agent', 'second', {"i": 2})
+    assert not logger.flush(timeout=5)
+    assert [entry["action"] for entry in sink.entries] == ['first']
+
+    logger.log('agent', 'third', {"i": 3})
+    logger.close()
+
+    entries = list(iter_audit_entries(str(tmp_path)))
+    assert [entry["action"] for entry in entries] == ['first', 'second', 'third']
+    assert [entry["seq"] for entry in entries] == [1, 2, 3]
+    assert [entry["action"] for entry in sink.entries] == ['first', 'second', 'third']
+    assert [(entry["seq"], entry["prev_hash"], entry["hash"]) for entry in sink.entries] == \
+        [(entry["seq"], entry["prev_hash"], entry["hash"]) for entry in entries]
+    assert AuditChainVerifier(str(tmp_path)).verify(full=True)["ok"]
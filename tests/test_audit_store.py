@@ -0,0 +1,24 @@
+import os
+import sys
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.tools.audit_log import AuditLogger
+from src.tools.audit_segments import list_audit_segments
+from src.tools.audit_store import AuditStore
+
+
+def test_import_is_idempotent(tmp_path):
+    log_dir = str(tmp_path / 'logs')
+    logger = AuditLogger(log_dir, compress=False)
+    for i in range(5):
+        logger.log('agent', 'step', {"entity": 'ENT001', "i": i})
+    logger.close()
+
+    store = AuditStore(str(tmp_path / 'audit.sqlite'))
+    segments = list_audit_segments(log_dir)
+    assert store.import_jsonl(segments) == 5
+    assert store.import_jsonl(segments) == 0
+    assert store.count() == 5
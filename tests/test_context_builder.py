@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pandas as pd
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+from src.tools.context_builder import ContextBuilder
+
+
+def trial_balance(period, accounts):
+    return pd.DataFrame({
+        'account_number': [number for number, _ in accounts],
+        'account_name': [f"Account {number}" for number, _ in accounts],
+        'debit': [amount for _, amount in accounts],
+        'credit': 0.0,
+        'period': period
+    })
+
+
+def test_cross_comparison_uses_latest_dataset_in_either_order():
+    older = trial_balance('2023-12-31', [(1000, 100.0), (1100, 50.0)])
+    newer = trial_balance('2024-06-30', [(1000, 130.0), (1200, 20.0)])
+    builder = ContextBuilder()
+
+    for datasets in ({'excel_export_2023.csv': older, 'oracle_q2_2024.csv': newer},
+                     {'oracle_q2_2024.csv': newer, 'excel_export_2023.csv': older}):
+        context, _ = builder.build(datasets)
+        assert "COMPARISON oracle_q2_2024.csv vs excel_export_2023.csv" in context
+        comparison = context.split("COMPARISON", 1)[1]
+        new_section = comparison.split("New accounts", 1)[1].split("Dropped accounts", 1)[0]
+        dropped_section = comparison.split("Dropped accounts", 1)[1]
+        assert "1200" in new_section and "1100" not in new_section
+        assert "1100" in dropped_section.split("OVERALL", 1)[0]
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pandas as pd
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+from src.tools.deterministic_analysis import DeterministicAnalyzer, recognize_intent
+
+
+def trial_balance(period, accounts):
+    return pd.DataFrame({
+        'account_number': [number for number, _ in accounts],
+        'account_name': [f"Account {number}" for number, _ in accounts],
+        'debit': [amount for _, amount in accounts],
+        'credit': 0.0,
+        'period': period
+    })
+
+
+def test_generic_words_need_periods_to_mean_variance():
+    assert recognize_intent("What is the difference between accrued liabilities and payables?") is None
+    assert recognize_intent("Explain the exchange rate impact") is None
+    assert recognize_intent("How did cash change between Q1 and Q2 2024?")["intents"] == ['variance']
+    assert recognize_intent("Identify accounts with >20% changes")["intents"] == ['variance']
+    assert recognize_intent("Compare Q1 vs Q2 2024 cash flow")["intents"] == ['variance']
+
+
+def test_extra_datasets_are_reported_as_ignored():
+    datasets = {
+        'fy2023': trial_balance('2023-12-31', [(1000, 100.0)]),
+        'q2_2024': trial_balance('2024-06-30', [(1000, 150.0), (1100, 10.0)]),
+        'q1_2024': trial_balance('2024-03-31', [(1000, 120.0)])
+    }
+    request = "Show new accounts"
+    analyzer = DeterministicAnalyzer()
+    report = analyzer.render(analyzer.analyze(request, recognize_intent(request), datasets, []))
+    assert "q2_2024 (2024-06-30) vs fy2023 (2023-12-31)" in report
+    assert "ignored q1_2024" in report
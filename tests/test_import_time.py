@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from benchmarks.check_import_time import CHECKS, run_check
+
+# Cumulative import time allowed per timed check (as check_import_time.py --budget-ms)
+BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', '300'))
+
+
+@pytest.mark.parametrize('label, arguments, forbidden, timed', CHECKS, ids=[check[0] for check in CHECKS])
+def test_startup_stays_within_import_budget(label, arguments, forbidden, timed, tmp_path):
+    # run_check prints the loaded modules and timings when it fails
+    assert run_check(label, arguments, forbidden, timed, BUDGET_MS, str(tmp_path))
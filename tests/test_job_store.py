@@ -0,0 +1,132 @@
+import os
+import sys
+import threading
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.jobs.job_store import JobStore
+
+
+def make_store(tmp_path, **options):
+    return JobStore(str(tmp_path / 'jobs.sqlite'), **options)
+
+
+def expire_heartbeat(store, job_id):
+    """Make a running job look abandoned by its worker"""
+    store._write('UPDATE jobs SET heartbeat_at = heartbeat_at - ? WHERE id = ?', (store.stale_seconds + 1, job_id))
+
+
+def test_claims_are_exclusive_and_in_submission_order(tmp_path):
+    store = make_store(tmp_path)
+    job_ids = [store.submit(f"request {i}", ['data/input/trial_balance_2024.csv']) for i in range(20)]
+
+    claimed, lock = [], threading.Lock()
+
+    def worker(name):
+        while True:
+            job = store.claim(name)
+            if job is None:
+                return
+            with lock:
+                claimed.append(job["id"])
+
+    threads = [threading.Thread(target=worker, args=(f"worker-{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(job_ids)
+    assert store.counts()["running"] == 20
+
+    store_order = make_store(tmp_path / 'order')
+    first = store_order.submit('first', ['data/input/trial_balance_2024.csv'])
+    store_order.submit('second', [])
+    job = store_order.claim('worker-a')
+    assert job["id"] == first
+    assert (job["status"], job["worker"], job["attempts"]) == ('running', 'worker-a', 1)
+    # Workers may run elsewhere, so files are stored as absolute paths
+    assert job["files"] == [os.path.abspath('data/input/trial_balance_2024.csv')]
+
+
+def test_complete_and_fail_store_the_outcome(tmp_path):
+    store = make_store(tmp_path)
+    done_id = store.submit('done', [])
+    failed_id = store.submit('failed', [])
+    store.claim('worker-a')
+    store.claim('worker-a')
+
+    assert store.complete(done_id, 'worker-a', 'All balanced', {"analysis_mode": 'deterministic'})
+    assert store.fail(failed_id, 'worker-a', 'boom')
+
+    done, failed = store.get(done_id), store.get(failed_id)
+    assert (done["status"], done["result"], done["run_info"]) == \
+        ('completed', 'All balanced', {"analysis_mode": 'deterministic'})
+    assert (failed["status"], failed["error"]) == ('failed', 'boom')
+    # Finished jobs are final
+    assert not store.fail(done_id, 'worker-a', 'late error')
+    assert store.get(done_id)["status"] == 'completed'
+
+
+def test_analysis_failures_are_stored_as_failed(tmp_path):
+    store = make_store(tmp_path)
+    job_id = store.submit('no data', [])
+    store.claim('worker-a')
+    store.complete(job_id, 'worker-a', 'Analysis failed: timeout')
+    job = store.get(job_id)
+    assert (job["status"], job["error"]) == ('failed', 'Analysis failed: timeout')
+
+
+def test_stale_job_is_requeued_and_old_worker_cannot_overwrite(tmp_path):
+    store = make_store(tmp_path, stale_seconds=60, max_attempts=3)
+    job_id = store.submit('slow', [])
+    store.claim('worker-a')
+
+    # Fresh heartbeats keep the job
+    assert store.requeue_stale() == 0
+    expire_heartbeat(store, job_id)
+    assert store.requeue_stale() == 1
+    job = store.get(job_id)
+    assert (job["status"], job["worker"], job["progress"]) == ('queued', None, 0)
+
+    job = store.claim('worker-b')
+    assert (job["worker"], job["attempts"]) == ('worker-b', 2)
+
+    # worker-a finishes late: its outcome must not replace worker-b's run
+    assert not store.complete(job_id, 'worker-a', 'stale result')
+    assert not store.fail(job_id, 'worker-a', 'stale error')
+    assert store.get(job_id)["status"] == 'running'
+
+    assert store.complete(job_id, 'worker-b', 'fresh result')
+    assert store.get(job_id)["result"] == 'fresh result'
+
+
+def test_job_fails_after_max_attempts(tmp_path):
+    store = make_store(tmp_path, stale_seconds=60, max_attempts=2)
+    job_id = store.submit('crashes workers', [])
+
+    store.claim('worker-a')
+    expire_heartbeat(store, job_id)
+    assert store.requeue_stale() == 1
+
+    store.claim('worker-b')
+    expire_heartbeat(store, job_id)
+    assert store.requeue_stale() == 0
+
+    job = store.get(job_id)
+    assert (job["status"], job["attempts"], job["error"]) == ('failed', 2, 'Worker stopped responding')
+    assert store.claim('worker-c') is None
+
+
+def test_cancel_only_affects_queued_jobs(tmp_path):
+    store = make_store(tmp_path)
+    running_id = store.submit('running', [])
+    queued_id = store.submit('queued', [])
+    store.claim('worker-a')
+
+    assert not store.cancel(running_id)
+    assert store.cancel(queued_id)
+    assert store.claim('worker-b') is None
+    assert store.counts() == {"queued": 0, "running": 1, "completed": 0, "failed": 0, "cancelled": 1}
@@ -0,0 +1,108 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from dynamic_demo import PeriodFilter
+from src.tools.period_index import PERIOD_INDEX, has_period_index, index_by_period, period_dates, period_slice
+
+PERIODS = ['2024-03-31', 'not a period', '2024-01-01', '2023-12-31', None, '2024-04-01', '2024-02-15',
+           '', '2024-01-01', '2024-06-30', '2023-01-01']
+
+
+def trial_balance():
+    return pd.DataFrame({
+        "row": range(len(PERIODS)),
+        "period": PERIODS,
+        "gl_account": [1000 + i for i in range(len(PERIODS))],
+        "net_balance": [float(i * 10) for i in range(len(PERIODS))],
+    })
+
+
+def rows(df):
+    return sorted(df["row"].tolist())
+
+
+WINDOWS = [
+    PeriodFilter.parse_period_request('Q1 2024'),
+    PeriodFilter.parse_period_request('Mar 2024'),
+    PeriodFilter.parse_period_request('2023'),
+    PeriodFilter.parse_period_request('Q3 2024'),
+    {"start_date": '2024-01-01', "end_date": '2024-01-01', "description": 'Single day'},
+    {"start_date": '2000-01-01', "end_date": '2099-12-31', "description": 'Everything'},
+]
+
+
+@pytest.mark.parametrize('period_info', WINDOWS, ids=[window["description"] for window in WINDOWS])
+def test_indexed_filter_matches_mask_filter(period_info):
+    df = trial_balance()
+    indexed = index_by_period(df)
+
+    masked = PeriodFilter.filter_dataframe_by_period(df, period_info)
+    sliced = PeriodFilter.filter_dataframe_by_period(indexed, period_info)
+
+    assert not has_period_index(df)
+    assert rows(sliced) == rows(masked)
+    assert list(sliced.columns) == list(masked.columns)
+
+
+def test_window_edges_are_inclusive_by_date():
+    indexed = index_by_period(trial_balance())
+    q1 = period_slice(indexed, '2024-01-01', '2024-03-31')
+    # Both 2024-01-01 rows and 2024-03-31 are inside; 2023-12-31 and 2024-04-01 are not
+    assert sorted(q1["period"].tolist()) == ['2024-01-01', '2024-01-01', '2024-02-15', '2024-03-31']
+
+
+def test_unparseable_periods_sort_first_and_never_match():
+    indexed = index_by_period(trial_balance())
+    assert indexed.index.name == PERIOD_INDEX
+    assert indexed.index[:3].isna().all() and not indexed.index[3:].isna().any()
+    assert indexed.index[3:].is_monotonic_increasing
+    # The widest window still leaves out the NaT rows
+    assert len(period_slice(indexed, '1900-01-01', '2200-01-01')) == len(PERIODS) - 3
+
+
+@pytest.mark.filterwarnings('ignore:Could not infer format')
+def test_all_unparseable_periods_give_empty_slice():
+    indexed = index_by_period(pd.DataFrame({"period": ['x', None, 'y'], "net_balance": [1.0, 2.0, 3.0]}))
+    assert has_period_index(indexed)
+    assert period_slice(indexed, '2024-01-01', '2024-12-31').empty
+
+
+@pytest.mark.parametrize('unit', ['s', 'ms', 'us'])
+def test_non_nanosecond_index(unit):
+    indexed = index_by_period(trial_balance())
+    coarse = indexed.copy()
+    coarse.index = indexed.index.as_unit(unit)
+    assert has_period_index(coarse)
+
+    for period_info in WINDOWS:
+        expected = period_slice(indexed, period_info["start_date"], period_info["end_date"])
+        actual = period_slice(coarse, period_info["start_date"], period_info["end_date"])
+        assert rows(actual) == rows(expected)
+
+
+def test_frames_without_a_sorted_index_fall_back():
+    df = trial_balance()
+    assert period_slice(df, '2024-01-01', '2024-03-31') is None
+
+    unsorted = index_by_period(df).iloc[::-1]
+    assert not has_period_index(unsorted)
+    assert period_slice(unsorted, '2024-01-01', '2024-03-31') is None
+
+    no_period = df.drop(columns='period')
+    assert index_by_period(no_period) is no_period
+    assert period_dates(no_period) is None
+
+
+def test_period_dates_match_parsed_column():
+    df = trial_balance()
+    indexed = index_by_period(df)
+    parsed = period_dates(df)
+    from_index = period_dates(indexed)
+    assert from_index.tolist() == parsed.loc[indexed["row"]].tolist()
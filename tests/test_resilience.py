@@ -0,0 +1,85 @@
+import os
+import sys
+import threading
+import time
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.llm.resilience import ResilientCaller
+from src.runtime.telemetry import TelemetryCollector, record_llm_call, telemetry_task
+
+
+def wait_for(condition, timeout=5.0):
+    ends_at = time.monotonic() + timeout
+    while not condition() and time.monotonic() < ends_at:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_hedged_call_counts_only_the_winning_attempt():
+    caller = ResilientCaller(call_timeout=5, hedge=True, hedge_after=0.1)
+    calls, lock = [], threading.Lock()
+    primary_done = threading.Event()
+
+    def slow_first():
+        with lock:
+            calls.append(len(calls) + 1)
+            number = len(calls)
+        time.sleep(0.5 if number == 1 else 0.05)
+        record_llm_call(1000, 200 * number)
+        if number == 1:
+            primary_done.set()
+        return f"call {number}"
+
+    collector = TelemetryCollector('hedge')
+    with collector.activate(), telemetry_task('analysis') as record:
+        assert caller.call(slow_first) == "call 2"
+    assert primary_done.wait(5)
+
+    assert caller.stats["hedges"] == 1 and caller.stats["hedge_wins"] == 1
+    assert wait_for(lambda: record["discarded_calls"] == 1)
+    assert (record["llm_calls"], record["prompt_tokens"], record["completion_tokens"]) == (1, 1000, 400)
+    assert record["discarded_tokens"] == 1200
+    assert collector.summary()["totals"]["discarded_tokens"] == 1200
+
+
+def test_timed_out_attempt_usage_is_discarded_and_retry_counted():
+    caller = ResilientCaller(call_timeout=0.2, deadline=5, max_retries=1, backoff_base=0.01)
+    attempts = []
+    first_done = threading.Event()
+
+    def hangs_once():
+        attempts.append(1)
+        if len(attempts) == 1:
+            time.sleep(0.5)
+            record_llm_call(500, 50)
+            first_done.set()
+            return "late"
+        record_llm_call(500, 60)
+        return "retried"
+
+    collector = TelemetryCollector('timeouts')
+    with collector.activate(), telemetry_task('analysis') as record:
+        assert caller.call(hangs_once) == "retried"
+    assert first_done.wait(5)
+
+    assert caller.stats["timeouts"] == 1
+    assert (record["llm_calls"], record["completion_tokens"], record["discarded_calls"]) == (1, 60, 1)
+
+
+def test_failed_attempts_are_counted():
+    caller = ResilientCaller(call_timeout=1, max_retries=0)
+
+    def fails():
+        record_llm_call(0, 0, failed=True)
+        raise ValueError("bad request")
+
+    collector = TelemetryCollector('errors')
+    with collector.activate(), telemetry_task('analysis') as record:
+        try:
+            caller.call(fails)
+        except ValueError:
+            pass
+    assert (record["llm_errors"], record["discarded_calls"]) == (1, 0)
@@ -0,0 +1,18 @@
+import os
+import sys
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.llm.response_cache import ResponseCache
+
+
+def test_responses_are_not_shared_between_endpoints(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'))
+    mock_key = ResponseCache.make_key('deepseek-chat', 0.1, 'prompt', 'Analyst', 'http://127.0.0.1:8900/v1')
+    real_key = ResponseCache.make_key('deepseek-chat', 0.1, 'prompt', 'Analyst', 'https://api.deepseek.com/v1')
+    cache.put(mock_key, 'canned mock answer')
+
+    assert cache.get(real_key) is None
+    assert cache.get(mock_key) == 'canned mock answer'
@@ -0,0 +1,34 @@
+import os
+import sys
+import asyncio
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.runtime.analysis_handle import AnalysisHandle
+from src.runtime.streaming import AnalysisStream
+
+
+def test_async_consumers_unsubscribe_when_done():
+    async def consume():
+        stream = AnalysisStream()
+        stream.emit('stage', stage='loading', progress=0.0, message='')
+        async for _ in stream:
+            break
+        for _ in range(3):
+            await asyncio.sleep(0)
+        early = len(stream._listeners)
+
+        stream.close(result='done')
+        events = [event async for event in stream]
+        return early, len(stream._listeners), events[-1]["type"]
+
+    assert asyncio.run(consume()) == (0, 0, 'done')
+
+
+def test_handles_only_stream_when_asked():
+    assert AnalysisHandle('request').stream is None
+    handle = AnalysisHandle('request', stream=True)
+    handle.update('loading', 0.1, 'Loading data files')
+    assert handle.stream.events[-1]["stage"] == 'loading'
@@ -0,0 +1,39 @@
+import os
+import sys
+import json
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import pandas as pd
+
+from src.tools import upload_client
+from src.tools.upload_client import TaxProvisionUploadClient
+from src.tools.upload_tools import UploadFileWriter
+
+
+def test_json_upload_is_streamed_across_read_boundaries(tmp_path, monkeypatch):
+    chunk = pd.DataFrame({
+        'account_number': [1000, 1100, 2000],
+        'account_name': ['Cash', 'Receivables "trade"', 'Payables'],
+        'debit': [1234.5, 10.0, 0.0],
+        'credit': [0.0, 0.0, 1244.5]
+    })
+    header = {"entity_id": 'ENT001', "period_end": '2024-12-31', "currency": 'USD', "total_debits": 1244.5}
+    upload_file = str(tmp_path / 'upload.json')
+    UploadFileWriter.write(upload_file, header, [chunk], 'json')
+    with open(upload_file) as f:
+        expected = json.load(f)["account_details"]
+
+    # Tiny reads split numbers and strings between buffers
+    monkeypatch.setattr(upload_client, 'JSON_READ_SIZE', 3)
+    sent = []
+    with TaxProvisionUploadClient('http://127.0.0.1:1', batch_size=2) as client:
+        monkeypatch.setattr(client, '_post', lambda path, payload: sent.append(payload) or {})
+        result = client.upload_file(upload_file)
+
+    batches, commit = sent[:-1], sent[-1]
+    assert [record for batch in batches for record in batch["records"]] == expected
+    assert result["accounts"] == 3 and result["batches"] == 2
+    assert commit["total_debits"] == 1244.5 and commit["upload_id"] == 'upload.json'